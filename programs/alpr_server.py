@@ -1,98 +1,95 @@
 import os
-import cv2
-import pandas as pd
-import easyocr
-import difflib
+import sys
+import time
 import numpy as np
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-
-
-app = Flask(__name__)
-CORS(app)
-
-print("Initializing EasyOCR...")
-reader = easyocr.Reader(["ar", "en"], gpu=False)
-
-CSV_PATH = "./Rdata/labels.csv"
-
-
-def cleanup_text(text):
-    if not isinstance(text, str):
-        return str(text).upper()
-    return "".join(e for e in text if e.isalnum()).upper()
-
-
-def load_database(csv_path):
-    try:
-        if not os.path.exists(csv_path):
-            print(f"ERROR: CSV file not found at {os.path.abspath(csv_path)}")
-            return {}
-
-        df = pd.read_csv(csv_path)
-        df["plate_number"] = df["plate_number"].astype(str)
-
-        col_img = "file_name"
-        col_plate = "plate_number"
-
-        if col_img not in df.columns or col_plate not in df.columns:
-            return {}
-
-        db_map = {}
-        for index, row in df.iterrows():
-            img_filename = str(row[col_img]).strip()
-            raw_plate = str(row[col_plate])
-            clean_plate = cleanup_text(raw_plate)
-            db_map[clean_plate] = img_filename
-
-        print(f"DEBUG: Loaded {len(db_map)} plates from database.")
-        return db_map
-
-    except Exception as e:
-        print(f"Error loading CSV: {e}")
-        return {}
-
-
-def find_best_match(detected_text, database_keys):
-    detected_clean = cleanup_text(detected_text)
-    detected_reversed = detected_clean[::-1]
-
-    if detected_clean in database_keys:
-        return detected_clean, 1.0
-
-    if detected_reversed in database_keys:
-        return detected_reversed, 0.95
-
-    best_match = None
-    best_score = 0.0
-
-    for db_key in database_keys:
-        if abs(len(detected_clean) - len(db_key)) > 1:
-            continue
-
-        similarity = difflib.SequenceMatcher(None, detected_clean, db_key).ratio()
-
-        if similarity > 0.85 and similarity > best_score:
-            best_score = similarity
-            best_match = db_key
-
-    return best_match, best_score
-
-
-PLATE_DATABASE = load_database(CSV_PATH)
-DB_KEYS = list(PLATE_DATABASE.keys())
-
-
-def process_image_from_memory(img):
-    result = {
-        "success": False,
-        "matched": False,
-        "matched_plate": None,
-        "detected_plate": None,
-        "confidence": 0.0,
-        "message": "",
+from plate_gate import PlateGate
+from ingest import raw_frame
+from preprocess import IDENTITY, Preprocessor, load_rois, map_result_box, parse_roi
+from scan_service import (
+    PROFILE,
+    get_reader,
+    new_result,
+    new_voter,
+    pipeline_getattr,
+    readtext,
+    run,
+    use_pipeline,
+)
+
+# Full-frame pipeline: EasyOCR reads the whole (preprocessed) frame. Serving,
+# the allowlist and everything else shared with test.py is in scan_service.
+
+# OCR input preprocessing: long side limit in pixels (0 = full resolution)
+# and an optional lane ROI, for all frames (ALPR_ROI) or per camera id
+# (ALPR_ROI_FILE, JSON). Large JPEGs are decoded at reduced size.
+OCR_LONG_SIDE = int(os.environ.get("ALPR_OCR_LONG_SIDE", "0"))
+PREPROCESS = Preprocessor(OCR_LONG_SIDE, parse_roi(os.environ.get("ALPR_ROI", "")))
+CAMERA_PREPROCESS = {}
+if os.environ.get("ALPR_ROI_FILE"):
+    CAMERA_PREPROCESS = {
+        camera: Preprocessor(OCR_LONG_SIDE, roi)
+        for camera, roi in load_rois(os.environ["ALPR_ROI_FILE"]).items()
     }
 
+# Early exit: with ALPR_GATE=1 a cheap edge/contour check (plate_gate.py)
+# runs before OCR. Frames without a plate-like candidate are answered with
+# "rejected": true and no OCR; otherwise OCR reads only the padded region
+# around the candidates.
+GATE = PlateGate() if os.environ.get("ALPR_GATE", "0") == "1" else None
+
+# Full-frame readings carry more stray characters than tight crops, so
+# fuzzy allowlist matches may differ in length by one character only
+MAX_LEN_DIFF = 1
+
+
+def warm_up():
+    """
+    Loads the models and runs one dummy inference so the first real scan
+    does not pay for lazy initialization.
+    """
+    readtext(np.zeros((64, 256, 3), np.uint8))
+
+
+def match_ocr_results(ocr_results, result, stats=None):
+    """
+    Votes over every token and every run of adjacent tokens on a line, so a
+    plate split into letter and digit tokens can still match.
+    """
+    voter = new_voter(stats)
+    voter.add(ocr_results)
+    return voter.fill_result(result, "No Text Detected")
+
+
+def gate_frame(img, result, timings=None):
+    """
+    Plate-presence gate for one decoded frame. Returns (img, transform):
+    the region OCR should read and its offset in `img`, or (None, None)
+    after marking `result` as rejected early. gate_ms is added to timings.
+    """
+    if GATE is None:
+        return img, IDENTITY
+    start = time.perf_counter()
+    region = GATE.region(img)
+    if timings is not None:
+        gate_ms = (time.perf_counter() - start) * 1000
+        timings["gate_ms"] = timings.get("gate_ms", 0.0) + gate_ms
+    if region is None:
+        result["rejected"] = True
+        result["message"] = "No plate candidate in frame."
+        return None, None
+    x1, y1, x2, y2 = region
+    return img[y1:y2, x1:x2], (1.0, x1, y1)
+
+
+def process_image_from_memory(img, timings=None):
+    """
+    Gate + OCR + allowlist match for one decoded frame. When `timings` is a
+    dict, the stage latencies are added to it as gate_ms / ocr_ms /
+    match_ms, and the allowlist lookup counts as match_exact / match_fuzzy
+    / match_miss.
+    """
+    result = new_result()
+
     if img is None:
         result["message"] = "Failed to load image."
         return result
@@ -100,35 +97,16 @@ def process_image_from_memory(img):
     result["success"] = True
 
     try:
-        ocr_results = reader.readtext(img)
-
-        best_conf = 0.0
-        best_candidate = None
-
-        for bbox, text, prob in ocr_results:
-            prob = float(prob)
-            if len(text) < 3:
-                continue
-
-            matched_key, match_score = find_best_match(text, DB_KEYS)
-
-            if matched_key:
-                result["matched"] = True
-                result["matched_plate"] = matched_key
-                result["detected_plate"] = text
-                result["confidence"] = prob
-                result["message"] = f"ACCESS GRANTED (Match: {matched_key})"
-                return result
-
-            if prob > best_conf:
-                best_conf = prob
-                best_candidate = cleanup_text(text)
-
-        if best_candidate:
-            result["detected_plate"] = best_candidate
-            result["message"] = "ACCESS DENIED"
-        else:
-            result["message"] = "No Text Detected"
+        img, region = gate_frame(img, result, timings)
+        if img is None:
+            return result
+        start = time.perf_counter()
+        ocr_results = readtext(img)
+        ocr_done = time.perf_counter()
+        map_result_box(match_ocr_results(ocr_results, result, timings), region)
+        if timings is not None:
+            timings["ocr_ms"] = (ocr_done - start) * 1000
+            timings["match_ms"] = (time.perf_counter() - ocr_done) * 1000
 
     except Exception as e:
         print(f"Backend Error: {e}")
@@ -137,20 +115,67 @@ def process_image_from_memory(img):
     return result
 
 
-@app.route("/scan", methods=["POST"])
-def scan_plate():
-    if "image" not in request.files:
-        return jsonify({"error": "No image uploaded"}), 400
+def decode_frame(data, camera=None, shape=None):
+    """
+    Encoded image, or a raw BGR frame when `shape` is (height, width),
+    preprocessed for OCR. Returns (img, transform); map_result_box() takes
+    the result's plate_box back to the uploaded image.
+    """
+    preprocess = CAMERA_PREPROCESS.get(camera, PREPROCESS)
+    if shape is not None:
+        return preprocess.apply(raw_frame(data, shape))
+    return preprocess.decode(data)
+
+
+def process_images_batch(imgs):
+    """
+    Runs OCR over several frames at once. Frames are gated first; the
+    remaining regions of the same size share a single readtext_batched call
+    (one detector and one recognizer pass). Returns per-image results plus
+    a timing breakdown in milliseconds.
+    """
+    results = [new_result() for _ in imgs]
+    timings = {"ocr_ms": 0.0, "match_ms": 0.0}
+    imgs = list(imgs)
+    regions = [IDENTITY] * len(imgs)
+
+    groups = {}
+    for i, img in enumerate(imgs):
+        if img is None:
+            results[i]["message"] = "Failed to load image."
+            continue
+        results[i]["success"] = True
+        imgs[i], regions[i] = gate_frame(img, results[i], timings)
+        if imgs[i] is not None:
+            groups.setdefault(imgs[i].shape, []).append(i)
+
+    for indices in groups.values():
+        try:
+            start = time.perf_counter()
+            batch_ocr = PROFILE.readtext_batched(
+                get_reader(), [imgs[i] for i in indices]
+            )
+            timings["ocr_ms"] += (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            for i, ocr_results in zip(indices, batch_ocr):
+                match_ocr_results(ocr_results, results[i], timings)
+                map_result_box(results[i], regions[i])
+            timings["match_ms"] += (time.perf_counter() - start) * 1000
+
+        except Exception as e:
+            print(f"Backend Error: {e}")
+            for i in indices:
+                results[i]["message"] = f"OCR Error: {e}"
 
-    file = request.files["image"]
+    return results, timings
 
-    file_bytes = np.frombuffer(file.read(), np.uint8)
-    img = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
 
-    data = process_image_from_memory(img)
+# cleanup_text, find_best_match, load_database, init, PLATE_DATABASE, DB_KEYS
+__getattr__ = pipeline_getattr(__name__)
 
-    return jsonify(data)
+use_pipeline(sys.modules[__name__], "alpr_server", MAX_LEN_DIFF)
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    run()
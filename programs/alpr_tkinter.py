@@ -1,10 +1,28 @@
 import os
+import queue
 import threading
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from collections import OrderedDict
+from tkinter import filedialog, messagebox, ttk
 from PIL import Image, ImageTk
 import cv2
-import alpr_server as core
+from preprocess import map_result_box
+
+# Remote mode: with ALPR_REMOTE_URL set (e.g. http://gate-server:5000) scans
+# go to a running /scan server and this process never loads the models.
+REMOTE_URL = os.environ.get("ALPR_REMOTE_URL", "")
+REMOTE_JPEG_QUALITY = int(os.environ.get("ALPR_REMOTE_JPEG_QUALITY", "90"))
+REMOTE_TIMEOUT_SECONDS = float(os.environ.get("ALPR_REMOTE_TIMEOUT", "30"))
+# Local copy of the allowlist, only used for the reference images
+CSV_PATH = "./Rdata/labels.csv"
+
+if REMOTE_URL:
+    from plate_store import read_plate_csv
+    from remote_client import RemoteScanner
+
+    core = None
+else:
+    import alpr_server as core
 
 BG_DARK = "#1E2838"
 BG_MID = "#2C3E50"
@@ -19,20 +37,112 @@ FONT_BUTTON = ("Segoe UI", 12, "bold")
 FONT_STATUS = ("Segoe UI", 16)
 FONT_LABEL = ("Segoe UI", 11)
 
+IMAGE_TYPES = (".jpg", ".jpeg", ".png", ".bmp")
+# Decoded full-size frames are large; thumbnails and DB images are small
+FRAME_CACHE_SIZE = 8
+THUMB_CACHE_SIZE = 256
+DB_IMAGE_CACHE_SIZE = 64
+GRANTED_COLOR = (0, 255, 0)
+DENIED_COLOR = (0, 0, 255)
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping for frames and thumbnails."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def file_key(path):
+    """Cache key that changes when the file is rewritten."""
+    try:
+        return path, os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def new_scan_result(path, msg="No Text Detected"):
+    """Desktop result; boxes are (x_min, y_min, x_max, y_max, color) tuples."""
+    return {
+        "path": path,
+        "matched": False,
+        "plate": None,
+        "boxes": (),
+        "db_file": None,
+        "msg": msg,
+    }
+
+
+def scan_result(path, res, db_files):
+    """
+    Desktop result from a scan result dict (local pipeline or /scan server);
+    `db_files` maps allowlist plates to their reference image file.
+    """
+    result = new_scan_result(path, res["message"])
+    if res["plate_box"]:
+        color = GRANTED_COLOR if res["matched"] else DENIED_COLOR
+        x_min, y_min, x_max, y_max = (int(v) for v in res["plate_box"])
+        result["boxes"] = ((x_min, y_min, x_max, y_max, color),)
+
+    if res["matched"]:
+        plate = res["matched_plate"]
+        result["matched"] = True
+        result["plate"] = plate
+        result["msg"] = f"ACCESS GRANTED ({plate})"
+        result["db_file"] = db_files.get(plate)
+    elif res["detected_plate"]:
+        result["plate"] = res["detected_plate"]
+        result["msg"] = f"ACCESS DENIED | Detected: {res['detected_plate']}"
+    return result
+
+
+def list_images(folder):
+    return sorted(
+        os.path.join(folder, name)
+        for name in os.listdir(folder)
+        if name.lower().endswith(IMAGE_TYPES)
+    )
+
 
 class ALPRApp:
     def __init__(self, root):
         self.root = root
-        self.root.title("ALPR Access Control System (Desktop Mode)")
         self.root.configure(bg=BG_DARK)
+        self.remote = None
+        self.plate_files = {}
 
-        if not core.PLATE_DATABASE:
-            messagebox.showwarning(
-                "Database Empty", "Could not load database.csv from the server module."
+        if REMOTE_URL:
+            self.root.title("ALPR Access Control System (Remote Mode)")
+            self.remote = RemoteScanner(
+                REMOTE_URL, REMOTE_JPEG_QUALITY, REMOTE_TIMEOUT_SECONDS
             )
+        else:
+            self.root.title("ALPR Access Control System (Desktop Mode)")
+            core.init()
+            if not core.PLATE_DATABASE:
+                messagebox.showwarning(
+                    "Database Empty",
+                    "Could not load database.csv from the server module.",
+                )
 
         window_width = 1100
-        window_height = 700
+        window_height = 900
         self.center_window_top(window_width, window_height)
 
         current_script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -42,6 +152,16 @@ class ALPRApp:
             self.db_dir = os.path.join(project_root, "Rdata", "raw_data")
 
         self.current_image_path = None
+        self.frames = LRUCache(FRAME_CACHE_SIZE)
+        self.thumbs = LRUCache(THUMB_CACHE_SIZE)
+        self.db_images = LRUCache(DB_IMAGE_CACHE_SIZE)
+        self.batch_results = {}
+        self.batch_running = False
+        self.cancel_batch = threading.Event()
+        # One worker runs every job (warm-up, scans, thumbnails) in order;
+        # it only touches Tk through root.after.
+        self.jobs = queue.Queue()
+        threading.Thread(target=self.run_jobs, daemon=True).start()
 
         header = tk.Label(
             root,
@@ -74,7 +194,7 @@ class ALPRApp:
         self.btn_check = tk.Button(
             controls_frame,
             text="🔍 CHECK ACCESS",
-            command=self.start_check_thread,
+            command=self.start_check,
             font=FONT_BUTTON,
             bg=STATUS_SUCCESS,
             fg=BG_DARK,
@@ -88,6 +208,22 @@ class ALPRApp:
         )
         self.btn_check.pack(side=tk.LEFT, padx=15)
 
+        self.btn_folder = tk.Button(
+            controls_frame,
+            text="📁 SCAN FOLDER",
+            command=self.browse_folder,
+            font=FONT_BUTTON,
+            bg=ACCENT_PRIMARY,
+            fg=TEXT_LIGHT,
+            activebackground=BG_MID,
+            activeforeground=TEXT_LIGHT,
+            relief=tk.FLAT,
+            width=20,
+            height=2,
+            cursor="hand2",
+        )
+        self.btn_folder.pack(side=tk.LEFT, padx=15)
+
         self.lbl_status = tk.Label(
             root,
             text="Waiting for image selection...",
@@ -132,6 +268,40 @@ class ALPRApp:
         )
         self.lbl_img_right.pack(expand=True, fill="both")
 
+        batch_frame = tk.Frame(root, bg=BG_DARK)
+        batch_frame.pack(fill="x", padx=70, pady=(10, 0))
+        self.progress = ttk.Progressbar(batch_frame, mode="determinate")
+        self.progress.pack(fill="x", pady=(0, 5))
+
+        style = ttk.Style(root)
+        style.configure(
+            "Treeview",
+            background=BG_MID,
+            fieldbackground=BG_MID,
+            foreground=TEXT_LIGHT,
+            font=FONT_LABEL,
+        )
+        self.tree = ttk.Treeview(
+            batch_frame,
+            columns=("file", "plate", "result"),
+            show="headings",
+            height=6,
+        )
+        for column, title, width in (
+            ("file", "Image", 500),
+            ("plate", "Plate", 200),
+            ("result", "Result", 200),
+        ):
+            self.tree.heading(column, text=title)
+            self.tree.column(column, width=width)
+        self.tree.tag_configure("granted", foreground=STATUS_SUCCESS)
+        self.tree.tag_configure("denied", foreground=STATUS_DANGER)
+        self.tree.bind("<<TreeviewSelect>>", self.on_batch_select)
+        scrollbar = ttk.Scrollbar(batch_frame, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill="y")
+        self.tree.pack(fill="x")
+
         footer = tk.Label(
             root,
             text="Powered by EasyOCR & OpenCV",
@@ -141,135 +311,277 @@ class ALPRApp:
         )
         footer.pack(side="bottom", pady=15)
 
+        # Models load on the worker so the window opens immediately; jobs
+        # queued meanwhile run once they are ready.
+        self.submit(self.warm_up_models)
+
     def center_window_top(self, width, height):
         screen_width = self.root.winfo_screenwidth()
         x = (screen_width // 2) - (width // 2)
         y = 0
         self.root.geometry(f"{width}x{height}+{int(x)}+{int(y)}")
 
+    def submit(self, fn, *args):
+        self.jobs.put((fn, args))
+
+    def run_jobs(self):
+        while True:
+            fn, args = self.jobs.get()
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Desktop Error: {e}")
+                self.root.after(0, self.show_error, str(e))
+
+    def show_error(self, message):
+        self.lbl_status.config(text=f"⚠️ Error: {message}", fg=STATUS_DANGER)
+        if not self.batch_running:
+            self.btn_check.config(state="normal", text="🔍 CHECK ACCESS")
+
+    def warm_up_models(self):
+        if self.remote is not None:
+            self.plate_files = self.load_plate_files()
+            if self.remote.ready():
+                message = f"Connected to {REMOTE_URL}."
+            else:
+                message = f"Server {REMOTE_URL} is not ready yet."
+        else:
+            core.warm_up()
+            message = "Models loaded."
+        self.root.after(0, self.on_models_ready, message)
+
+    def on_models_ready(self, message):
+        if self.current_image_path is None and not self.batch_running:
+            self.lbl_status.config(text=f"{message} Waiting for image selection...")
+
+    def load_plate_files(self):
+        """{plate: file_name} from the local CSV, for remote-mode DB images."""
+        if not os.path.exists(CSV_PATH):
+            return {}
+        try:
+            return read_plate_csv(CSV_PATH)
+        except Exception as e:
+            print(f"Error loading CSV: {e}")
+            return {}
+
+    # --- Worker-side image loading (cached) ---
+
+    def load_frame(self, path):
+        key = file_key(path)
+        if key is None:
+            return None
+        img = self.frames.get(key)
+        if img is None:
+            img = cv2.imread(path)
+            if img is not None:
+                self.frames.put(key, img)
+        return img
+
+    def make_thumbnail(self, img):
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        img_pil = Image.fromarray(img)
+        img_pil.thumbnail(self.box_size, Image.Resampling.LANCZOS)
+        return img_pil
+
+    def thumbnail(self, path, boxes=()):
+        """Display-size PIL image of `path` with the result boxes drawn."""
+        key = file_key(path)
+        if key is None:
+            return None
+        thumb = self.thumbs.get((key, boxes))
+        if thumb is None:
+            img = self.load_frame(path)
+            if img is None:
+                return None
+            if boxes:
+                img = img.copy()
+                for x_min, y_min, x_max, y_max, color in boxes:
+                    cv2.rectangle(img, (x_min, y_min), (x_max, y_max), color, 4)
+            thumb = self.make_thumbnail(img)
+            self.thumbs.put((key, boxes), thumb)
+        return thumb
+
+    def db_thumbnail(self, file_name):
+        if not file_name:
+            return None
+        key = file_key(os.path.join(self.db_dir, file_name))
+        if key is None:
+            return None
+        thumb = self.db_images.get(key)
+        if thumb is None:
+            img = cv2.imread(key[0])
+            if img is None:
+                return None
+            thumb = self.make_thumbnail(img)
+            self.db_images.put(key, thumb)
+        return thumb
+
+    def show_image(self, thumb, label_widget):
+        img_tk = ImageTk.PhotoImage(thumb)
+        label_widget.config(image=img_tk, text="")
+        label_widget.image = img_tk
+
+    # --- Single image ---
+
     def browse_image(self):
         file_path = filedialog.askopenfilename(
             filetypes=[("Images", "*.jpg;*.jpeg;*.png;*.bmp")]
         )
         if file_path:
             self.current_image_path = file_path
-            self.display_image(file_path, self.lbl_img_left)
+            self.submit(self.load_preview, file_path)
             self.lbl_status.config(
                 text="Image Loaded. Ready to Check Access.", fg=TEXT_LIGHT
             )
             self.btn_check.config(state="normal", bg=ACCENT_PRIMARY)
             self.lbl_img_right.config(image="", text="Database Match")
 
-    def display_image(self, img_source, label_widget):
-        if isinstance(img_source, str):
-            if not os.path.exists(img_source):
-                return
-            img = cv2.imread(img_source)
-        else:
-            img = img_source
+    def load_preview(self, path):
+        thumb = self.thumbnail(path)
+        if thumb is not None:
+            self.root.after(0, self.show_preview, path, thumb)
 
-        if img is None:
-            return
-
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        img_pil = Image.fromarray(img)
-        img_pil.thumbnail(self.box_size, Image.Resampling.LANCZOS)
-        img_tk = ImageTk.PhotoImage(img_pil)
-
-        label_widget.config(image=img_tk, text="")
-        label_widget.image = img_tk
+    def show_preview(self, path, thumb):
+        # A newer selection may have been made while this one loaded
+        if path == self.current_image_path:
+            self.show_image(thumb, self.lbl_img_left)
 
-    def start_check_thread(self):
+    def start_check(self):
+        if self.current_image_path is None:
+            return
         self.btn_check.config(state="disabled", text="PROCESSING...")
         self.lbl_status.config(text="Reading License Plate...", fg=STATUS_WARN)
-        thread = threading.Thread(target=self.run_local_check)
-        thread.start()
+        self.submit(self.run_local_check, self.current_image_path)
 
-    def run_local_check(self):
-        if self.current_image_path is None:
-            return
-        img = cv2.imread(self.current_image_path)
+    def scan_image(self, path):
+        """OCR + allowlist match for one file, locally or on the server."""
+        img = self.load_frame(path)
         if img is None:
-            return
-
-        ocr_results = core.reader.readtext(img)
-
-        best_conf = 0.0
-        result = {
-            "matched": False,
-            "plate": None,
-            "annotated_image": img.copy(),
-            "db_image_path": None,
-            "msg": "No Text Detected",
-        }
-
-        found_match = False
-
-        for bbox, text, prob in ocr_results:
-            prob = float(prob)
-            if len(text) < 3:
-                continue
-
-            (tl, tr, br, bl) = bbox
-            x_min, x_max = int(min(tl[0], bl[0])), int(max(tr[0], br[0]))
-            y_min, y_max = int(min(tl[1], tr[1])), int(max(bl[1], br[1]))
-
-            matched_key, match_score = core.find_best_match(text, core.DB_KEYS)
-
-            if matched_key:
-                cv2.rectangle(
-                    result["annotated_image"],
-                    (x_min, y_min),
-                    (x_max, y_max),
-                    (0, 255, 0),
-                    4,
-                )
-
-                result["matched"] = True
-                result["plate"] = matched_key
-                result["msg"] = f"ACCESS GRANTED ({matched_key})"
-
-                filename = core.PLATE_DATABASE.get(matched_key)
-                if filename:
-                    full_path = os.path.join(self.db_dir, filename)
-                    if os.path.exists(full_path):
-                        result["db_image_path"] = full_path
-
-                found_match = True
-                break
-
-            else:
-                if prob > best_conf:
-                    best_conf = prob
-                    clean_txt = core.cleanup_text(text)
-                    result["plate"] = clean_txt
-                    result["msg"] = f"ACCESS DENIED | Detected: {clean_txt}"
-                    cv2.rectangle(
-                        result["annotated_image"],
-                        (x_min, y_min),
-                        (x_max, y_max),
-                        (0, 0, 255),
-                        4,
-                    )
-
-        self.root.after(0, self.update_ui_results, result)
-
-    def update_ui_results(self, res):
-        self.display_image(res["annotated_image"], self.lbl_img_left)
-
-        if res["db_image_path"]:
-            self.display_image(res["db_image_path"], self.lbl_img_right)
+            return new_scan_result(path, "Failed to load image.")
+        if self.remote is not None:
+            return self.scan_remote(path, img)
+        return self.scan_local(path, img)
+
+    def scan_remote(self, path, img):
+        return scan_result(path, self.remote.scan(img), self.plate_files)
+
+    def scan_local(self, path, img):
+        # Same gate, OCR and plate voting as the server; OCR runs on the
+        # downscaled / ROI frame and the box is mapped back to the original
+        ocr_img, transform = core.PREPROCESS.apply(img)
+        res = core.process_image_from_memory(ocr_img)
+        return scan_result(path, map_result_box(res, transform), core.PLATE_DATABASE)
+
+    def run_local_check(self, path):
+        result = self.scan_image(path)
+        thumb = self.thumbnail(path, result["boxes"])
+        db_thumb = self.db_thumbnail(result["db_file"])
+        self.root.after(0, self.update_ui_results, result, thumb, db_thumb)
+
+    def show_result(self, res, thumb, db_thumb):
+        if thumb is not None:
+            self.show_image(thumb, self.lbl_img_left)
+
+        if db_thumb is not None:
+            self.show_image(db_thumb, self.lbl_img_right)
         else:
             self.lbl_img_right.config(image="", text="No Database Image Found")
 
         if res["matched"]:
             self.lbl_status.config(text=f"✅ {res['msg']}", fg=STATUS_SUCCESS)
-            self.btn_check.config(bg=ACCENT_PRIMARY)
         else:
             self.lbl_status.config(text=f"⛔ {res['msg']}", fg=STATUS_DANGER)
-            self.btn_check.config(bg=ACCENT_PRIMARY)
 
-        self.btn_check.config(state="normal", text="🔍 CHECK ACCESS")
+    def update_ui_results(self, res, thumb, db_thumb):
+        self.show_result(res, thumb, db_thumb)
+        self.btn_check.config(
+            state="normal", text="🔍 CHECK ACCESS", bg=ACCENT_PRIMARY
+        )
+
+    # --- Folder batch mode ---
+
+    def browse_folder(self):
+        if self.batch_running:
+            self.cancel_batch.set()
+            self.btn_folder.config(state="disabled", text="STOPPING...")
+            return
+        folder = filedialog.askdirectory()
+        if not folder:
+            return
+        paths = list_images(folder)
+        if not paths:
+            self.lbl_status.config(text="No images found in folder.", fg=STATUS_WARN)
+            return
+
+        self.tree.delete(*self.tree.get_children())
+        self.batch_results.clear()
+        self.progress.config(maximum=len(paths), value=0)
+        self.batch_running = True
+        self.cancel_batch.clear()
+        self.btn_folder.config(text="⏹ STOP BATCH")
+        self.btn_browse.config(state="disabled")
+        self.btn_check.config(state="disabled")
+        self.lbl_status.config(text=f"Batch: 0/{len(paths)} scanned...", fg=STATUS_WARN)
+        self.submit(self.run_batch_step, paths, 0, 0)
+
+    def run_batch_step(self, paths, index, granted):
+        """
+        Scans one image, then queues the next one, so previews of rows the
+        operator selects run in between instead of after the whole folder.
+        """
+        if self.cancel_batch.is_set() or index >= len(paths):
+            self.root.after(0, self.finish_batch, index, len(paths), granted)
+            return
+        try:
+            result = self.scan_image(paths[index])
+        except Exception as e:
+            print(f"Desktop Error: {e}")
+            result = new_scan_result(paths[index], f"OCR Error: {e}")
+        granted += result["matched"]
+        done = index + 1
+        self.root.after(0, self.add_batch_row, result, done, len(paths), granted)
+        self.submit(self.run_batch_step, paths, done, granted)
+
+    def add_batch_row(self, result, done, total, granted):
+        tag = "granted" if result["matched"] else "denied"
+        item = self.tree.insert(
+            "",
+            "end",
+            values=(
+                os.path.basename(result["path"]),
+                result["plate"] or "-",
+                "GRANTED" if result["matched"] else result["msg"].split(" |")[0],
+            ),
+            tags=(tag,),
+        )
+        self.batch_results[item] = result
+        self.tree.see(item)
+        self.progress.config(value=done)
+        self.lbl_status.config(
+            text=f"Batch: {done}/{total} scanned, {granted} granted...", fg=STATUS_WARN
+        )
+
+    def finish_batch(self, done, total, granted):
+        self.batch_running = False
+        stopped = " (stopped)" if done < total else ""
+        self.lbl_status.config(
+            text=f"Batch done{stopped}: {done}/{total} scanned, {granted} granted.",
+            fg=TEXT_LIGHT,
+        )
+        self.btn_folder.config(state="normal", text="📁 SCAN FOLDER")
+        self.btn_browse.config(state="normal")
+        if self.current_image_path is not None:
+            self.btn_check.config(state="normal")
+
+    def on_batch_select(self, event):
+        selection = self.tree.selection()
+        if selection:
+            self.submit(self.load_batch_result, self.batch_results[selection[0]])
+
+    def load_batch_result(self, result):
+        thumb = self.thumbnail(result["path"], result["boxes"])
+        db_thumb = self.db_thumbnail(result["db_file"])
+        self.root.after(0, self.show_result, result, thumb, db_thumb)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,267 @@
+import asyncio
+import importlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import scan_service
+from ingest import UploadError, parse_upload
+from worker_pool import PoolBusy
+
+# ASGI entry point for either pipeline: uploads are read on the event loop,
+# so slow clients and idle keep-alive connections only cost a coroutine, and
+# inference runs on a bounded thread executor (or the ALPR_WORKERS pool).
+# Run one server process: `python asgi_server.py` or
+# `uvicorn asgi_server:app --timeout-keep-alive 5`.
+PIPELINE = os.environ.get("ALPR_ASGI_PIPELINE", "alpr_server")
+# Importing the pipeline plugs its detect/OCR stage into scan_service
+importlib.import_module(PIPELINE)
+
+PORT = int(os.environ.get("ALPR_PORT", "5000"))
+MAX_UPLOAD_BYTES = scan_service.MAX_UPLOAD_BYTES
+READ_TIMEOUT_SECONDS = float(os.environ.get("ALPR_READ_TIMEOUT", "10"))
+SCAN_TIMEOUT_SECONDS = float(os.environ.get("ALPR_SCAN_TIMEOUT", "30"))
+KEEP_ALIVE_SECONDS = 5
+
+# In-process mode runs INFERENCE_THREADS scans at once with up to
+# INFERENCE_QUEUE waiting; in pool mode the threads only wait on workers
+# and the pool's own queue limit applies.
+if scan_service.WORKERS > 0:
+    INFERENCE_THREADS = scan_service.WORKERS + scan_service.QUEUE_SIZE
+    INFERENCE_QUEUE = 0
+else:
+    INFERENCE_THREADS = int(os.environ.get("ALPR_INFERENCE_THREADS", "1"))
+    INFERENCE_QUEUE = int(os.environ.get("ALPR_INFERENCE_QUEUE", "8"))
+EXECUTOR = ThreadPoolExecutor(max_workers=INFERENCE_THREADS)
+# Scans accepted and not yet finished on the executor; a scan given up on
+# (timeout, disconnect) keeps its slot until its job actually stops
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+CORS_HEADERS = [(b"access-control-allow-origin", b"*")]
+
+
+class ClientGone(Exception):
+    pass
+
+
+async def send_response(send, status, body, content_type, headers=()):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", content_type.encode("latin-1")),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                *CORS_HEADERS,
+                *headers,
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_json(send, route, data, status=200, headers=()):
+    scan_service.METRICS.observe_request(route, status)
+    body = json.dumps(data).encode("utf-8")
+    await send_response(send, status, body, "application/json", headers)
+
+
+async def read_body(scope, receive):
+    """
+    Reads the request body as it streams in, refusing it early when
+    Content-Length (or the bytes received so far) exceed MAX_UPLOAD_BYTES.
+    """
+    headers = dict(scope["headers"])
+    length = headers.get(b"content-length")
+    if length is not None:
+        try:
+            length = int(length)
+        except ValueError:
+            raise UploadError("Invalid Content-Length")
+        if length < 0:
+            raise UploadError("Invalid Content-Length")
+        if length > MAX_UPLOAD_BYTES:
+            raise UploadError("Upload too large", 413)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + READ_TIMEOUT_SECONDS
+    # Preallocated when the length is known, so chunks are copied in once
+    body = bytearray(length) if length is not None else bytearray()
+    received = 0
+    while True:
+        try:
+            message = await asyncio.wait_for(receive(), deadline - loop.time())
+        except asyncio.TimeoutError:
+            raise UploadError("Upload timed out", 408)
+        if message["type"] == "http.disconnect":
+            raise ClientGone()
+        chunk = message.get("body", b"")
+        if received + len(chunk) > MAX_UPLOAD_BYTES:
+            raise UploadError("Upload too large", 413)
+        if length is not None and received + len(chunk) > length:
+            raise UploadError("Body longer than Content-Length")
+        body[received : received + len(chunk)] = chunk
+        received += len(chunk)
+        if not message.get("more_body", False):
+            if received != len(body):
+                raise UploadError("Incomplete upload")
+            return body
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def take_slot():
+    global _in_flight
+    with _in_flight_lock:
+        if _in_flight >= INFERENCE_THREADS + INFERENCE_QUEUE:
+            return False
+        _in_flight += 1
+        return True
+
+
+def release_slot(_job):
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight -= 1
+
+
+async def run_scan(receive, upload, start):
+    """
+    Runs scan_service.scan_upload on the executor in a slot taken with
+    take_slot(). Gives up on timeout or when the client disconnects; a scan
+    still queued is then cancelled and never reaches the models. The slot is
+    freed when the executor job stops, so a scan that was given up on but
+    keeps running still counts against the capacity.
+    """
+    try:
+        job = EXECUTOR.submit(scan_service.scan_upload, upload, start)
+    except Exception:
+        release_slot(None)
+        raise
+    job.add_done_callback(release_slot)
+    scan = asyncio.wrap_future(job)
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        done, _ = await asyncio.wait(
+            {scan, disconnect},
+            timeout=SCAN_TIMEOUT_SECONDS,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+    finally:
+        disconnect.cancel()
+    if scan in done:
+        return scan.result()
+    # Only succeeds while the job is queued; a running scan finishes in the
+    # background and frees its slot then
+    job.cancel()
+    scan.cancel()
+    if disconnect in done:
+        raise ClientGone()
+    raise asyncio.TimeoutError()
+
+
+async def scan(scope, receive, send):
+    start = time.perf_counter()
+    try:
+        body = await read_body(scope, receive)
+        headers = {
+            name.decode("latin-1").lower(): value.decode("latin-1")
+            for name, value in scope["headers"]
+        }
+        query_string = scope["query_string"].decode("latin-1")
+        query = {name: values[0] for name, values in parse_qs(query_string).items()}
+        upload = parse_upload(body, headers.get("content-type"), headers, query)
+    except UploadError as e:
+        await send_json(send, "/scan", {"error": str(e)}, e.status)
+        return
+
+    if not take_slot():
+        await send_busy(send)
+        return
+    try:
+        data, timings = await run_scan(receive, upload, start)
+    except PoolBusy:
+        await send_busy(send)
+        return
+    except asyncio.TimeoutError:
+        await send_json(send, "/scan", {"error": "Scan timed out"}, 504)
+        return
+
+    if query.get("timings", "0") not in ("0", "", "false"):
+        data["timings"] = scan_service.round_timings(timings)
+        data["lookups"] = scan_service.lookup_counts(timings)
+    await send_json(send, "/scan", data)
+
+
+async def send_busy(send):
+    retry_after = str(scan_service.RETRY_AFTER_SECONDS).encode("latin-1")
+    await send_json(
+        send,
+        "/scan",
+        {"error": "Server busy, retry later"},
+        503,
+        [(b"retry-after", retry_after)],
+    )
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            scan_service.init()
+            # Warm up in the background; /ready reports 503 until it is done
+            threading.Thread(target=scan_service.start_warm_up, daemon=True).start()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            EXECUTOR.shutdown(wait=False, cancel_futures=True)
+            if scan_service.POOL is not None:
+                scan_service.POOL.shutdown()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    method, path = scope["method"], scope["path"]
+    try:
+        if method == "OPTIONS":
+            headers = [
+                (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+                (b"access-control-allow-headers", b"*"),
+            ]
+            await send_response(send, 204, b"", "text/plain", headers)
+        elif (method, path) == ("POST", "/scan"):
+            await scan(scope, receive, send)
+        elif (method, path) == ("GET", "/ready"):
+            ready = scan_service.MODELS_READY.is_set()
+            await send_json(send, "/ready", {"ready": ready}, 200 if ready else 503)
+        elif (method, path) == ("GET", "/metrics"):
+            scan_service.METRICS.observe_request("/metrics", 200)
+            body = scan_service.METRICS.render().encode("utf-8")
+            content_type = scan_service.METRICS.registry.content_type
+            await send_response(send, 200, body, content_type)
+        else:
+            await send_json(send, "unmatched", {"error": "Not found"}, 404)
+    except ClientGone:
+        # Nobody is left to answer
+        scan_service.METRICS.observe_request(path, 499)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # One process: scale inference with ALPR_WORKERS, not uvicorn workers,
+    # which would each load their own models.
+    uvicorn.run(app, host="0.0.0.0", port=PORT, timeout_keep_alive=KEEP_ALIVE_SECONDS)
@@ -0,0 +1,338 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+
+import cv2
+
+from worker_pool import start_pool
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".ts")
+PIPELINES = ("alpr_server", "test")
+OUTPUT_PATH = "./batch_scan.jsonl"
+# Columns of the CSV output; JSONL records carry the same keys
+FIELDS = (
+    "item",
+    "success",
+    "matched",
+    "plate",
+    "matched_plate",
+    "detected_plate",
+    "confidence",
+    "plate_box",
+    "rejected",
+    "message",
+)
+# Video frames are sent to the workers re-encoded at this JPEG quality
+VIDEO_JPEG_QUALITY = 95
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def walk_files(root):
+    for folder, dirs, files in os.walk(root):
+        dirs.sort()
+        for name in sorted(files):
+            yield os.path.join(folder, name)
+
+
+def expand_inputs(inputs):
+    """Image and video paths from directories (recursive), globs and files."""
+    paths = []
+    for spec in inputs:
+        if os.path.isdir(spec):
+            paths.extend(walk_files(spec))
+        elif os.path.isfile(spec):
+            paths.append(spec)
+        else:
+            matches = sorted(glob.glob(spec, recursive=True))
+            if not matches:
+                print(f"Nothing matches {spec}")
+            paths.extend(m for m in matches if os.path.isfile(m))
+    return [
+        p for p in paths if p.lower().endswith(IMAGE_EXTENSIONS + VIDEO_EXTENSIONS)
+    ]
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def encode_frame(frame, quality):
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Could not encode frame")
+    return buf.tobytes()
+
+
+def iter_video(path, stride, done, quality):
+    """Every `stride`-th frame of a video as path#frame_index items."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        print(f"Could not open video {path}")
+        return
+    index = 0
+    try:
+        # grab() skips a frame without converting it; retrieve() only for
+        # the frames that are kept
+        while cap.grab():
+            item = f"{path}#{index}"
+            if index % stride == 0 and item not in done:
+                ok, frame = cap.retrieve()
+                if ok:
+                    yield item, partial(encode_frame, frame, quality)
+            index += 1
+    finally:
+        cap.release()
+
+
+def iter_items(paths, done, stride=1, quality=VIDEO_JPEG_QUALITY):
+    """
+    (item, loader) pairs in input order, skipping items in `done`; loader()
+    returns the encoded image and runs on the prefetch pool. Videos are
+    read here, sequentially.
+    """
+    for path in paths:
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            yield from iter_video(path, stride, done, quality)
+        elif path not in done:
+            yield path, partial(read_file, path)
+
+
+def drop_partial_line(path):
+    # A run killed mid-write leaves a partial last record; cut it off so it
+    # is scanned again
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+        size = min(end, 1 << 16)
+        f.seek(end - size)
+        cut = f.read(size).rfind(b"\n")
+        f.truncate(end - size + cut + 1 if cut >= 0 else 0)
+
+
+def load_done(path, fmt):
+    """Items already written to `path` by an earlier (interrupted) run."""
+    if not os.path.exists(path):
+        return set()
+    drop_partial_line(path)
+    with open(path, encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            return {row["item"] for row in csv.DictReader(f)}
+        return {json.loads(line)["item"] for line in f if line.strip()}
+
+
+class ResultWriter:
+    """Appends records to a JSONL or CSV file; flush() after every batch."""
+
+    def __init__(self, path, fmt):
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.f = open(path, "a", encoding="utf-8", newline="")
+        self.csv = None
+        if fmt == "csv":
+            self.csv = csv.DictWriter(self.f, FIELDS, lineterminator="\n")
+            if is_new:
+                self.csv.writeheader()
+
+    def write(self, record):
+        if self.csv is None:
+            self.f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            return
+        box = record["plate_box"]
+        self.csv.writerow({**record, "plate_box": json.dumps(box) if box else ""})
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+def make_record(item, result):
+    record = {"item": item}
+    for field in FIELDS[1:]:
+        record[field] = result.get(field)
+    record["plate"] = result["matched_plate"] or result["detected_plate"]
+    record["rejected"] = bool(result.get("rejected"))
+    return record
+
+
+def failed_record(item, message):
+    return make_record(
+        item,
+        {
+            "success": False,
+            "matched": False,
+            "matched_plate": None,
+            "detected_plate": None,
+            "confidence": 0.0,
+            "plate_box": None,
+            "message": message,
+        },
+    )
+
+
+def run_batch_scan(
+    inputs,
+    output=OUTPUT_PATH,
+    fmt=None,
+    pipeline="alpr_server",
+    workers=1,
+    batch_size=8,
+    io_threads=8,
+    stride=1,
+    fresh=False,
+):
+    """
+    Scans every image / video frame in `inputs` with `pipeline` on a
+    process pool, `batch_size` frames per batched call, and appends one
+    record per item to `output` as it finishes. Items already in `output`
+    are skipped, so an interrupted run continues where it stopped.
+    """
+    fmt = fmt or ("csv" if output.lower().endswith(".csv") else "jsonl")
+    if fresh and os.path.exists(output):
+        os.remove(output)
+    done = load_done(output, fmt)
+    if done:
+        print(f"Resuming: {len(done)} items already in {output}")
+
+    paths = expand_inputs(inputs)
+    print(f"{len(paths)} input files, {workers} workers, batches of {batch_size}")
+    items = iter_items(paths, done, stride)
+
+    # Two batches per worker in flight, and loaders prefetching the next
+    # ones, so the workers never wait on disk or video decode
+    max_pending = workers * 2
+    # Every worker is spawned (and its models loaded) before the clock starts
+    pool = start_pool(pipeline, workers, max_pending - workers)
+
+    writer = ResultWriter(output, fmt)
+    prefetch_size = batch_size * (max_pending + 1)
+    prefetch = deque()
+    pending = {}
+    counts = {"scanned": 0, "matched": 0, "rejected": 0, "failed": 0}
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=io_threads) as loaders:
+
+        def fill_prefetch():
+            while len(prefetch) < prefetch_size:
+                entry = next(items, None)
+                if entry is None:
+                    return
+                item, loader = entry
+                prefetch.append((item, loaders.submit(loader)))
+
+        try:
+            while True:
+                fill_prefetch()
+                while len(pending) < max_pending and prefetch:
+                    batch_items, blobs = [], []
+                    while prefetch and len(blobs) < batch_size:
+                        item, future = prefetch.popleft()
+                        try:
+                            data = future.result()
+                        except (OSError, ValueError, cv2.error) as e:
+                            writer.write(failed_record(item, f"Read Error: {e}"))
+                            counts["failed"] += 1
+                            continue
+                        if not data:
+                            writer.write(failed_record(item, "Empty file."))
+                            counts["failed"] += 1
+                            continue
+                        blobs.append(data)
+                        batch_items.append(item)
+                    if blobs:
+                        pending[pool.submit_batch(blobs)] = batch_items
+                    fill_prefetch()
+                if not pending:
+                    break
+
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    batch_items = pending.pop(future)
+                    try:
+                        results, _ = future.result()
+                    except Exception as e:
+                        # Not written, so the next run retries these items
+                        print(f"Batch of {len(batch_items)} failed: {e}")
+                        counts["failed"] += len(batch_items)
+                        continue
+                    for item, result in zip(batch_items, results):
+                        writer.write(make_record(item, result))
+                        counts["scanned"] += 1
+                        counts["matched"] += bool(result["matched"])
+                        counts["rejected"] += bool(result.get("rejected"))
+                writer.flush()
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{counts['scanned']} scanned, {counts['matched']} matched "
+                    f"({counts['scanned'] / elapsed:.1f} images/s)"
+                )
+        finally:
+            writer.close()
+            pool.shutdown()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Done in {elapsed:.1f}s: {counts['scanned']} scanned, "
+        f"{counts['matched']} matched, {counts['rejected']} rejected early, "
+        f"{counts['failed']} failed. Results in {output}"
+    )
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Offline ALPR over image folders, globs and video files"
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="directories (recursive), glob patterns or files"
+    )
+    parser.add_argument("--output", default=OUTPUT_PATH, help=".jsonl or .csv")
+    parser.add_argument(
+        "--format", choices=("jsonl", "csv"), help="default: from --output"
+    )
+    parser.add_argument("--pipeline", choices=PIPELINES, default="alpr_server")
+    parser.add_argument(
+        "--workers", type=positive_int, default=max(1, (os.cpu_count() or 1) // 2)
+    )
+    parser.add_argument("--batch-size", type=positive_int, default=8)
+    parser.add_argument(
+        "--io-threads", type=positive_int, default=8, help="file reads / frame encodes"
+    )
+    parser.add_argument(
+        "--stride", type=positive_int, default=1, help="scan every N-th video frame"
+    )
+    parser.add_argument(
+        "--fresh", action="store_true", help="overwrite instead of resuming"
+    )
+    args = parser.parse_args()
+
+    run_batch_scan(
+        args.inputs,
+        args.output,
+        args.format,
+        args.pipeline,
+        args.workers,
+        args.batch_size,
+        args.io_threads,
+        args.stride,
+        args.fresh,
+    )
@@ -0,0 +1,314 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import pandas as pd
+
+from plate_store import COL_IMG, COL_PLATE, clean_plates
+from worker_pool import start_pool
+
+IMAGE_FOLDER = "./Rdata/raw_data"
+CSV_PATH = "./Rdata/labels.csv"
+OUTPUT_PATH = "./bench_pipeline.json"
+# name -> (pipeline module, environment for its workers)
+# alpr_server: OCR on the full frame; alpr_server_reduced: the same with the
+# downscale stage on; alpr_server_fp32: OCR without INT8 quantization;
+# alpr_server_plate / test_plate: the plate OCR profile (ocr_profile.py);
+# alpr_server_gate: the plate-presence check before OCR (plate_gate.py);
+# test: YOLO plate crops + OCR; test_recognize: crops sent straight to the
+# recognizer; test_onnx / test_int8: the exported detector in FP32 and
+# statically quantized (plate_detector.py export / quantize)
+PIPELINES = {
+    "alpr_server": ("alpr_server", {"ALPR_OCR_LONG_SIDE": "0"}),
+    "alpr_server_reduced": ("alpr_server", {"ALPR_OCR_LONG_SIDE": "1600"}),
+    "alpr_server_fp32": ("alpr_server", {"ALPR_OCR_PRECISION": "fp32"}),
+    "alpr_server_plate": ("alpr_server", {"ALPR_OCR_PROFILE": "plate"}),
+    "alpr_server_gate": ("alpr_server", {"ALPR_GATE": "1"}),
+    "test": ("test", {"ALPR_OCR_MODE": "readtext"}),
+    "test_recognize": ("test", {"ALPR_OCR_MODE": "recognize"}),
+    "test_plate": ("test", {"ALPR_OCR_PROFILE": "plate"}),
+    "test_onnx": ("test", {"ALPR_MODEL_PATH": "./plate_model.onnx"}),
+    "test_int8": ("test", {"ALPR_MODEL_PATH": "./plate_model.int8.onnx"}),
+}
+BASELINE = "alpr_server"
+# Variants also compared with their closest full-precision counterpart, so
+# the accuracy cost of reduced precision is reported on its own
+REFERENCES = {
+    "alpr_server_fp32": "alpr_server",
+    "test_plate": "test",
+    "test_onnx": "test",
+    "test_int8": "test_onnx",
+}
+STAGES = ("decode_ms", "gate_ms", "detect_ms", "ocr_ms", "match_ms", "total_ms")
+PERCENTILES = (50, 95, 99)
+
+
+def load_ground_truth(csv_path):
+    df = pd.read_csv(csv_path, dtype=str, usecols=[COL_IMG, COL_PLATE])
+    files = df[COL_IMG].fillna("").str.strip()
+    return dict(zip(files, clean_plates(df[COL_PLATE])))
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank, so every reported value is an observed latency
+    if not sorted_values:
+        return None
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+
+def load_checkpoint(path):
+    """Records already written by an earlier (possibly interrupted) run."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Last line of a run that was killed mid-write
+                continue
+            done[(record["pipeline"], record["image"])] = record
+    return done
+
+
+def terminate_last_line(path):
+    # A run killed mid-write leaves a partial line; don't append onto it
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def make_record(pipeline, image, truth, result, timings):
+    if result["matched"]:
+        detected = result["matched_plate"]
+    else:
+        detected = result["detected_plate"]
+    return {
+        "pipeline": pipeline,
+        "image": image,
+        "truth": truth,
+        "detected": detected,
+        "matched": result["matched"],
+        "rejected": result.get("rejected", False),
+        "correct": bool(result["matched"] and result["matched_plate"] == truth),
+        "message": result["message"],
+        "timings": timings,
+    }
+
+
+def worker_threads(workers):
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def run_pipeline(pipeline, images, ground_truth, workers, checkpoint):
+    """Scans `images` with one pipeline on a process pool, appending records."""
+    module_name, env = PIPELINES[pipeline]
+    # Spawned workers copy os.environ, which is where the pipelines read config
+    saved = os.environ.copy()
+    os.environ.update(env)
+    window = workers * 4
+    # Every worker is spawned (and its models loaded) before the clock starts
+    try:
+        pool = start_pool(
+            module_name, workers, window - workers, worker_threads(workers)
+        )
+    finally:
+        # Workers have their copy; the next variant must not inherit it
+        os.environ.clear()
+        os.environ.update(saved)
+    start = time.perf_counter()
+    pending = {}
+    queue = iter(images)
+    finished = 0
+    try:
+        while True:
+            # Bounded in-flight window, so a large dataset is not read at once
+            for image in queue:
+                with open(os.path.join(IMAGE_FOLDER, image), "rb") as f:
+                    pending[pool.submit_scan(f.read())] = image
+                if len(pending) >= window:
+                    break
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                image = pending.pop(future)
+                result, timings = future.result()
+                record = make_record(
+                    pipeline, image, ground_truth[image], result, timings
+                )
+                checkpoint.write(json.dumps(record, ensure_ascii=False) + "\n")
+                checkpoint.flush()
+                finished += 1
+                status = "MATCH" if record["correct"] else "FAIL"
+                print(
+                    f"[{pipeline} {finished}/{len(images)}] {image:<20} | "
+                    f"{record['truth']:<12} | {record['detected'] or 'NONE':<12} | "
+                    f"{status} | {timings['total_ms']:.0f} ms"
+                )
+    finally:
+        pool.shutdown()
+    return time.perf_counter() - start
+
+
+def compare(stats, base):
+    p50 = stats["latency_ms"]["total_ms"]["p50"]
+    base_p50 = base["latency_ms"]["total_ms"]["p50"]
+    return {
+        "accuracy_delta": stats["accuracy"] - base["accuracy"],
+        "total_p50_speedup": round(base_p50 / p50, 2) if p50 else None,
+    }
+
+
+def missing_model(pipeline):
+    """Model file a variant needs that has not been exported yet, or None."""
+    model_path = PIPELINES[pipeline][1].get("ALPR_MODEL_PATH")
+    if model_path is not None and not os.path.exists(model_path):
+        return model_path
+    return None
+
+
+def summarize(records, run_seconds):
+    summary = {}
+    for pipeline in PIPELINES:
+        rows = [r for r in records if r["pipeline"] == pipeline]
+        if not rows:
+            continue
+        correct = sum(r["correct"] for r in rows)
+        # Granted, but to the wrong plate: the costly failure for a gate
+        wrong = sum(r["matched"] and not r["correct"] for r in rows)
+        # Every benchmark image shows a plate, so these are false rejections
+        rejected = sum(r.get("rejected", False) for r in rows)
+        latency = {}
+        for stage in STAGES:
+            values = sorted(r["timings"][stage] for r in rows if stage in r["timings"])
+            if not values:
+                continue
+            latency[stage] = {
+                f"p{pct}": round(percentile(values, pct), 2) for pct in PERCENTILES
+            }
+            latency[stage]["mean"] = round(sum(values) / len(values), 2)
+        summary[pipeline] = {
+            "images": len(rows),
+            "correct": correct,
+            "wrong_match": wrong,
+            "rejected": rejected,
+            "accuracy": correct / len(rows),
+            "latency_ms": latency,
+            "run_seconds": round(run_seconds.get(pipeline, 0.0), 2),
+        }
+
+    # Speed and accuracy of each variant relative to the full-frame baseline
+    # and to its reference variant
+    for pipeline, stats in summary.items():
+        for base in (BASELINE, REFERENCES.get(pipeline)):
+            if base is None or base == pipeline or base not in summary:
+                continue
+            stats[f"vs_{base}"] = compare(stats, summary[base])
+    return summary
+
+
+def print_summary(summary):
+    print("=" * 78)
+    for pipeline, stats in summary.items():
+        print(
+            f"{pipeline}: {stats['correct']}/{stats['images']} correct "
+            f"({stats['accuracy'] * 100:.2f}%), {stats['wrong_match']} wrong matches, "
+            f"{stats['rejected']} rejected early"
+        )
+        for stage, values in stats["latency_ms"].items():
+            cells = " | ".join(f"{k} {v:>8.1f}" for k, v in values.items())
+            print(f"    {stage:<10} {cells}")
+        for key, delta in stats.items():
+            if not key.startswith("vs_") or not delta["total_p50_speedup"]:
+                continue
+            print(
+                f"    vs {key[3:]}: {delta['total_p50_speedup']:.2f}x p50 speed, "
+                f"{delta['accuracy_delta'] * 100:+.2f} pts accuracy"
+            )
+
+
+def run_benchmark(pipelines, workers, output, limit=0, fresh=False):
+    ground_truth = load_ground_truth(CSV_PATH)
+    images = sorted(f for f in os.listdir(IMAGE_FOLDER) if f in ground_truth)
+    if limit:
+        images = images[:limit]
+
+    checkpoint_path = output + ".partial.jsonl"
+    if fresh and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    done = load_checkpoint(checkpoint_path)
+    if done:
+        print(f"Resuming: {len(done)} results found in {checkpoint_path}")
+
+    run_seconds = {}
+    terminate_last_line(checkpoint_path)
+    with open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+        for pipeline in pipelines:
+            missing = missing_model(pipeline)
+            if missing:
+                print(f"Skipping {pipeline}: {missing} not found")
+                continue
+            todo = [image for image in images if (pipeline, image) not in done]
+            if not todo:
+                continue
+            print(f"Running {pipeline} on {len(todo)} images with {workers} workers")
+            run_seconds[pipeline] = run_pipeline(
+                pipeline, todo, ground_truth, workers, checkpoint
+            )
+
+    done = load_checkpoint(checkpoint_path)
+    records = [
+        done[(pipeline, image)]
+        for pipeline in pipelines
+        for image in images
+        if (pipeline, image) in done
+    ]
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "image_folder": IMAGE_FOLDER,
+        "workers": workers,
+        # Intra-op threads of each worker's OCR and detector models
+        "threads_per_worker": worker_threads(workers),
+        "summary": summarize(records, run_seconds),
+        "records": records,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print_summary(report["summary"])
+    print(f"Wrote {output}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Accuracy and per-stage latency of the ALPR pipelines"
+    )
+    parser.add_argument(
+        "--pipeline", action="append", choices=PIPELINES, help="default: all"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=max(1, (os.cpu_count() or 1) // 2)
+    )
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--limit", type=int, default=0, help="first N images only")
+    parser.add_argument(
+        "--fresh", action="store_true", help="ignore results of an earlier run"
+    )
+    args = parser.parse_args()
+
+    run_benchmark(
+        args.pipeline or list(PIPELINES),
+        args.workers,
+        args.output,
+        args.limit,
+        args.fresh,
+    )
@@ -0,0 +1,183 @@
+import difflib
+import random
+import sys
+import time
+import tracemalloc
+
+from plate_array import ArrayPlateIndex
+from plate_index import MATCH_THRESHOLD, CanonicalPlateIndex, PlateIndex
+from plate_normalize import canonical_plate
+
+NUM_KEYS = 100_000
+NUM_QUERIES = 2_000
+NUM_VERIFY = 50
+NUM_ADDS = 5_000
+ARABIC_DIGITS = "٠١٢٣٤٥٦٧٨٩"
+ARABIC_LETTERS = "ابجدرسصطعقكلمنهوى"
+
+
+def linear_best_match(detected_clean, database_keys, max_len_diff=1):
+    # Reference: the original scan from find_best_match.
+    best_match = None
+    best_score = 0.0
+    for db_key in database_keys:
+        if abs(len(detected_clean) - len(db_key)) > max_len_diff:
+            continue
+        similarity = difflib.SequenceMatcher(None, detected_clean, db_key).ratio()
+        if similarity > MATCH_THRESHOLD and similarity > best_score:
+            best_score = similarity
+            best_match = db_key
+    return best_match, best_score
+
+
+def random_plate(rng):
+    digits = "".join(rng.choice(ARABIC_DIGITS) for _ in range(rng.randint(4, 6)))
+    letters = "".join(rng.choice(ARABIC_LETTERS) for _ in range(rng.randint(0, 3)))
+    return digits + letters
+
+
+def file_name(rng, i):
+    # Roboflow export names like those in Rdata/labels.csv (45-69 chars)
+    stem = rng.choice(
+        (f"{i}_JPG", f"IMG_2024{rng.randint(101, 1228):04d}_{i:06d}_jpg")
+    )
+    return f"{stem}.rf.{rng.getrandbits(128):032x}.jpg"
+
+
+def noisy(rng, plate):
+    # Simulate OCR errors: substitute, drop or insert one character.
+    chars = list(plate)
+    op = rng.choice(["sub", "del", "ins", "none"])
+    pos = rng.randrange(len(chars))
+    if op == "sub":
+        chars[pos] = rng.choice(ARABIC_DIGITS)
+    elif op == "del" and len(chars) > 3:
+        del chars[pos]
+    elif op == "ins":
+        chars.insert(pos, rng.choice(ARABIC_DIGITS))
+    return "".join(chars)
+
+
+def run_benchmark(num_keys=NUM_KEYS, seed=0, max_len_diff=1):
+    """
+    PlateIndex against the linear scan. The index stores deletions down to
+    key_depth = max_len_diff, as the pipelines build it; shallower indexes
+    fall back to scanning whole length buckets.
+    """
+    rng = random.Random(seed)
+    keys = list(dict.fromkeys(random_plate(rng) for _ in range(num_keys)))
+    queries = [noisy(rng, rng.choice(keys)) for _ in range(NUM_QUERIES)]
+
+    index, build_s, index_bytes = traced_build(
+        lambda keys: PlateIndex(keys, key_depth=max_len_diff), keys
+    )
+
+    start = time.perf_counter()
+    for query in queries:
+        index.find(query, max_len_diff)
+    lookup_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    sample = queries[:NUM_VERIFY]
+    start = time.perf_counter()
+    mismatches = 0
+    for query in sample:
+        expected = linear_best_match(query, keys, max_len_diff)
+        if expected != index.find(query, max_len_diff):
+            mismatches += 1
+    linear_ms = (time.perf_counter() - start) * 1000 / len(sample)
+
+    print(f"max_len_diff={max_len_diff}, key_depth={index.key_depth}")
+    print(
+        f"Keys: {len(keys)} | Build: {build_s:.2f}s, "
+        f"{index_bytes / len(keys):.0f} B/plate"
+    )
+    print(f"Indexed lookup: {lookup_ms:.3f} ms/query ({len(queries)} queries)")
+    print(f"Linear scan:    {linear_ms:.3f} ms/query ({len(sample)} queries)")
+    print(f"Speedup: {linear_ms / lookup_ms:.0f}x | Mismatches: {mismatches}")
+    return mismatches
+
+
+def traced_build(cls, keys):
+    # Bytes allocated while building (the key strings already exist); a
+    # small build first, so lazily imported modules are not counted
+    cls(list(keys)[:10])
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = cls(keys)
+    build_s = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return index, build_s, size
+
+
+def run_array_benchmark(num_keys=NUM_KEYS, seed=0):
+    """
+    ArrayPlateIndex against CanonicalPlateIndex (every query) and against
+    a linear difflib scan over the canonical plates (a sample).
+    """
+    rng = random.Random(seed)
+    keys = list(dict.fromkeys(random_plate(rng) for _ in range(num_keys)))
+    plates = {key: file_name(rng, i) for i, key in enumerate(keys)}
+    queries = [noisy(rng, rng.choice(keys)) for _ in range(NUM_QUERIES)]
+
+    canonical, canonical_s, canonical_bytes = traced_build(CanonicalPlateIndex, keys)
+    array, array_s, array_bytes = traced_build(ArrayPlateIndex, plates)
+
+    results = {}
+    for name, index in (("canonical", canonical), ("array", array)):
+        start = time.perf_counter()
+        results[name] = [(index.exact(q), index.find(q)) for q in queries]
+        lookup_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        print(f"{name:<9} exact + find: {lookup_ms:.3f} ms/query")
+    mismatches = sum(a != b for a, b in zip(results["canonical"], results["array"]))
+
+    # Plates added one by one (admin endpoint / PlateStore.add: the mapping
+    # entry, then the index)
+    added = {
+        random_plate(rng) + "X": file_name(rng, len(plates) + i)
+        for i in range(NUM_ADDS)
+    }
+    for name, index in (("canonical", canonical), ("array", array)):
+        start = time.perf_counter()
+        for key, name_on_disk in added.items():
+            if index is array:
+                array[key] = name_on_disk
+            else:
+                plates[key] = name_on_disk
+            index.add(key)
+        add_us = (time.perf_counter() - start) * 1e6 / len(added)
+        print(f"{name:<9} add: {add_us:.1f} us/plate ({len(added)} adds)")
+    mismatches += sum(array.get(key) != plates[key] for key in added)
+    keys = list(plates)
+
+    canon_keys = list(dict.fromkeys(canonical_plate(k) for k in keys))
+    for query in queries[:NUM_VERIFY]:
+        expected = linear_best_match(canonical_plate(query), canon_keys)
+        match, score = array.find(query)
+        found = (canonical_plate(match) if match else None, score)
+        if found != expected:
+            mismatches += 1
+
+    print(
+        f"Keys: {len(keys)} | Build: canonical {canonical_s:.2f}s, "
+        f"array {array_s:.2f}s"
+    )
+    # The memory backend also keeps the {plate: file_name} dict and its
+    # strings; the array backend holds plates and file names itself
+    dict_bytes = sys.getsizeof(plates) + sum(
+        sys.getsizeof(key) + sys.getsizeof(value) for key, value in plates.items()
+    )
+    print(
+        f"Memory: canonical + dict {(canonical_bytes + dict_bytes) / len(keys):.0f}"
+        f" B/plate, array {array_bytes / len(keys):.0f} B/plate "
+        f"({array.nbytes() / len(keys):.1f} B/plate in arrays)"
+    )
+    print(f"Mismatches: {mismatches}")
+    return mismatches
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_KEYS
+    mismatches = sum(run_benchmark(count, max_len_diff=diff) for diff in (1, 2))
+    mismatches += run_array_benchmark(count)
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,191 @@
+import base64
+import binascii
+import json
+import re
+
+import numpy as np
+
+BOUNDARY_RE = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+NAME_RE = re.compile(r'\bname="([^"]*)"', re.IGNORECASE)
+READ_CHUNK = 1 << 16
+# Pre-decoded frames from edge boxes: width * height * 3 bytes of BGR pixels
+RAW_FRAME_TYPES = ("application/x-raw-bgr", "image/x-raw-bgr")
+
+
+class UploadError(Exception):
+    """Bad or oversized upload; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def iter_multipart(body, content_type):
+    """
+    Yields (field name, memoryview) for every part of a buffered
+    multipart/form-data body, in order. The views point into `body`, so
+    file parts are not copied.
+    """
+    match = BOUNDARY_RE.search(content_type or "")
+    if match is None:
+        raise UploadError("Missing multipart boundary")
+    delimiter = b"--" + match.group(1).encode("latin-1")
+    view = memoryview(body)
+
+    pos = body.find(delimiter)
+    while pos != -1:
+        pos += len(delimiter)
+        if body[pos : pos + 2] == b"--":
+            break
+        header_end = body.find(b"\r\n\r\n", pos)
+        if header_end == -1:
+            break
+        end = body.find(b"\r\n" + delimiter, header_end + 4)
+        if end == -1:
+            break
+        headers = bytes(view[pos:header_end]).decode("latin-1")
+        name = NAME_RE.search(headers)
+        if name:
+            yield name.group(1), view[header_end + 4 : end]
+        pos = end + 2
+
+
+def parse_multipart(body, content_type):
+    """Multipart body as {field name: memoryview}; see iter_multipart."""
+    fields = {}
+    for name, value in iter_multipart(body, content_type):
+        # First value wins, like request.files[name] / request.form[name]
+        fields.setdefault(name, value)
+    return fields
+
+
+def parse_batch(body, content_type, names=("images", "image")):
+    """
+    Images of a /scan/batch body: every multipart part under the first of
+    `names` that has any, as views into `body`.
+    """
+    mime = (content_type or "").split(";")[0].strip().lower()
+    if mime != "multipart/form-data":
+        raise UploadError("Batch uploads must be multipart/form-data", 415)
+    parts = list(iter_multipart(body, content_type))
+    for name in names:
+        images = [value for part_name, value in parts if part_name == name]
+        if images:
+            return images
+    raise UploadError("No images uploaded")
+
+
+class Upload:
+    """
+    One /scan request body: `data` is the image (encoded, or raw BGR when
+    `shape` is (height, width)), `fields` the other request fields.
+    """
+
+    def __init__(self, data, fields=None, shape=None):
+        self.data = data
+        self.fields = fields or {}
+        self.shape = shape
+
+
+def read_body(stream, length, limit):
+    """
+    Reads a request body from a file-like WSGI stream into one bytearray,
+    preallocated when the length is known, so it is buffered exactly once.
+    Oversized bodies are refused before anything is read.
+    """
+    if length is not None:
+        if length > limit:
+            raise UploadError("Upload too large", 413)
+        body = bytearray(length)
+        view = memoryview(body)
+        received = 0
+        readinto = getattr(stream, "readinto", None)
+        while received < length:
+            if readinto is not None:
+                count = readinto(view[received:])
+            else:
+                chunk = stream.read(min(READ_CHUNK, length - received))
+                count = len(chunk)
+                view[received : received + count] = chunk
+            if not count:
+                raise UploadError("Incomplete upload")
+            received += count
+        return body
+
+    # Chunked transfer: no length up front, so enforce the limit as it grows
+    body = bytearray()
+    while True:
+        chunk = stream.read(READ_CHUNK)
+        if not chunk:
+            return body
+        body += chunk
+        if len(body) > limit:
+            raise UploadError("Upload too large", 413)
+
+
+def raw_frame(data, shape):
+    """Zero-copy (read-only) BGR image over a raw frame buffer."""
+    return np.frombuffer(data, np.uint8).reshape(shape[0], shape[1], 3)
+
+
+def _frame_shape(headers):
+    try:
+        width = int(headers.get("x-frame-width", ""))
+        height = int(headers.get("x-frame-height", ""))
+    except ValueError:
+        raise UploadError("Raw frames need X-Frame-Width and X-Frame-Height")
+    if width <= 0 or height <= 0:
+        raise UploadError("Raw frames need X-Frame-Width and X-Frame-Height")
+    return height, width
+
+
+def parse_upload(body, content_type, headers, query=None, field="image"):
+    """
+    Builds an Upload from a buffered /scan body in any accepted format:
+    - multipart/form-data with the image in `field` (the original contract)
+    - image/* or application/octet-stream: the body is the encoded image
+    - application/json: {"image": "<base64>", ...}
+    - application/x-raw-bgr with X-Frame-Width / X-Frame-Height headers
+    `headers` maps lower-case names to values; query parameters become
+    fields for the non-multipart formats. Images are views into `body`
+    except for base64, which has to be decoded.
+    """
+    if not body:
+        raise UploadError("No image uploaded")
+    mime = (content_type or "").split(";")[0].strip().lower()
+    fields = dict(query or {})
+
+    if mime == "multipart/form-data":
+        parts = parse_multipart(body, content_type)
+        data = parts.pop(field, None)
+        fields.update(
+            (name, bytes(value).decode("utf-8", "replace"))
+            for name, value in parts.items()
+        )
+        upload = Upload(data, fields)
+    elif mime == "application/json":
+        try:
+            payload = json.loads(body)
+            encoded = payload.pop(field, None) if isinstance(payload, dict) else None
+            if encoded is not None:
+                # Accept data URLs as sent by browsers
+                encoded = encoded.split(",", 1)[-1]
+                encoded = base64.b64decode(encoded, validate=True)
+        except (ValueError, TypeError, AttributeError, binascii.Error):
+            raise UploadError("Invalid JSON or base64 image")
+        if isinstance(payload, dict):
+            fields.update((name, str(value)) for name, value in payload.items())
+        upload = Upload(encoded, fields)
+    elif mime in RAW_FRAME_TYPES:
+        shape = _frame_shape(headers)
+        if len(body) != shape[0] * shape[1] * 3:
+            raise UploadError("Raw frame size does not match width * height * 3")
+        upload = Upload(memoryview(body), fields, shape)
+    elif mime.startswith("image/") or mime == "application/octet-stream":
+        upload = Upload(memoryview(body), fields)
+    else:
+        raise UploadError(f"Unsupported content type '{mime}'", 415)
+
+    if upload.data is None or not len(upload.data):
+        raise UploadError("No image uploaded")
+    return upload
@@ -0,0 +1,215 @@
+import threading
+
+# Seconds; scans range from a few ms (cache hits) to seconds (cold CPU OCR)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = self.header()
+        for key, value in values:
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Sampled(_Metric):
+    """
+    Value read at scrape time from `fn()`, which returns a number or, for
+    labelled metrics, a dict of label-value tuples to numbers. `kind` is
+    "gauge", or "counter" for totals kept elsewhere (e.g. cache stats).
+    """
+
+    def __init__(self, name, help_text, fn, labelnames=(), kind="gauge"):
+        super().__init__(name, help_text, labelnames)
+        self.fn = fn
+        self.kind = kind
+
+    def render(self):
+        values = self.fn()
+        if not isinstance(values, dict):
+            values = {(): values}
+        lines = self.header()
+        for key, value in sorted(values.items()):
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def render(self):
+        with self._lock:
+            values = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames, key, [("le", _format_value(bound))]
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Minimal Prometheus text-format registry, so /metrics works without the
+    prometheus_client package.
+    """
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, fn, labelnames=()):
+        return self._register(Sampled(name, help_text, fn, labelnames))
+
+    def sampled_counter(self, name, help_text, fn, labelnames=()):
+        return self._register(Sampled(name, help_text, fn, labelnames, "counter"))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class ScanMetrics:
+    """
+    The metric set both servers expose: requests per route and status,
+    access decisions, early rejections, per-stage latency, and (via gauges
+    registered by the server) queue depth and cache counters.
+    """
+
+    def __init__(self, registry=None):
+        self.registry = registry or Registry()
+        self.requests = self.registry.counter(
+            "alpr_requests_total", "HTTP requests handled.", ("route", "status")
+        )
+        self.decisions = self.registry.counter(
+            "alpr_decisions_total",
+            "Scan outcomes: granted, denied or error.",
+            ("decision",),
+        )
+        self.stage_seconds = self.registry.histogram(
+            "alpr_stage_seconds",
+            "Pipeline stage latency in seconds.",
+            ("route", "stage"),
+        )
+        # exact / (exact + fuzzy + miss) is the hash-hit rate of the allowlist
+        self.lookups = self.registry.counter(
+            "alpr_match_lookups_total",
+            "Allowlist lookups by outcome: exact (hash hit), fuzzy or miss.",
+            ("result",),
+        )
+        self.rejections = self.registry.counter(
+            "alpr_early_rejections_total",
+            "Frames rejected by the plate-presence check before OCR.",
+        )
+
+    def observe_request(self, route, status):
+        self.requests.inc(route=route, status=status)
+
+    def observe_result(self, result):
+        if result["matched"]:
+            decision = "granted"
+        elif result["success"] and "Error" not in result["message"]:
+            decision = "denied"
+        else:
+            decision = "error"
+        self.decisions.inc(decision=decision)
+        if result.get("rejected"):
+            self.rejections.inc()
+
+    def observe_timings(self, route, timings):
+        """
+        timings: {"<stage>_ms": milliseconds, "match_<result>": lookups}, as
+        the pipelines fill it.
+        """
+        for name, value in timings.items():
+            if name.endswith("_ms"):
+                self.stage_seconds.observe(value / 1000, route=route, stage=name[:-3])
+            elif name.startswith("match_"):
+                self.lookups.inc(value, result=name[6:])
+
+    def render(self):
+        return self.registry.render()
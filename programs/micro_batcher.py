@@ -0,0 +1,84 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+def split_timings(timings, count):
+    """
+    A batch's timings dict split across its `count` members: every *_ms
+    latency divided evenly, and the lookup counters dealt out so that the
+    members still add up to the batch's totals.
+    """
+    shares = [{} for _ in range(count)]
+    for name, value in timings.items():
+        if name.endswith("_ms"):
+            for share in shares:
+                share[name] = value / count
+            continue
+        each, extra = divmod(value, count)
+        for i, share in enumerate(shares):
+            share[name] = each + (i < extra)
+    return shares
+
+
+class MicroBatcher:
+    """
+    Groups concurrent single-image requests into batches.
+
+    Requests are collected until `max_batch` images are waiting or
+    `max_wait_ms` has passed since the first one arrived, then
+    `process_batch(imgs)` (a pipeline's process_images_batch) runs once and
+    each caller receives its own result dict plus its share of the batch's
+    timings, the same (result, timings) a single-image scan reports.
+    """
+
+    def __init__(self, process_batch, max_batch=8, max_wait_ms=10.0):
+        self.process_batch = process_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def submit(self, img):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((img, future))
+        return future.result()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            imgs = [img for img, _ in batch]
+            try:
+                results, timings = self.process_batch(imgs)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            shares = split_timings(timings, len(batch))
+            for (_, future), result, share in zip(batch, results, shares):
+                future.set_result((result, share))
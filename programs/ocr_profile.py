@@ -0,0 +1,85 @@
+LATIN_DIGITS = "0123456789"
+ARABIC_INDIC_DIGITS = "٠١٢٣٤٥٦٧٨٩"
+# Letters used on Arabic-script plates (Egyptian / Gulf series)
+PLATE_LETTERS = "أابجدرسصطعفقلمنهوىي"
+DEFAULT_PLATE_ALPHABET = LATIN_DIGITS + ARABIC_INDIC_DIGITS + PLATE_LETTERS
+# width / height range of a text box that can hold (part of) a plate
+DEFAULT_TEXT_ASPECT = "0.5,10"
+
+
+def parse_aspect(text):
+    """'min,max' width / height ratio."""
+    low, high = (float(v) for v in text.split(","))
+    if not 0 < low < high:
+        raise ValueError(f"Text aspect must be min,max with 0 < min < max: {text!r}")
+    return low, high
+
+
+def _size(bbox):
+    xs = [point[0] for point in bbox]
+    ys = [point[1] for point in bbox]
+    return max(xs) - min(xs), max(ys) - min(ys)
+
+
+class OcrProfile:
+    """
+    How a pipeline runs EasyOCR. The default profile is plain readtext
+    over the full Arabic + English model. A plate profile (make_profile)
+    decodes only `allowlist` and drops detected text boxes whose
+    width / height is outside `aspect` before they reach the recognizer,
+    so fewer tokens are decoded and matched.
+    """
+
+    def __init__(self, languages=("ar", "en"), allowlist=None, aspect=None):
+        self.languages = list(languages)
+        self.allowlist = allowlist
+        self.aspect = aspect
+
+    def plate_like(self, bbox):
+        if self.aspect is None:
+            return True
+        width, height = _size(bbox)
+        return height > 0 and self.aspect[0] <= width / height <= self.aspect[1]
+
+    def filter(self, ocr_results):
+        """Drops readtext results whose box is not plate-like."""
+        if self.aspect is None:
+            return ocr_results
+        return [result for result in ocr_results if self.plate_like(result[0])]
+
+    def readtext(self, reader, img):
+        if self.aspect is None:
+            return reader.readtext(img, allowlist=self.allowlist)
+        # readtext() is detect() + recognize(); filter the boxes in between
+        horizontal, free = reader.detect(img)
+        horizontal = [
+            box
+            for box in horizontal[0]
+            if self.plate_like([[box[0], box[2]], [box[1], box[3]]])
+        ]
+        free = [box for box in free[0] if self.plate_like(box)]
+        if not horizontal and not free:
+            return []
+        return reader.recognize(
+            img, horizontal_list=horizontal, free_list=free, allowlist=self.allowlist
+        )
+
+    def readtext_batched(self, reader, imgs, **kwargs):
+        batch = reader.readtext_batched(imgs, allowlist=self.allowlist, **kwargs)
+        return [self.filter(ocr_results) for ocr_results in batch]
+
+    def recognize(self, reader, img, **kwargs):
+        return reader.recognize(img, allowlist=self.allowlist, **kwargs)
+
+
+def make_profile(name, alphabet=DEFAULT_PLATE_ALPHABET, aspect=DEFAULT_TEXT_ASPECT):
+    """"full" (EasyOCR as is) or "plate" (see OcrProfile)."""
+    if name == "full":
+        return OcrProfile()
+    if name != "plate":
+        raise ValueError(f"Unknown OCR profile {name!r}, expected full or plate")
+    # The Arabic model reads Latin digits too; English is only needed for
+    # Latin letters
+    latin = any(c.isascii() and c.isalpha() for c in alphabet)
+    languages = ("ar", "en") if latin else ("ar",)
+    return OcrProfile(languages, alphabet, parse_aspect(aspect))
@@ -0,0 +1,370 @@
+import difflib
+
+import numpy as np
+
+from plate_index import MATCH_THRESHOLD
+from plate_normalize import canonical_plate
+
+# Plates scored per vectorized pass in find()
+CHUNK_SIZE = 16384
+# Plates added since the last merge are found by a linear scan; past this
+# many they are merged into the sort order
+TAIL_LIMIT = 512
+# Set bits per byte value, for popcounts without np.bitwise_count
+BYTE_BITS = np.array([bin(i).count("1") for i in range(256)], np.uint8)
+
+
+def popcount(words):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    return BYTE_BITS[words.view(np.uint8).reshape(len(words), 8)].sum(1)
+
+
+def lcs_bitparallel(codes, query, alphabet_size):
+    """
+    lcs_lengths for queries up to 64 characters: Allison-Dix bit-parallel
+    LCS with the query as the bit pattern and one uint64 state word per
+    plate, so each plate column costs one table lookup and a few word
+    operations whatever the query length.
+    """
+    width, count = codes.shape
+    # Bit i of pattern[code] is set where query character i is `code`; the
+    # padding code 0 matches nothing and leaves the state unchanged
+    pattern = np.zeros(alphabet_size + 1, np.uint64)
+    for i, code in enumerate(query):
+        pattern[code] |= np.uint64(1 << i)
+    v = np.full(count, np.iinfo(np.uint64).max, np.uint64)
+    for j in range(width):
+        u = v & pattern[codes[j]]
+        v = (v + u) | (v - u)
+    # Zero bits among the first len(query) are the LCS length
+    return len(query) - popcount(v & np.uint64(2 ** len(query) - 1))
+
+
+def lcs_lengths(codes, query, alphabet_size):
+    """
+    Longest common subsequence of `query` (a list of codes) with every
+    column of `codes` (width x plates, 0 = padding, codes up to
+    `alphabet_size`), one DP row per query character, vectorized over the
+    plates.
+    """
+    if len(query) <= 64:
+        return lcs_bitparallel(codes, query, alphabet_size)
+    width, count = codes.shape
+    prev = np.zeros((width + 1, count), np.uint8)
+    for code in query:
+        hit = codes == code
+        cur = np.zeros_like(prev)
+        for j in range(width):
+            np.maximum(prev[j + 1], cur[j], out=cur[j + 1])
+            np.copyto(cur[j + 1], prev[j] + 1, where=hit[j])
+        prev = cur
+    return prev[width]
+
+
+class TextColumn:
+    """
+    Variable-length strings stored as UTF-8 in one growing byte buffer, in
+    row order, with the end offset of each row (uint32, so up to 4 GiB of
+    text). Rows are appended in order; a row written again (a new file name
+    for a plate) is kept in a small dict instead.
+    """
+
+    def __init__(self, texts):
+        encoded = [text.encode("utf-8") for text in texts]
+        self._ends = np.cumsum([len(e) for e in encoded], dtype=np.uint32)
+        self._blob = np.frombuffer(b"".join(encoded), np.uint8).copy()
+        self._rows = len(encoded)
+        self._rewritten = {}
+
+    def grow(self, capacity):
+        ends = np.zeros(capacity, np.uint32)
+        ends[: self._rows] = self._ends[: self._rows]
+        self._ends = ends
+
+    def __getitem__(self, pos):
+        text = self._rewritten.get(pos)
+        if text is not None:
+            return text
+        # Offsets first: an append publishes a grown buffer before the end
+        # offset that points into it
+        start = int(self._ends[pos - 1]) if pos else 0
+        end = int(self._ends[pos])
+        return self._blob[start:end].tobytes().decode("utf-8")
+
+    def __setitem__(self, pos, text):
+        if pos < self._rows:
+            self._rewritten[pos] = text
+            return
+        encoded = text.encode("utf-8")
+        start = int(self._ends[pos - 1]) if pos else 0
+        end = start + len(encoded)
+        if end > len(self._blob):
+            blob = np.zeros(max(64, end, 2 * len(self._blob)), np.uint8)
+            blob[:start] = self._blob[:start]
+            self._blob = blob
+        self._blob[start:end] = np.frombuffer(encoded, np.uint8)
+        self._ends[pos] = end
+        self._rows = pos + 1
+
+    @property
+    def nbytes(self):
+        return self._ends.nbytes + self._blob.nbytes
+
+
+class ArrayPlateIndex:
+    """
+    Allowlist stored as fixed-width NumPy arrays: one row per plate with a
+    uint8 code per canonical character (uint16 past 255 distinct
+    characters), zero padded, plus its length; display plates and file
+    names are TextColumns (UTF-8 buffer plus offsets). Like SqlitePlateIndex it is both the
+    {plate: file_name} mapping and the index, so no dict or per-plate str
+    objects are kept. exact() is a binary search over the rows. find()
+    bounds every plate's difflib ratio by 2 * LCS / total length in one
+    chunked NumPy pass and scores only the plates that can beat the
+    threshold with SequenceMatcher, so its results equal the linear scan.
+    Storage grows by doubling, and added plates wait in a short unsorted
+    tail (scanned linearly) that is merged into the sort order TAIL_LIMIT
+    at a time, so adds no longer copy every array each time.
+    """
+
+    def __init__(self, plates):
+        """`plates`: {plate: file_name}, or an iterable of plates."""
+        if not hasattr(plates, "items"):
+            plates = dict.fromkeys(plates, "")
+        keys = list(plates)
+        canons = [canonical_plate(key) for key in keys]
+        # At least one column, so every row packs to a non-empty bytes value
+        width = max([1] + [len(c) for c in canons])
+        points = np.frombuffer(
+            "".join(c.ljust(width, "\0") for c in canons).encode("utf-32-le"),
+            np.uint32,
+        ).reshape(len(canons), width)
+
+        alphabet = np.unique(points)
+        alphabet = alphabet[alphabet != 0]
+        self._codes = {chr(p): i + 1 for i, p in enumerate(alphabet.tolist())}
+        dtype = np.uint8 if len(alphabet) < 256 else np.uint16
+        rows = np.searchsorted(alphabet, points) + 1
+        rows[points == 0] = 0
+        self._rows = rows.astype(dtype)
+        self._lengths = np.array([len(c) for c in canons], np.uint16)
+        self._alive = np.ones(len(keys), bool)
+        self._plates = TextColumn(keys)
+        self._files = TextColumn(str(plates[key]) for key in keys)
+        self._size = len(keys)
+        self._count = len(keys)
+        self._sort()
+
+    def _packed(self, rows):
+        # Each row as one fixed-width bytes value (numpy pads with NULs), so
+        # rows sort and compare like strings
+        itemsize = rows.shape[1] * rows.itemsize
+        return np.ascontiguousarray(rows).view(f"S{itemsize}").ravel()
+
+    def _sort(self):
+        # Rows [0, len(_order)) are in _order; the rest are the tail. Kept as
+        # intp: searchsorted copies any other sorter dtype on every call
+        self._order = np.argsort(self._packed(self._rows[: self._size]), kind="stable")
+
+    def _merge_tail(self):
+        # Sorting the tail and inserting it is one O(n) copy, not a full sort
+        order = self._order
+        packed = self._packed(self._rows[: self._size])
+        tail = np.arange(len(order), self._size)
+        tail = tail[np.argsort(packed[tail], kind="stable")]
+        at = np.searchsorted(packed[: len(order)], packed[tail], "right", order)
+        self._order = np.insert(order, at, tail)
+
+    def _encode(self, canon, rows):
+        """Row for `canon`, or None if it has a character no plate has."""
+        width = rows.shape[1]
+        if len(canon) > width or any(c not in self._codes for c in canon):
+            return None
+        row = np.zeros(width, rows.dtype)
+        row[: len(canon)] = [self._codes[c] for c in canon]
+        return row
+
+    def _positions(self, canon):
+        """Live rows whose canonical plate is `canon`, in insertion order."""
+        # One consistent view, as add() may swap the arrays meanwhile
+        rows, order, size = self._rows, self._order, self._size
+        row = self._encode(canon, rows)
+        if row is None:
+            return []
+        packed = self._packed(rows[:size])
+        value = row.view(packed.dtype)[0]
+        head = packed[: len(order)]
+        lo = np.searchsorted(head, value, "left", order)
+        hi = np.searchsorted(head, value, "right", order)
+        tail = len(order) + np.flatnonzero(packed[len(order) :] == value)
+        positions = order[lo:hi].tolist() + tail.tolist()
+        return sorted(p for p in positions if self._alive[p])
+
+    def _row_of(self, key):
+        for pos in self._positions(canonical_plate(key)):
+            if self._plates[pos] == key:
+                return pos
+        return None
+
+    def _grow(self):
+        capacity = max(16, 2 * len(self._lengths))
+
+        def grown(array):
+            out = np.zeros((capacity,) + array.shape[1:], array.dtype)
+            out[: self._size] = array[: self._size]
+            return out
+
+        self._rows = grown(self._rows)
+        self._lengths = grown(self._lengths)
+        self._alive = grown(self._alive)
+        self._plates.grow(capacity)
+        self._files.grow(capacity)
+
+    def _insert(self, key, file_name):
+        canon = canonical_plate(key)
+        for c in canon:
+            if c not in self._codes:
+                self._codes[c] = len(self._codes) + 1
+        if len(self._codes) > 255 and self._rows.dtype == np.uint8:
+            # Wider codes pack to different bytes, so the order is rebuilt
+            self._rows = self._rows.astype(np.uint16)
+            self._sort()
+        extra = len(canon) - self._rows.shape[1]
+        if extra > 0:
+            self._rows = np.pad(self._rows, ((0, 0), (0, extra)))
+        if self._size == len(self._lengths):
+            self._grow()
+
+        pos = self._size
+        self._rows[pos] = self._encode(canon, self._rows)
+        self._lengths[pos] = len(canon)
+        self._alive[pos] = True
+        self._plates[pos] = key
+        self._files[pos] = file_name
+        # Published last, so readers never see a half-written row
+        self._size += 1
+        self._count += 1
+        if self._size - len(self._order) >= TAIL_LIMIT:
+            self._merge_tail()
+
+    # Mapping interface ({plate: file_name}), used by PlateStore and the
+    # admin endpoints like the dict of the memory backend
+
+    def __setitem__(self, key, file_name):
+        pos = self._row_of(key)
+        if pos is None:
+            self._insert(key, file_name)
+        else:
+            self._files[pos] = file_name
+
+    def get(self, key, default=None):
+        pos = self._row_of(key)
+        return default if pos is None else self._files[pos]
+
+    def __getitem__(self, key):
+        pos = self._row_of(key)
+        if pos is None:
+            raise KeyError(key)
+        return self._files[pos]
+
+    def pop(self, key, default=None):
+        """
+        Drops a key in place; its row stays as a tombstone until the next
+        full rebuild.
+        """
+        pos = self._row_of(key)
+        if pos is None:
+            return default
+        self._alive[pos] = False
+        self._count -= 1
+        return self._files[pos]
+
+    def add(self, key):
+        if key not in self:
+            self[key] = ""
+
+    def remove(self, key):
+        return self.pop(key) is not None
+
+    def keys(self):
+        return iter(self)
+
+    def __contains__(self, key):
+        return self._row_of(key) is not None
+
+    def __iter__(self):
+        live = np.flatnonzero(self._alive[: self._size])
+        return (self._plates[pos] for pos in live.tolist())
+
+    def __len__(self):
+        return self._count
+
+    def nbytes(self):
+        """Bytes held by the arrays, display plates and file names included."""
+        arrays = (
+            self._rows,
+            self._lengths,
+            self._alive,
+            self._order,
+            self._plates,
+            self._files,
+        )
+        return sum(a.nbytes for a in arrays)
+
+    def _pick(self, text, positions):
+        keys = [self._plates[pos] for pos in positions]
+        if len(keys) == 1:
+            return keys[0]
+        return max(keys, key=lambda k: difflib.SequenceMatcher(None, text, k).ratio())
+
+    def exact(self, text):
+        """Same as CanonicalPlateIndex.exact: 1.0 as read, 0.95 reversed."""
+        canon = canonical_plate(text)
+        positions = self._positions(canon)
+        if positions:
+            return self._pick(text, positions), 1.0
+        positions = self._positions(canon[::-1])
+        if positions:
+            return self._pick(text[::-1], positions), 0.95
+        return None, 0.0
+
+    def _candidates(self, canon, max_len_diff, threshold):
+        """Rows whose ratio bound with `canon` beats `threshold`."""
+        n = len(canon)
+        size = self._size
+        lengths = self._lengths[:size]
+        mask = self._alive[:size] & (lengths >= max(0, n - max_len_diff))
+        mask &= lengths <= n + max_len_diff
+        rows = np.flatnonzero(mask)
+        # Characters no plate contains cannot be part of a common subsequence
+        query = [self._codes[c] for c in canon if c in self._codes]
+
+        candidates = []
+        for start in range(0, len(rows), CHUNK_SIZE):
+            chunk = rows[start : start + CHUNK_SIZE]
+            codes = np.ascontiguousarray(self._rows[chunk].T)
+            lcs = lcs_lengths(codes, query, len(self._codes))
+            bound = 2.0 * lcs / (n + lengths[chunk])
+            candidates.extend(chunk[bound > threshold].tolist())
+        return candidates
+
+    def find(self, text, max_len_diff=1, threshold=MATCH_THRESHOLD):
+        """
+        Best fuzzy match on canonical forms, as CanonicalPlateIndex.find:
+        (key, score), or (None, 0.0) when nothing beats the threshold.
+        """
+        canon = canonical_plate(text)
+        best_canon = None
+        best_score = 0.0
+
+        for pos in self._candidates(canon, max_len_diff, threshold):
+            key_canon = canonical_plate(self._plates[pos])
+            similarity = difflib.SequenceMatcher(None, canon, key_canon).ratio()
+            if similarity > threshold and similarity > best_score:
+                best_score = similarity
+                best_canon = key_canon
+
+        if best_canon is None:
+            return None, best_score
+        return self._pick(text, self._positions(best_canon)), best_score
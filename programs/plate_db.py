@@ -0,0 +1,435 @@
+import datetime
+import difflib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from plate_index import MATCH_THRESHOLD, deletion_variants, plan_lookups
+from plate_normalize import canonical_plate
+from plate_store import COL_IMG, COL_PLATE, clean_plates
+
+COL_VALID_FROM = "valid_from"
+COL_VALID_UNTIL = "valid_until"
+# Default depth of the stored deletion variants; builders pass the
+# pipeline's max_len_diff and the depth is recorded in the file
+KEY_DEPTH = 1
+REOPEN_CHECK_SECONDS = 1.0
+# Builders serialize on db_path + ".lock"; a lock older than this was left
+# by a builder that died and is taken over
+LOCK_STALE_SECONDS = 600
+LOCK_POLL_SECONDS = 0.1
+# Bumped on schema changes; older files are rebuilt from the CSV
+SCHEMA_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE plates (
+    id INTEGER PRIMARY KEY,
+    plate TEXT NOT NULL UNIQUE,
+    canonical TEXT NOT NULL,
+    raw_plate TEXT,
+    file_name TEXT,
+    valid_from TEXT,
+    valid_until TEXT,
+    length INTEGER NOT NULL
+);
+CREATE INDEX plates_length ON plates(length);
+CREATE INDEX plates_canonical ON plates(canonical);
+CREATE TABLE settings (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE variants (
+    variant TEXT NOT NULL,
+    plate_id INTEGER NOT NULL,
+    PRIMARY KEY (variant, plate_id)
+) WITHOUT ROWID;
+"""
+
+# Plates outside their validity window (ISO dates, inclusive) never match
+VALID_NOW = (
+    "(p.valid_from IS NULL OR p.valid_from <= :today)"
+    " AND (p.valid_until IS NULL OR p.valid_until >= :today)"
+)
+
+
+def _optional(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _insert_plate(
+    conn, key_depth, key, raw_plate, file_name, valid_from=None, valid_until=None
+):
+    # Lookups run on the canonical form; length and variants follow it
+    canon = canonical_plate(key)
+    cursor = conn.execute(
+        "INSERT INTO plates (plate, canonical, raw_plate, file_name, valid_from,"
+        " valid_until, length) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (key, canon, raw_plate, file_name, valid_from, valid_until, len(canon)),
+    )
+    plate_id = cursor.lastrowid
+    for depth in range(1, key_depth + 1):
+        conn.executemany(
+            "INSERT OR IGNORE INTO variants (variant, plate_id) VALUES (?, ?)",
+            ((variant, plate_id) for variant in deletion_variants(canon, depth)),
+        )
+
+
+@contextmanager
+def build_lock(db_path):
+    """
+    Exclusive lock file next to db_path, so two processes (or the watcher
+    and /admin/reload) never rebuild the same file at once. O_EXCL works
+    on every platform and filesystem the desktop app runs on.
+    """
+    lock_path = db_path + ".lock"
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > LOCK_STALE_SECONDS:
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(LOCK_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(lock_path)
+
+
+def build_plate_db(csv_path, db_path, key_depth=KEY_DEPTH):
+    """
+    Writes the allowlist (plus optional valid_from / valid_until columns)
+    to a fresh SQLite file and atomically replaces db_path with it.
+    Row order follows the CSV so fuzzy tie-breaking matches the dict index.
+    Deletion variants are stored down to `key_depth` characters.
+    """
+    with build_lock(db_path):
+        _build_plate_db(csv_path, db_path, key_depth)
+
+
+def ensure_plate_db(csv_path, db_path, key_depth=KEY_DEPTH):
+    """Rebuilds db_path unless it is current, checked under the build lock."""
+    with build_lock(db_path):
+        if needs_rebuild(csv_path, db_path, key_depth):
+            _build_plate_db(csv_path, db_path, key_depth)
+
+
+def _build_plate_db(csv_path, db_path, key_depth):
+    df = pd.read_csv(csv_path, dtype=str)
+    df["_key"] = clean_plates(df[COL_PLATE])
+    df = df[df["_key"] != ""]
+
+    # Same semantics as the dict: first row's position, last row's values
+    order = df.drop_duplicates("_key", keep="first")["_key"]
+    position = pd.Series(range(len(order)), index=order.values)
+    last = df.drop_duplicates("_key", keep="last").copy()
+    last["_pos"] = last["_key"].map(position)
+    last = last.sort_values("_pos")
+
+    def column(name):
+        if name not in last.columns:
+            return [None] * len(last)
+        return [_optional(value) for value in last[name]]
+
+    rows = zip(
+        last["_key"],
+        last[COL_PLATE],
+        [name or "" for name in column(COL_IMG)],
+        column(COL_VALID_FROM),
+        column(COL_VALID_UNTIL),
+    )
+
+    # Unique name in the same directory, so os.replace stays atomic
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(db_path)),
+        prefix=os.path.basename(db_path) + ".",
+        suffix=".tmp",
+    )
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute(
+                "INSERT INTO settings (name, value) VALUES ('key_depth', ?)",
+                (key_depth,),
+            )
+            for row in rows:
+                _insert_plate(conn, key_depth, *row)
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    print(f"DEBUG: Built {db_path} with {len(last)} plates.")
+
+
+def stored_key_depth(conn):
+    return conn.execute(
+        "SELECT value FROM settings WHERE name = 'key_depth'"
+    ).fetchone()[0]
+
+
+def needs_rebuild(csv_path, db_path, key_depth=KEY_DEPTH):
+    if not os.path.exists(db_path):
+        return True
+    conn = sqlite3.connect(db_path)
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            return True
+        if stored_key_depth(conn) < key_depth:
+            return True
+    finally:
+        conn.close()
+    if not os.path.exists(csv_path):
+        return False
+    return os.path.getmtime(csv_path) > os.path.getmtime(db_path)
+
+
+class SqlitePlateIndex:
+    """
+    PlateIndex / PLATE_DATABASE replacement backed by an indexed SQLite file,
+    so several processes share one copy of the allowlist instead of each
+    holding a dict. Acts as a mapping of plate -> reference image file name
+    and supports the same find() as PlateIndex, answered with indexed
+    queries on the stored deletion variants.
+
+    Read-only instances open the file with mode=ro and reopen it when it is
+    replaced by a rebuild.
+    """
+
+    def __init__(self, db_path, read_only=False):
+        self.db_path = db_path
+        self.read_only = read_only
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+    def _connect(self):
+        if self.read_only:
+            uri = f"file:{os.path.abspath(self.db_path)}?mode=ro"
+            return sqlite3.connect(uri, uri=True, check_same_thread=False)
+        return sqlite3.connect(self.db_path, check_same_thread=False)
+
+    def _conn(self):
+        local = self._local
+        now = time.monotonic()
+        if getattr(local, "checked_at", 0.0) + REOPEN_CHECK_SECONDS < now:
+            local.checked_at = now
+            inode = os.stat(self.db_path).st_ino
+            if getattr(local, "inode", None) != inode:
+                if getattr(local, "conn", None) is not None:
+                    local.conn.close()
+                local.conn = self._connect()
+                local.inode = inode
+                local.key_depth = stored_key_depth(local.conn)
+        return local.conn
+
+    def _key_depth(self):
+        # Depth the current file was built with; read again on every reopen
+        self._conn()
+        return self._local.key_depth
+
+    def _today(self):
+        return {"today": datetime.date.today().isoformat()}
+
+    def _lookup(self, key):
+        sql = f"SELECT p.file_name FROM plates p WHERE p.plate = :plate AND {VALID_NOW}"
+        return self._conn().execute(sql, {"plate": key, **self._today()}).fetchone()
+
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+    def get(self, key, default=None):
+        row = self._lookup(key)
+        return default if row is None else row[0]
+
+    def __getitem__(self, key):
+        row = self._lookup(key)
+        if row is None:
+            raise KeyError(key)
+        return row[0]
+
+    def __iter__(self):
+        rows = self._conn().execute(
+            f"SELECT p.plate FROM plates p WHERE {VALID_NOW} ORDER BY p.id",
+            self._today(),
+        )
+        return (plate for (plate,) in rows)
+
+    def __len__(self):
+        # Same plates as __iter__: only those valid today
+        return self._conn().execute(
+            f"SELECT COUNT(*) FROM plates p WHERE {VALID_NOW}", self._today()
+        ).fetchone()[0]
+
+    def keys(self):
+        return iter(self)
+
+    def details(self, key):
+        row = self._conn().execute(
+            "SELECT plate, raw_plate, file_name, valid_from, valid_until"
+            " FROM plates WHERE plate = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        names = ("plate", "raw_plate", "file_name", "valid_from", "valid_until")
+        return dict(zip(names, row))
+
+    def _candidates(self, text, max_len_diff, threshold):
+        conn = self._conn()
+        n = len(text)
+        lengths = {
+            length
+            for length in range(max(1, n - max_len_diff), n + max_len_diff + 1)
+            if conn.execute(
+                "SELECT 1 FROM plates WHERE length = ? LIMIT 1", (length,)
+            ).fetchone()
+        }
+        exact, variants, buckets = set(), set(), set()
+        for depth, value in plan_lookups(
+            text, lengths, self._key_depth(), max_len_diff, threshold
+        ):
+            if depth is None:
+                buckets.add(value)
+            elif depth == 0:
+                exact.add(value)
+            else:
+                variants.add(value)
+
+        params = self._today()
+        queries = []
+        for prefix, values, sql in (
+            ("e", exact, "SELECT p.id, p.canonical FROM plates p WHERE p.canonical IN"),
+            (
+                "v",
+                variants,
+                "SELECT p.id, p.canonical FROM variants v"
+                " JOIN plates p ON p.id = v.plate_id WHERE v.variant IN",
+            ),
+            ("b", buckets, "SELECT p.id, p.canonical FROM plates p WHERE p.length IN"),
+        ):
+            if not values:
+                continue
+            names = [f"{prefix}{i}" for i in range(len(values))]
+            params.update(zip(names, values))
+            placeholders = ", ".join(f":{name}" for name in names)
+            queries.append(f"{sql} ({placeholders}) AND {VALID_NOW}")
+
+        if not queries:
+            return []
+        # Ordered by id = CSV order, so ties resolve like the linear scan
+        sql = " UNION ".join(queries) + " ORDER BY 1"
+        return [canon for _, canon in conn.execute(sql, params)]
+
+    def _pick(self, text, canon):
+        # Closest original spelling among keys sharing this canonical form
+        rows = self._conn().execute(
+            f"SELECT p.plate FROM plates p WHERE p.canonical = :canon AND {VALID_NOW}"
+            " ORDER BY p.id",
+            {"canon": canon, **self._today()},
+        ).fetchall()
+        if not rows:
+            return None
+        return max(
+            (plate for (plate,) in rows),
+            key=lambda plate: difflib.SequenceMatcher(None, text, plate).ratio(),
+        )
+
+    def exact(self, text):
+        """Same as CanonicalPlateIndex.exact: one indexed canonical lookup."""
+        canon = canonical_plate(text)
+        plate = self._pick(text, canon)
+        if plate is not None:
+            return plate, 1.0
+        plate = self._pick(text[::-1], canon[::-1])
+        if plate is not None:
+            return plate, 0.95
+        return None, 0.0
+
+    def find(self, text, max_len_diff=1, threshold=MATCH_THRESHOLD):
+        canon = canonical_plate(text)
+        best_match = None
+        best_score = 0.0
+
+        for db_key in self._candidates(canon, max_len_diff, threshold):
+            similarity = difflib.SequenceMatcher(None, canon, db_key).ratio()
+            if similarity > threshold and similarity > best_score:
+                best_score = similarity
+                best_match = db_key
+
+        if best_match is None:
+            return None, best_score
+        return self._pick(text, best_match), best_score
+
+    # Writes, used by PlateStore.add / remove (mapping-style, like the dict)
+
+    def _write(self, fn):
+        if self.read_only:
+            raise PermissionError(f"{self.db_path} is opened read-only")
+        with self._write_lock:
+            conn = self._conn()
+            fn(conn)
+            conn.commit()
+
+    def __setitem__(self, key, file_name):
+        def upsert(conn):
+            updated = conn.execute(
+                "UPDATE plates SET file_name = ? WHERE plate = ?", (file_name, key)
+            ).rowcount
+            if not updated:
+                _insert_plate(conn, self._key_depth(), key, key, file_name)
+
+        self._write(upsert)
+
+    def add(self, key):
+        """
+        Makes `key` match from now on. An existing row, e.g. one whose
+        valid_until has passed, gets its validity window cleared and keeps
+        its file name.
+        """
+
+        def upsert(conn):
+            updated = conn.execute(
+                "UPDATE plates SET valid_from = NULL, valid_until = NULL"
+                " WHERE plate = ?",
+                (key,),
+            ).rowcount
+            if not updated:
+                _insert_plate(conn, self._key_depth(), key, key, "")
+
+        self._write(upsert)
+
+    def pop(self, key, default=None):
+        row = self.details(key)
+        if row is None:
+            return default
+
+        def delete(conn):
+            plate_id = conn.execute(
+                "SELECT id FROM plates WHERE plate = ?", (key,)
+            ).fetchone()[0]
+            conn.execute("DELETE FROM variants WHERE plate_id = ?", (plate_id,))
+            conn.execute("DELETE FROM plates WHERE id = ?", (plate_id,))
+
+        self._write(delete)
+        return row["file_name"]
+
+    def remove(self, key):
+        return self.pop(key) is not None
@@ -0,0 +1,438 @@
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+HUB_REPO = "WongKinYiu/yolov9"
+INPUT_SIZE = 640
+CONF_THRESHOLD = 0.5
+IOU_THRESHOLD = 0.45
+
+TORCHSCRIPT_EXTENSIONS = (".torchscript", ".ts", ".jit")
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png")
+# Images sampled from the calibration folder for static INT8 quantization
+CALIBRATION_IMAGES = 200
+# A reference box counts as found when a candidate box overlaps it this much
+AGREEMENT_IOU = 0.5
+
+
+class HubDetector:
+    """
+    The original loader: YOLOv9 AutoShape model from torch.hub. Uses a
+    cached copy of the hub repo when one exists so startup needs no network.
+    """
+
+    def __init__(self, model_path, conf=CONF_THRESHOLD):
+        import torch
+
+        repo_dir = HUB_REPO.replace("/", "_") + "_main"
+        local_repo = os.path.join(torch.hub.get_dir(), repo_dir)
+        if os.path.isdir(local_repo):
+            self.model = torch.hub.load(
+                local_repo, "custom", path=model_path, source="local"
+            )
+        else:
+            self.model = torch.hub.load(
+                HUB_REPO, "custom", path=model_path, force_reload=False
+            )
+        self.model.conf = conf
+
+    def detect(self, imgs_rgb):
+        results = self.model(imgs_rgb)
+        return [detections.cpu().numpy() for detections in results.xyxy]
+
+
+class ExportedDetector:
+    """
+    Runs an exported network (TorchScript or ONNX) with our own letterbox
+    and NMS, so neither torch.hub nor the yolov9 repo is needed.
+    The network output is expected as (batch, 4 + classes, anchors) with
+    xywh boxes in input pixels, which is what export_detector() produces.
+    """
+
+    def __init__(
+        self, model_path, backend, conf=CONF_THRESHOLD, iou=IOU_THRESHOLD, threads=0
+    ):
+        self.conf = conf
+        self.iou = iou
+        self.batched = True
+
+        if backend == "onnx":
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.graph_optimization_level = level
+            if threads:
+                # Pool workers share the CPUs, like their torch threads
+                options.intra_op_num_threads = threads
+                options.inter_op_num_threads = 1
+            self.session = ort.InferenceSession(
+                model_path, options, providers=["CPUExecutionProvider"]
+            )
+            model_input = self.session.get_inputs()[0]
+            self.input_name = model_input.name
+            # Fixed-batch exports have an int batch dimension
+            self.batched = not isinstance(model_input.shape[0], int)
+            self._run = self._run_onnx
+        else:
+            import torch
+
+            self.torch = torch
+            self.net = torch.jit.load(model_path, map_location="cpu").eval()
+            self._run = self._run_torchscript
+
+    def _run_onnx(self, batch):
+        if self.batched:
+            return self.session.run(None, {self.input_name: batch})[0]
+        outputs = [
+            self.session.run(None, {self.input_name: batch[i : i + 1]})[0]
+            for i in range(len(batch))
+        ]
+        return np.concatenate(outputs)
+
+    def _run_torchscript(self, batch):
+        # Tracing bakes the batch size of 1 into the graph, so run per image
+        with self.torch.inference_mode():
+            outputs = [
+                self.net(self.torch.from_numpy(batch[i : i + 1])).numpy()
+                for i in range(len(batch))
+            ]
+        return np.concatenate(outputs)
+
+    def detect(self, imgs_rgb):
+        inputs = [letterbox(img) for img in imgs_rgb]
+        batch = np.stack([tensor for tensor, _, _ in inputs])
+        preds = self._run(batch)
+        return [
+            postprocess(pred, ratio, pad, img.shape, self.conf, self.iou)
+            for pred, (_, ratio, pad), img in zip(preds, inputs, imgs_rgb)
+        ]
+
+
+def letterbox(img, size=INPUT_SIZE):
+    h, w = img.shape[:2]
+    ratio = size / max(h, w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+    resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    canvas[pad_y : pad_y + new_h, pad_x : pad_x + new_w] = resized
+
+    tensor = canvas.transpose(2, 0, 1).astype(np.float32) / 255.0
+    return tensor, ratio, (pad_x, pad_y)
+
+
+def postprocess(pred, ratio, pad, shape, conf_thres, iou_thres):
+    """
+    Turns one raw prediction (4 + classes, anchors) into an array of
+    [x1, y1, x2, y2, conf, cls] rows in original image coordinates.
+    """
+    pred = pred.T
+    scores = pred[:, 4:]
+    cls = scores.argmax(axis=1)
+    conf = scores.max(axis=1)
+    keep = conf > conf_thres
+    if not keep.any():
+        return np.zeros((0, 6), dtype=np.float32)
+
+    xywh, conf, cls = pred[keep, :4], conf[keep], cls[keep]
+    boxes = np.empty_like(xywh)
+    boxes[:, 0] = xywh[:, 0] - xywh[:, 2] / 2
+    boxes[:, 1] = xywh[:, 1] - xywh[:, 3] / 2
+    boxes[:, 2] = xywh[:, 0] + xywh[:, 2] / 2
+    boxes[:, 3] = xywh[:, 1] + xywh[:, 3] / 2
+
+    nms_boxes = np.column_stack([boxes[:, :2], xywh[:, 2:]]).tolist()
+    indices = np.array(
+        cv2.dnn.NMSBoxes(nms_boxes, conf.tolist(), conf_thres, iou_thres), dtype=int
+    ).reshape(-1)
+
+    boxes = boxes[indices]
+    boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad[0]) / ratio
+    boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad[1]) / ratio
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+
+    return np.column_stack([boxes, conf[indices], cls[indices]]).astype(np.float32)
+
+
+def resolve_backend(model_path, backend="auto"):
+    if backend != "auto":
+        return backend
+    if model_path.endswith(".onnx"):
+        return "onnx"
+    if model_path.endswith(TORCHSCRIPT_EXTENSIONS):
+        return "torchscript"
+    return "hub"
+
+
+def load_detector(model_path, backend="auto", conf=CONF_THRESHOLD, threads=0):
+    backend = resolve_backend(model_path, backend)
+    if backend == "hub":
+        return HubDetector(model_path, conf)
+    return ExportedDetector(model_path, backend, conf, threads=threads)
+
+
+def export_detector(model_path, out_dir=None):
+    """
+    One-time export (needs the hub repo once): writes plate_model.torchscript
+    and plate_model.onnx next to the weights, both with a dynamic batch size.
+    """
+    import torch
+
+    class ExportWrapper(torch.nn.Module):
+        def __init__(self, net):
+            super().__init__()
+            self.net = net
+
+        def forward(self, x):
+            y = self.net(x)
+            if isinstance(y, tuple):
+                y = y[0]  # drop training outputs
+            if isinstance(y, list):
+                y = y[-1]  # dual-head models: main head is last
+            return y
+
+    hub_model = HubDetector(model_path).model
+    net = ExportWrapper(hub_model.model.model.float().eval())
+    dummy = torch.zeros(1, 3, INPUT_SIZE, INPUT_SIZE)
+
+    base = os.path.splitext(model_path)[0]
+    if out_dir:
+        base = os.path.join(out_dir, os.path.basename(base))
+
+    with torch.no_grad():
+        traced = torch.jit.trace(net, dummy, strict=False)
+    traced.save(base + ".torchscript")
+
+    torch.onnx.export(
+        net,
+        dummy,
+        base + ".onnx",
+        input_names=["images"],
+        output_names=["output"],
+        dynamic_axes={"images": {0: "batch"}, "output": {0: "batch"}},
+        opset_version=17,
+    )
+    print(f"Exported {base}.torchscript and {base}.onnx")
+
+
+def list_images(image_dir, limit=0):
+    """Image paths in `image_dir`, evenly sampled down to `limit` (0 = all)."""
+    paths = sorted(
+        path
+        for pattern in IMAGE_PATTERNS
+        for path in glob.glob(os.path.join(image_dir, pattern))
+    )
+    if limit and len(paths) > limit:
+        step = len(paths) / limit
+        paths = [paths[int(i * step)] for i in range(limit)]
+    return paths
+
+
+def read_rgb(paths):
+    for path in paths:
+        img = cv2.imread(path)
+        if img is not None:
+            yield path, cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def quantize_detector(onnx_path, image_dir, out_path=None, limit=CALIBRATION_IMAGES):
+    """
+    Static INT8 quantization of an exported ONNX detector: per-channel INT8
+    weights and UINT8 activations (QDQ format), with activation ranges
+    calibrated on letterboxed images from `image_dir`. Writes
+    <name>.int8.onnx, which loads like any other .onnx detector.
+    """
+    import onnxruntime as ort
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+
+    class LetterboxReader(CalibrationDataReader):
+        def __init__(self, paths, input_name):
+            self.images = read_rgb(paths)
+            self.input_name = input_name
+
+        def get_next(self):
+            item = next(self.images, None)
+            if item is None:
+                return None
+            return {self.input_name: letterbox(item[1])[0][None]}
+
+    paths = list_images(image_dir, limit)
+    if not paths:
+        raise ValueError(f"No calibration images found in {image_dir}")
+    session = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+    input_name = session.get_inputs()[0].name
+    out_path = out_path or os.path.splitext(onnx_path)[0] + ".int8.onnx"
+
+    print(f"Calibrating on {len(paths)} images from {image_dir}...")
+    quantize_static(
+        onnx_path,
+        out_path,
+        LetterboxReader(paths, input_name),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        weight_type=QuantType.QInt8,
+        activation_type=QuantType.QUInt8,
+    )
+    print(f"Wrote {out_path}")
+    return out_path
+
+
+def box_iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    if inter == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / float(area_a + area_b - inter)
+
+
+def compare_detectors(reference_path, candidate_path, image_dir, limit=0):
+    """
+    Accuracy check of a reduced-precision detector against its reference:
+    the share of reference plate boxes the candidate also finds (IoU >=
+    AGREEMENT_IOU), extra candidate boxes, and mean latency of both.
+    """
+    reference = load_detector(reference_path)
+    candidate = load_detector(candidate_path)
+    found = missed = extra = 0
+    times = {reference_path: [], candidate_path: []}
+    missed_images = []
+
+    for path, img in read_rgb(list_images(image_dir, limit)):
+        boxes = {}
+        for model_path, detector in (
+            (reference_path, reference),
+            (candidate_path, candidate),
+        ):
+            start = time.perf_counter()
+            boxes[model_path] = detector.detect([img])[0]
+            times[model_path].append((time.perf_counter() - start) * 1000)
+
+        unmatched = [tuple(box[:4]) for box in boxes[candidate_path]]
+        for box in boxes[reference_path]:
+            best = max(unmatched, key=lambda c: box_iou(box[:4], c), default=None)
+            if best is not None and box_iou(box[:4], best) >= AGREEMENT_IOU:
+                unmatched.remove(best)
+                found += 1
+            else:
+                missed += 1
+                missed_images.append(os.path.basename(path))
+        extra += len(unmatched)
+
+    total = found + missed
+    recall = found / total if total else 1.0
+    print(f"Reference boxes found: {found}/{total} ({recall * 100:.2f}%)")
+    print(f"Missed: {missed} | Extra boxes: {extra}")
+    if missed_images:
+        print(f"Images with misses: {', '.join(sorted(set(missed_images)))}")
+    for model_path, values in times.items():
+        if values:
+            mean = sum(values) / len(values)
+            print(f"{os.path.basename(model_path):<30} mean {mean:.1f} ms")
+    return recall
+
+
+def benchmark_one(path, image_dir, runs=20):
+    images = [img for _, img in read_rgb(list_images(image_dir))]
+    if not images:
+        print(f"No images found in {image_dir}")
+        return
+
+    # Cold start covers the torch/onnxruntime import, loading and first call
+    start = time.perf_counter()
+    detector = load_detector(path)
+    detector.detect([images[0]])
+    cold = time.perf_counter() - start
+
+    latencies = []
+    for i in range(runs):
+        start = time.perf_counter()
+        detector.detect([images[i % len(images)]])
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    mean = sum(latencies) / len(latencies)
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    print(f"{resolve_backend(path):<12} | {cold:<15.2f} | {mean:<10.1f} | {p95:.1f}")
+
+
+def benchmark(paths, image_dir, runs=20):
+    header = f"{'BACKEND':<12} | {'COLD START (s)':<15} | {'MEAN (ms)':<10}"
+    print(f"{header} | {'P95 (ms)'}")
+    print("-" * 60)
+    # Each backend runs in a fresh interpreter so cold starts are comparable
+    for path in paths:
+        command = [sys.executable, __file__, "bench-one", path]
+        command += ["--images", image_dir, "--runs", str(runs)]
+        subprocess.run(command, check=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plate detector export/benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = sub.add_parser("export", help="export weights to TorchScript and ONNX")
+    export_cmd.add_argument("model_path", nargs="?", default="./plate_model.pt")
+    export_cmd.add_argument("--out-dir")
+
+    bench_cmd = sub.add_parser("bench", help="compare cold start and latency")
+    bench_cmd.add_argument(
+        "paths",
+        nargs="*",
+        default=[
+            "./plate_model.pt",
+            "./plate_model.torchscript",
+            "./plate_model.onnx",
+            "./plate_model.int8.onnx",
+        ],
+    )
+    bench_cmd.add_argument("--images", default="./Rdata/test_data")
+    bench_cmd.add_argument("--runs", type=int, default=20)
+
+    quantize_cmd = sub.add_parser(
+        "quantize", help="static INT8 quantization of the ONNX export"
+    )
+    quantize_cmd.add_argument("model_path", nargs="?", default="./plate_model.onnx")
+    quantize_cmd.add_argument("--images", default="./Rdata/raw_data")
+    quantize_cmd.add_argument("--out")
+    quantize_cmd.add_argument("--limit", type=int, default=CALIBRATION_IMAGES)
+
+    check_cmd = sub.add_parser(
+        "check", help="compare a quantized detector with its reference"
+    )
+    check_cmd.add_argument("reference", nargs="?", default="./plate_model.onnx")
+    check_cmd.add_argument("candidate", nargs="?", default="./plate_model.int8.onnx")
+    check_cmd.add_argument("--images", default="./Rdata/raw_data")
+    check_cmd.add_argument("--limit", type=int, default=0)
+
+    one_cmd = sub.add_parser("bench-one", help=argparse.SUPPRESS)
+    one_cmd.add_argument("path")
+    one_cmd.add_argument("--images", default="./Rdata/test_data")
+    one_cmd.add_argument("--runs", type=int, default=20)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export_detector(args.model_path, args.out_dir)
+    elif args.command == "quantize":
+        quantize_detector(args.model_path, args.images, args.out, args.limit)
+    elif args.command == "check":
+        compare_detectors(args.reference, args.candidate, args.images, args.limit)
+    elif args.command == "bench-one":
+        benchmark_one(args.path, args.images, args.runs)
+    else:
+        benchmark([p for p in args.paths if os.path.exists(p)], args.images, args.runs)
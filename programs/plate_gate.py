@@ -0,0 +1,82 @@
+import cv2
+
+# The check runs on a grayscale copy with this long side (pixels)
+GATE_LONG_SIDE = 640
+# Horizontal closing joins the character strokes of a plate into one blob
+CLOSE_KERNEL = (17, 3)
+# width / height of a candidate: two-line plates are near 1.5, one-line
+# plates up to about 6
+CANDIDATE_ASPECT = (1.0, 8.0)
+# Candidate area as a fraction of the frame
+CANDIDATE_AREA = (0.0005, 0.2)
+# Share of strong vertical-edge pixels inside a candidate
+MIN_EDGE_DENSITY = 0.2
+# Margin around the candidates, in candidate heights, kept for OCR
+REGION_PADDING = 0.5
+
+
+class PlateGate:
+    """
+    Cheap plate-presence check run before OCR: clusters of strong vertical
+    edges (character strokes) with plate-like shape and size on a small
+    grayscale copy of the frame. Stateless, so it behaves the same in
+    every worker process and batch. region() returns the padded area
+    around all candidates, or None when the frame can be rejected.
+    """
+
+    def __init__(
+        self,
+        long_side=GATE_LONG_SIDE,
+        aspect=CANDIDATE_ASPECT,
+        area=CANDIDATE_AREA,
+        min_density=MIN_EDGE_DENSITY,
+        padding=REGION_PADDING,
+    ):
+        self.long_side = long_side
+        self.aspect = aspect
+        self.area = area
+        self.min_density = min_density
+        self.padding = padding
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_RECT, CLOSE_KERNEL)
+
+    def candidates(self, img):
+        """Plate-like (x1, y1, x2, y2) rectangles in `img` coordinates."""
+        gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        h, w = gray.shape[:2]
+        ratio = min(1.0, self.long_side / max(h, w))
+        if ratio < 1:
+            size = (max(1, round(w * ratio)), max(1, round(h * ratio)))
+            gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+        grad = cv2.convertScaleAbs(cv2.Sobel(gray, cv2.CV_16S, 1, 0, ksize=3))
+        _, edges = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        closed = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, self.kernel)
+        contours, _ = cv2.findContours(
+            closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+        )
+
+        frame_area = gray.shape[0] * gray.shape[1]
+        rects = []
+        for contour in contours:
+            x, y, cw, ch = cv2.boundingRect(contour)
+            if not self.aspect[0] <= cw / ch <= self.aspect[1]:
+                continue
+            if not self.area[0] <= cw * ch / frame_area <= self.area[1]:
+                continue
+            density = cv2.countNonZero(edges[y : y + ch, x : x + cw]) / (cw * ch)
+            if density < self.min_density:
+                continue
+            rects.append((x / ratio, y / ratio, (x + cw) / ratio, (y + ch) / ratio))
+        return rects
+
+    def region(self, img):
+        """Padded integer bounds around every candidate, or None."""
+        rects = self.candidates(img)
+        if not rects:
+            return None
+        h, w = img.shape[:2]
+        x1 = min(r[0] - self.padding * (r[3] - r[1]) for r in rects)
+        y1 = min(r[1] - self.padding * (r[3] - r[1]) for r in rects)
+        x2 = max(r[2] + self.padding * (r[3] - r[1]) for r in rects)
+        y2 = max(r[3] + self.padding * (r[3] - r[1]) for r in rects)
+        return max(0, int(x1)), max(0, int(y1)), min(w, int(x2)), min(h, int(y2))
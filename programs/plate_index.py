@@ -0,0 +1,220 @@
+import difflib
+import math
+from itertools import combinations
+
+from plate_normalize import canonical_plate
+
+MATCH_THRESHOLD = 0.85
+
+
+def deletion_variants(text, depth):
+    """
+    All distinct strings obtained by deleting exactly `depth` characters.
+    """
+    if depth == 0:
+        return {text}
+    if depth > len(text):
+        return set()
+    if depth == 1:
+        return {text[:i] + text[i + 1 :] for i in range(len(text))}
+    variants = set()
+    for drop in combinations(range(len(text)), depth):
+        variants.add("".join(c for i, c in enumerate(text) if i not in drop))
+    return variants
+
+
+def max_indel_distance(len_a, len_b, threshold=MATCH_THRESHOLD):
+    """
+    Largest insert/delete distance two strings can have while their
+    difflib ratio (2 * matches / total length) still exceeds `threshold`.
+    """
+    return math.ceil((1.0 - threshold) * (len_a + len_b) - 1e-9) - 1
+
+
+def plan_lookups(text, key_lengths, key_depth, max_len_diff, threshold):
+    """
+    Yields the lookups that find every key whose difflib ratio with `text`
+    can exceed `threshold`: (depth, variant) means keys that contain
+    `variant` among their `depth`-character deletions (depth 0 is the key
+    itself). (None, length) means the whole bucket of keys with that length
+    must be scanned, because it would need variants deeper than key_depth.
+    """
+    n = len(text)
+    query_variants = {}
+
+    for m in range(max(1, n - max_len_diff), n + max_len_diff + 1):
+        if m not in key_lengths:
+            continue
+        limit = max_indel_distance(n, m, threshold)
+        # key loses i characters, query loses j, both reach the same string
+        for i in range(0, limit + 1):
+            j = i - (m - n)
+            if j < 0 or i + j > limit:
+                continue
+            if i > key_depth:
+                yield None, m
+                break
+            if j not in query_variants:
+                query_variants[j] = deletion_variants(text, j)
+            for variant in query_variants[j]:
+                yield i, variant
+
+
+class PlateIndex:
+    """
+    Fuzzy lookup structure over the plate allowlist.
+
+    Keys are bucketed by length and every key is stored together with its
+    single-character deletions. A query enumerates its own deletions and
+    looks them up, which yields every key within the insert/delete distance
+    that a difflib ratio above the threshold implies. Only those candidates
+    are scored with SequenceMatcher, so results are identical to the linear
+    scan in find_best_match (including tie-breaking on insertion order).
+    """
+
+    def __init__(self, keys, key_depth=1):
+        self.key_depth = key_depth
+        self._keys = []
+        self._positions = {}
+        self._buckets = {}
+        self._variants = [{} for _ in range(key_depth + 1)]
+        for key in keys:
+            self.add(key)
+
+    def add(self, key):
+        if key in self._positions:
+            return
+        pos = len(self._keys)
+        self._keys.append(key)
+        self._positions[key] = pos
+        self._buckets.setdefault(len(key), []).append(pos)
+        for depth in range(1, self.key_depth + 1):
+            table = self._variants[depth]
+            for variant in deletion_variants(key, depth):
+                table.setdefault(variant, []).append(pos)
+
+    def remove(self, key):
+        """
+        Drops a key in place. Its slot becomes a tombstone that lookups skip;
+        a full rebuild (new PlateIndex) reclaims the space.
+        """
+        pos = self._positions.pop(key, None)
+        if pos is None:
+            return False
+        self._keys[pos] = None
+        return True
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def __iter__(self):
+        return (key for key in self._keys if key is not None)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _candidates(self, text, max_len_diff, threshold):
+        candidates = set()
+        plan = plan_lookups(
+            text, self._buckets, self.key_depth, max_len_diff, threshold
+        )
+        for depth, value in plan:
+            if depth is None:
+                candidates.update(self._buckets[value])
+            elif depth == 0:
+                pos = self._positions.get(value)
+                if pos is not None:
+                    candidates.add(pos)
+            else:
+                candidates.update(self._variants[depth].get(value, ()))
+        return sorted(candidates)
+
+    def find(self, text, max_len_diff=1, threshold=MATCH_THRESHOLD):
+        """
+        Best fuzzy match for an already cleaned plate string.
+        Returns (best_match, score) with the same semantics as the linear
+        difflib scan: (None, 0.0) when nothing beats the threshold.
+        """
+        best_match = None
+        best_score = 0.0
+
+        for pos in self._candidates(text, max_len_diff, threshold):
+            db_key = self._keys[pos]
+            if db_key is None:
+                continue
+            similarity = difflib.SequenceMatcher(None, text, db_key).ratio()
+            if similarity > threshold and similarity > best_score:
+                best_score = similarity
+                best_match = db_key
+
+        return best_match, best_score
+
+
+class CanonicalPlateIndex:
+    """
+    Collection of allowlist keys indexed on their canonical form (see
+    plate_normalize.py), so Latin-digit OCR output finds Arabic-Indic keys.
+    exact() answers with one dict lookup; find() runs the fuzzy PlateIndex
+    over the canonical forms. When several keys share a canonical form the
+    one closest to the OCR text wins.
+    """
+
+    def __init__(self, keys, key_depth=1):
+        self._keys = {}
+        self._index = PlateIndex((), key_depth)
+        for key in keys:
+            self.add(key)
+
+    def add(self, key):
+        canon = canonical_plate(key)
+        keys = self._keys.setdefault(canon, [])
+        if key not in keys:
+            keys.append(key)
+            self._index.add(canon)
+
+    def remove(self, key):
+        canon = canonical_plate(key)
+        keys = self._keys.get(canon)
+        if not keys or key not in keys:
+            return False
+        keys.remove(key)
+        if not keys:
+            del self._keys[canon]
+            self._index.remove(canon)
+        return True
+
+    def __contains__(self, key):
+        return key in self._keys.get(canonical_plate(key), ())
+
+    def __iter__(self):
+        return (key for keys in self._keys.values() for key in keys)
+
+    def __len__(self):
+        return sum(len(keys) for keys in self._keys.values())
+
+    def _pick(self, text, canon):
+        keys = self._keys[canon]
+        if len(keys) == 1:
+            return keys[0]
+        return max(keys, key=lambda k: difflib.SequenceMatcher(None, text, k).ratio())
+
+    def exact(self, text):
+        """
+        (key, score) for a cleaned plate whose canonical form, read either
+        way round, is in the allowlist; (None, 0.0) otherwise. Scores follow
+        find_best_match: 1.0 as read, 0.95 reversed.
+        """
+        canon = canonical_plate(text)
+        if canon in self._keys:
+            return self._pick(text, canon), 1.0
+        if canon[::-1] in self._keys:
+            return self._pick(text[::-1], canon[::-1]), 0.95
+        return None, 0.0
+
+    def find(self, text, max_len_diff=1, threshold=MATCH_THRESHOLD):
+        canon, score = self._index.find(
+            canonical_plate(text), max_len_diff, threshold
+        )
+        if canon is None:
+            return None, score
+        return self._pick(text, canon), score
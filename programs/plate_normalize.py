@@ -0,0 +1,60 @@
+ARABIC_INDIC_DIGITS = "٠١٢٣٤٥٦٧٨٩"
+EASTERN_ARABIC_DIGITS = "۰۱۲۳۴۵۶۷۸۹"
+
+# Letter forms EasyOCR and data entry use interchangeably
+LETTER_VARIANTS = {
+    "أ": "ا",
+    "إ": "ا",
+    "آ": "ا",
+    "ٱ": "ا",
+    "ى": "ي",
+    "ی": "ي",
+    "ئ": "ي",
+    "ؤ": "و",
+    "ة": "ه",
+    "ک": "ك",
+    "ـ": "",
+}
+
+# Latin glyphs the recognizer confuses with digits (Arabic ٧ reads as V)
+CONFUSABLES = {
+    "O": "0",
+    "Q": "0",
+    "I": "1",
+    "L": "1",
+    "Z": "2",
+    "S": "5",
+    "G": "6",
+    "V": "7",
+    "B": "8",
+}
+
+
+def _build_table():
+    table = {}
+    for digits in (ARABIC_INDIC_DIGITS, EASTERN_ARABIC_DIGITS):
+        table.update((ord(c), str(i)) for i, c in enumerate(digits))
+    table.update((ord(c), value) for c, value in LETTER_VARIANTS.items())
+    return table
+
+
+CANONICAL_TABLE = _build_table()
+CONFUSABLE_TABLE = str.maketrans(CONFUSABLES)
+
+
+def canonical_plate(clean_text):
+    """
+    Canonical form of a cleaned (alphanumeric, upper-case) plate string:
+    Latin digits and one spelling per Arabic letter. Plates that differ only
+    in these respects collide, so the allowlist can be keyed on this form.
+    """
+    return clean_text.translate(CANONICAL_TABLE)
+
+
+def fold_confusables(clean_text):
+    """
+    OCR reading with look-alike Latin letters replaced by digits. Only for
+    readings that do not match as read: allowlist keys keep their letters,
+    so AB123 and A8123 remain two different plates.
+    """
+    return clean_text.translate(CONFUSABLE_TABLE)
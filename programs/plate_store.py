@@ -0,0 +1,153 @@
+import csv
+import os
+import threading
+import time
+
+import pandas as pd
+
+from plate_array import ArrayPlateIndex
+from plate_index import CanonicalPlateIndex
+
+COL_IMG = "file_name"
+COL_PLATE = "plate_number"
+
+
+def clean_plates(series):
+    """
+    Vectorized cleanup_text: keeps alphanumeric characters and upper-cases.
+    `[\\W_]` is exactly the complement of str.isalnum() for re's Unicode mode.
+    """
+    series = series.fillna("").astype(str)
+    return series.str.replace(r"[\W_]+", "", regex=True).str.upper()
+
+
+def read_plate_csv(csv_path):
+    """
+    Loads the allowlist as {clean_plate: file_name} without a per-row
+    Python loop. Later rows win on duplicate plates, as with iterrows.
+    Raises ValueError if the expected columns are missing.
+    """
+    df = pd.read_csv(csv_path, dtype=str, usecols=[COL_IMG, COL_PLATE])
+    plates = clean_plates(df[COL_PLATE])
+    files = df[COL_IMG].fillna("").str.strip()
+    keep = plates != ""
+    return dict(zip(plates[keep], files[keep]))
+
+
+def build_memory_database(csv_path, key_depth=1):
+    database = read_plate_csv(csv_path)
+    return database, CanonicalPlateIndex(database, key_depth)
+
+
+def build_array_database(csv_path):
+    # The index is also the {plate: file_name} mapping; the dict is dropped
+    plates = ArrayPlateIndex(read_plate_csv(csv_path))
+    return plates, plates
+
+
+class PlateStore:
+    """
+    Allowlist that can change while the server runs.
+
+    `snapshot` is a (database, index) pair. A full reload builds a new pair
+    off to the side and swaps it in with one assignment, so in-flight scans
+    keep using the pair they already hold. add() / remove() edit the live
+    pair in place (each single-key edit is atomic under the GIL) and are
+    written back to the CSV so the next reload keeps them.
+    `builder(csv_path)` returns a fresh (database, index) pair for reloads
+    and `on_change(database, index)` runs after every reload or edit.
+    """
+
+    def __init__(
+        self,
+        csv_path,
+        cleanup,
+        database,
+        index,
+        on_change=None,
+        builder=build_memory_database,
+    ):
+        self.csv_path = csv_path
+        self.cleanup = cleanup
+        self.on_change = on_change
+        self.builder = builder
+        self.snapshot = (database, index)
+        self._mtime = self._file_mtime()
+        self._write_lock = threading.Lock()
+        self._watcher = None
+
+    def _file_mtime(self):
+        try:
+            return os.path.getmtime(self.csv_path)
+        except OSError:
+            return None
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change(*self.snapshot)
+
+    def reload(self):
+        """
+        Rebuilds from the CSV. Read errors propagate and the current
+        snapshot stays in place, so a half-written file never empties it.
+        """
+        mtime = self._file_mtime()
+        database, index = self.builder(self.csv_path)
+        with self._write_lock:
+            self.snapshot = (database, index)
+            self._mtime = mtime
+        print(f"DEBUG: Reloaded {len(database)} plates.")
+        self._changed()
+
+    def add(self, plate, file_name=""):
+        key = self.cleanup(plate)
+        if not key:
+            return None
+        with self._write_lock:
+            database, index = self.snapshot
+            database[key] = file_name
+            index.add(key)
+            write_header = not os.path.exists(self.csv_path)
+            with open(self.csv_path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                if write_header:
+                    writer.writerow([COL_IMG, COL_PLATE])
+                writer.writerow([file_name, plate])
+            self._mtime = self._file_mtime()
+        self._changed()
+        return key
+
+    def remove(self, plate):
+        key = self.cleanup(plate)
+        with self._write_lock:
+            database, index = self.snapshot
+            if database.pop(key, None) is None and key not in index:
+                return False
+            index.remove(key)
+            if os.path.exists(self.csv_path):
+                df = pd.read_csv(self.csv_path, dtype=str)
+                df = df[clean_plates(df[COL_PLATE]) != key]
+                df.to_csv(self.csv_path, index=False)
+            self._mtime = self._file_mtime()
+        self._changed()
+        return True
+
+    def watch(self, interval_seconds):
+        """Polls the CSV's mtime and reloads when another process edits it."""
+        if self._watcher is not None or interval_seconds <= 0:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch_loop, args=(interval_seconds,), daemon=True
+        )
+        self._watcher.start()
+
+    def _watch_loop(self, interval_seconds):
+        while True:
+            time.sleep(interval_seconds)
+            mtime = self._file_mtime()
+            if mtime is not None and mtime != self._mtime:
+                print(f"Reloading plate database from {self.csv_path}...")
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"Error reloading CSV: {e}")
@@ -0,0 +1,206 @@
+from itertools import chain
+
+# A grant is final (no more crops / frames are read) once the votes for one
+# plate reach this: the sum of confidence * match score over its readings.
+VOTE_THRESHOLD = 0.8
+# Tokens on one line are joined when the gap between them is at most this
+# many line heights.
+JOIN_GAP = 1.0
+# Boxes are on the same line when their vertical overlap is at least this
+# fraction of the shorter box.
+LINE_OVERLAP = 0.5
+# Consecutive lines are joined into a two-line reading only when they overlap
+# horizontally and the gap between them is at most this many line heights.
+STACK_GAP = 1.0
+# Tokens and lines are joined only when the shorter is at least this fraction
+# of the taller: plate characters share one height, while dealer-frame
+# lettering and stickers next to a partly read plate are much smaller.
+HEIGHT_RATIO = 0.6
+# Longest token run joined into one hypothesis
+MAX_RUN_TOKENS = 4
+MIN_PLATE_LENGTH = 3
+
+
+def _box(bbox):
+    xs = [float(point[0]) for point in bbox]
+    ys = [float(point[1]) for point in bbox]
+    return min(xs), max(xs), min(ys), max(ys)
+
+
+def _same_line(a, b):
+    overlap = min(a[3], b[3]) - max(a[2], b[2])
+    return overlap >= LINE_OVERLAP * min(a[3] - a[2], b[3] - b[2])
+
+
+def _similar_height(a, b):
+    low, high = sorted((a[3] - a[2], b[3] - b[2]))
+    return low >= HEIGHT_RATIO * high
+
+
+def _extent(tokens):
+    boxes = [box for box, _, _ in tokens]
+    return (
+        min(box[0] for box in boxes),
+        max(box[1] for box in boxes),
+        min(box[2] for box in boxes),
+        max(box[3] for box in boxes),
+    )
+
+
+def _stacked(top, bottom):
+    """
+    True when two lines of similar height sit one above the other, as on a
+    two-line plate.
+    """
+    a, b = _extent(top), _extent(bottom)
+    if min(a[1], b[1]) <= max(a[0], b[0]) or not _similar_height(a, b):
+        return False
+    height = (a[3] - a[2] + b[3] - b[2]) / 2
+    return b[2] - a[3] <= STACK_GAP * height
+
+
+def group_lines(ocr_results):
+    """Readtext tokens grouped into lines (top to bottom, each left to right)."""
+    tokens = sorted(
+        ((_box(bbox), text, float(prob)) for bbox, text, prob in ocr_results),
+        key=lambda token: (token[0][2] + token[0][3]) / 2,
+    )
+    lines = []
+    for token in tokens:
+        for line in lines:
+            if _same_line(line[-1][0], token[0]):
+                line.append(token)
+                break
+        else:
+            lines.append([token])
+    return [sorted(line, key=lambda token: token[0][0]) for line in lines]
+
+
+def _joined(tokens, cleanup):
+    """
+    Both reading orders of a token run, with its char-weighted confidence
+    and its bounding rectangle (x_min, y_min, x_max, y_max).
+    """
+    texts = [cleanup(text) for _, text, _ in tokens]
+    chars = sum(len(text) for text in texts)
+    if not chars:
+        return []
+    conf = sum(len(text) * prob for text, (_, _, prob) in zip(texts, tokens)) / chars
+    rect = (
+        min(box[0] for box, _, _ in tokens),
+        min(box[2] for box, _, _ in tokens),
+        max(box[1] for box, _, _ in tokens),
+        max(box[3] for box, _, _ in tokens),
+    )
+    orders = ["".join(texts)]
+    if len(tokens) > 1:
+        # Arabic plates read right to left
+        orders.append("".join(reversed(texts)))
+    return [(text, conf, rect) for text in orders]
+
+
+def plate_hypotheses(ocr_results, cleanup):
+    """
+    Full-plate readings from one OCR pass: every token, every run of
+    adjacent tokens of similar height on a line (joined in both orders), and
+    consecutive lines stacked like a two-line plate (see _stacked) joined top
+    to bottom. Returns {text: (confidence, rect)}, rect being the
+    (x_min, y_min, x_max, y_max) of its tokens.
+    """
+    lines = group_lines(ocr_results)
+    hypotheses = {}
+
+    def add(tokens):
+        for text, conf, rect in _joined(tokens, cleanup):
+            if conf > hypotheses.get(text, (-1.0, None))[0]:
+                hypotheses[text] = (conf, rect)
+
+    for line in lines:
+        height = sum(box[3] - box[2] for box, _, _ in line) / len(line)
+        for start in range(len(line)):
+            add(line[start : start + 1])
+            for end in range(start + 1, min(len(line), start + MAX_RUN_TOKENS)):
+                prev, box = line[end - 1][0], line[end][0]
+                if box[0] - prev[1] > JOIN_GAP * height:
+                    break
+                if not _similar_height(prev, box):
+                    break
+                add(line[start : end + 1])
+
+    for top, bottom in zip(lines, lines[1:]):
+        if _stacked(top, bottom):
+            add(list(chain(top, bottom)))
+
+    return hypotheses
+
+
+class PlateVoter:
+    """
+    Confidence-weighted vote over plate hypotheses from any number of OCR
+    passes (the crops of one frame, or several frames of one vehicle).
+    `match(text)` returns (allowlist key or None, score), i.e. a bound
+    find_best_match. Matched readings vote for their key, the rest for
+    their own text, which becomes the reported plate on a denial. The
+    rectangle of the reported reading is kept for `plate_box`.
+    """
+
+    def __init__(self, match, cleanup, threshold=VOTE_THRESHOLD):
+        self.match = match
+        self.cleanup = cleanup
+        self.threshold = threshold
+        self.granted = {}
+        self.denied = {}
+        self.readings = {}
+        self._denied_rects = {}
+        self._matches = {}
+
+    def add(self, ocr_results, weight=1.0, rect=None):
+        """
+        Adds one OCR pass; returns True once the best grant is certain.
+        `rect` (e.g. the detector box of a crop) replaces the token
+        rectangles, which are in the coordinates of the OCR'd image.
+        """
+        hypotheses = plate_hypotheses(ocr_results, self.cleanup)
+        for text, (conf, token_rect) in hypotheses.items():
+            if len(text) < MIN_PLATE_LENGTH:
+                continue
+            if text not in self._matches:
+                self._matches[text] = self.match(text)
+            key, score = self._matches[text]
+            vote = conf * weight
+            if key:
+                self.granted[key] = self.granted.get(key, 0.0) + vote * score
+                best = self.readings.get(key)
+                if best is None or conf > best[1]:
+                    self.readings[key] = (text, conf, rect or token_rect)
+            else:
+                self.denied[text] = self.denied.get(text, 0.0) + vote
+                best = self._denied_rects.get(text)
+                if best is None or conf > best[0]:
+                    self._denied_rects[text] = (conf, rect or token_rect)
+        return self.confident
+
+    @property
+    def confident(self):
+        return bool(self.granted) and max(self.granted.values()) >= self.threshold
+
+    def fill_result(self, result, no_text_message):
+        """Writes the winning hypothesis into a new_result() dict."""
+        if self.granted:
+            key = max(self.granted, key=self.granted.get)
+            text, conf, rect = self.readings[key]
+            result["matched"] = True
+            result["matched_plate"] = key
+            result["detected_plate"] = text
+            result["confidence"] = conf
+            result["plate_box"] = [round(v, 1) for v in rect]
+            result["message"] = f"ACCESS GRANTED (Match: {key})"
+        elif self.denied:
+            # Ties go to the longer (more complete) reading
+            text = max(self.denied, key=lambda t: (self.denied[t], len(t)))
+            result["detected_plate"] = text
+            result["plate_box"] = [round(v, 1) for v in self._denied_rects[text][1]]
+            result["message"] = "ACCESS DENIED"
+        else:
+            result["message"] = no_text_message
+        return result
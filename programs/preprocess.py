@@ -0,0 +1,134 @@
+import json
+import struct
+
+import cv2
+import numpy as np
+
+# Decode flags by downscale factor; JPEG decodes these at reduced DCT size
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+# Frame -> original coordinates: original = point / scale + offset
+IDENTITY = (1.0, 0.0, 0.0)
+
+
+def image_size(data):
+    """(width, height) read from a JPEG or PNG header, or None."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            i += 2
+            continue
+        # SOFn (except DHT / JPG / DAC, which share the range) holds the size
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[i + 5 : i + 9])
+            return width, height
+        i += 2 + struct.unpack(">H", data[i + 2 : i + 4])[0]
+    return None
+
+
+def reduction_factor(long_side, target):
+    """Largest IMREAD_REDUCED factor that keeps the long side >= target."""
+    for factor in (8, 4, 2):
+        if long_side // factor >= target:
+            return factor
+    return 1
+
+
+def parse_roi(text):
+    """'x1,y1,x2,y2' as fractions of the frame (0-1), or None."""
+    if not text:
+        return None
+    roi = tuple(float(v) for v in text.split(","))
+    if len(roi) != 4 or not (0 <= roi[0] < roi[2] <= 1 and 0 <= roi[1] < roi[3] <= 1):
+        raise ValueError(f"ROI must be x1,y1,x2,y2 fractions, got {text!r}")
+    return roi
+
+
+def load_rois(path):
+    """JSON file of {camera_id: "x1,y1,x2,y2"} lane areas."""
+    with open(path, encoding="utf-8") as f:
+        return {str(camera): parse_roi(roi) for camera, roi in json.load(f).items()}
+
+
+def map_box(bbox, transform):
+    """EasyOCR box (four [x, y] points) back to original-image coordinates."""
+    scale, offset_x, offset_y = transform
+    return [[x / scale + offset_x, y / scale + offset_y] for x, y in bbox]
+
+
+def map_rect(rect, transform):
+    """[x_min, y_min, x_max, y_max] back to original-image coordinates."""
+    scale, offset_x, offset_y = transform
+    x_min, y_min, x_max, y_max = rect
+    return [
+        round(x_min / scale + offset_x, 1),
+        round(y_min / scale + offset_y, 1),
+        round(x_max / scale + offset_x, 1),
+        round(y_max / scale + offset_y, 1),
+    ]
+
+
+def map_result_box(result, transform):
+    """Maps a scan result's plate_box (if any) back to the uploaded image."""
+    if result.get("plate_box") and transform != IDENTITY:
+        result["plate_box"] = map_rect(result["plate_box"], transform)
+    return result
+
+
+class Preprocessor:
+    """
+    Shrinks frames before OCR: optional ROI crop (fractions of the frame),
+    then a resize so the long side is at most `long_side` pixels (0 = off).
+    Large JPEGs are decoded straight at 1/2, 1/4 or 1/8 size. Every method
+    returns (img, transform); map_box() turns OCR boxes on the small image
+    back into original coordinates.
+    """
+
+    def __init__(self, long_side=0, roi=None):
+        self.long_side = long_side
+        self.roi = roi
+
+    def decode(self, data):
+        factor = 1
+        if self.long_side:
+            size = image_size(data)
+            if size:
+                factor = reduction_factor(max(size), self.long_side)
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), REDUCED_FLAGS[factor])
+        if img is None:
+            return None, IDENTITY
+        return self.apply(img, 1.0 / factor)
+
+    def apply(self, img, scale=1.0):
+        offset_x = offset_y = 0.0
+        if self.roi:
+            h, w = img.shape[:2]
+            x1, x2 = int(self.roi[0] * w), int(self.roi[2] * w)
+            y1, y2 = int(self.roi[1] * h), int(self.roi[3] * h)
+            if x2 > x1 and y2 > y1:
+                img = img[y1:y2, x1:x2]
+                offset_x, offset_y = x1 / scale, y1 / scale
+
+        if self.long_side:
+            h, w = img.shape[:2]
+            ratio = self.long_side / max(h, w)
+            if ratio < 1:
+                size = (max(1, round(w * ratio)), max(1, round(h * ratio)))
+                img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+                scale *= ratio
+
+        return img, (scale, offset_x, offset_y)
@@ -0,0 +1,65 @@
+import json
+from urllib.parse import urlencode
+
+import cv2
+import urllib3
+
+
+class RemoteError(Exception):
+    """The scan server could not be reached or refused the request."""
+
+
+class RemoteScanner:
+    """
+    Client for a running /scan server (alpr_server, test or asgi_server).
+    Frames are re-encoded as JPEG at `quality` and sent as a raw image/jpeg
+    body; connections are pooled and kept alive between scans. Results are
+    the server's result dicts, including plate_box in frame pixels.
+    """
+
+    def __init__(self, base_url, quality=90, timeout=30.0, pool_size=2):
+        self.base_url = base_url.rstrip("/")
+        self.quality = quality
+        self.http = urllib3.PoolManager(
+            maxsize=pool_size,
+            block=True,
+            retries=False,
+            timeout=urllib3.Timeout(connect=5.0, read=timeout),
+        )
+
+    def _request(self, method, path, body=None, headers=None):
+        try:
+            response = self.http.request(
+                method, self.base_url + path, body=body, headers=headers
+            )
+        except urllib3.exceptions.HTTPError as e:
+            raise RemoteError(f"Server unreachable: {e}")
+        try:
+            data = json.loads(response.data)
+        except ValueError:
+            raise RemoteError(f"Bad response from server ({response.status})")
+        return response.status, data
+
+    def encode(self, img):
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise RemoteError("Could not encode image")
+        return buf.tobytes()
+
+    def ready(self):
+        try:
+            status, _ = self._request("GET", "/ready")
+        except RemoteError:
+            return False
+        return status == 200
+
+    def scan(self, img, camera=None):
+        """Scans one BGR frame; returns the server's result dict."""
+        query = {"camera": camera} if camera else {}
+        path = "/scan" + ("?" + urlencode(query) if query else "")
+        status, data = self._request(
+            "POST", path, self.encode(img), {"Content-Type": "image/jpeg"}
+        )
+        if status != 200:
+            raise RemoteError(data.get("error", f"Server error ({status})"))
+        return data
@@ -0,0 +1,102 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+HASH_SIZE = 16
+
+
+def content_key(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def perceptual_hash(img, hash_size=HASH_SIZE):
+    """
+    Difference hash of a BGR or grayscale image as a Python int
+    (hash_size * hash_size bits). Near-identical frames differ in few bits.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL for scan results. Results
+    depend on PLATE_DATABASE, so invalidate() must be called when it reloads.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, stored_at):
+        return self.ttl > 0 and time.monotonic() - stored_at > self.ttl
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry[1]):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def get(self, key):
+        with self._lock:
+            value = self._lookup(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(value)
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (dict(value), time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class PerceptualCache(ResultCache):
+    """
+    Keyed by perceptual_hash(); a lookup hits any live entry within
+    `max_distance` differing bits, so near-duplicate frames share a result.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=30.0, max_distance=8):
+        super().__init__(max_entries, ttl_seconds)
+        self.max_distance = max_distance
+
+    def _lookup(self, key):
+        value = super()._lookup(key)
+        if value is not None:
+            return value
+        for other in list(self._entries):
+            if bin(other ^ key).count("1") <= self.max_distance:
+                value = super()._lookup(other)
+                if value is not None:
+                    return value
+        return None
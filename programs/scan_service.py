@@ -0,0 +1,687 @@
+import os
+import threading
+import time
+import difflib
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from flask import Flask, Response, request, jsonify
+from flask_cors import CORS
+from plate_array import ArrayPlateIndex
+from plate_index import CanonicalPlateIndex
+from plate_normalize import fold_confusables
+from plate_votes import PlateVoter
+from ocr_profile import DEFAULT_PLATE_ALPHABET, DEFAULT_TEXT_ASPECT, make_profile
+from plate_store import (
+    PlateStore,
+    build_array_database,
+    build_memory_database,
+    read_plate_csv,
+)
+from plate_db import SqlitePlateIndex, build_plate_db, ensure_plate_db
+from worker_pool import InferencePool, PoolBusy, set_torch_threads
+from micro_batcher import MicroBatcher
+from metrics import ScanMetrics
+from ingest import UploadError, parse_batch, parse_upload, read_body
+from preprocess import map_result_box
+from result_cache import ResultCache, PerceptualCache, content_key, perceptual_hash
+
+# Serving and allowlist matching shared by both pipelines. A pipeline module
+# (alpr_server: full-frame OCR, test: YOLO crops + OCR) implements only the
+# detect/OCR stage and plugs it in with use_pipeline(); everything else here
+# (allowlist, caches, batching, worker pool, metrics, routes) is common.
+
+app = Flask(__name__)
+CORS(app)
+
+# Worker-pool mode: with ALPR_WORKERS > 0 this process only serves HTTP and
+# every worker process loads its own models (see worker_pool.py).
+WORKERS = int(os.environ.get("ALPR_WORKERS", "0"))
+QUEUE_SIZE = int(os.environ.get("ALPR_QUEUE_SIZE", str(WORKERS * 2)))
+# Intra-op threads per model process (0 = torch default, or CPUs / workers
+# in pool mode); ONNX Runtime detectors use the same count. Pool workers get
+# theirs from init().
+TORCH_THREADS = int(os.environ.get("ALPR_TORCH_THREADS", "0"))
+# EasyOCR precision on CPU: "int8" runs the recognizer with dynamic INT8
+# quantization (EasyOCR's own default), "fp32" keeps full precision.
+OCR_PRECISION = os.environ.get("ALPR_OCR_PRECISION", "int8")
+# OCR profile: "full" decodes EasyOCR's whole Arabic + English charset;
+# "plate" loads only the models the plate alphabet needs, decodes only
+# ALPR_PLATE_ALPHABET and skips text boxes whose width / height is outside
+# ALPR_TEXT_ASPECT (min,max) before recognition (see ocr_profile.py).
+PROFILE = make_profile(
+    os.environ.get("ALPR_OCR_PROFILE", "full"),
+    os.environ.get("ALPR_PLATE_ALPHABET", DEFAULT_PLATE_ALPHABET),
+    os.environ.get("ALPR_TEXT_ASPECT", DEFAULT_TEXT_ASPECT),
+)
+RETRY_AFTER_SECONDS = 1
+POOL = None
+
+# Micro-batching: concurrent /scan requests that arrive within BATCH_WAIT_MS
+# of each other share one batched pass (up to BATCH_MAX images, 0 = off).
+BATCH_MAX = int(os.environ.get("ALPR_BATCH_MAX", "0"))
+BATCH_WAIT_MS = float(os.environ.get("ALPR_BATCH_WAIT_MS", "10"))
+BATCHER = None
+
+# Result caches: exact upload bytes always, near-duplicate frames (perceptual
+# hash of the decoded image) only with ALPR_PHASH_CACHE=1.
+CACHE_SIZE = int(os.environ.get("ALPR_CACHE_SIZE", "1024"))
+CACHE_TTL = float(os.environ.get("ALPR_CACHE_TTL", "30"))
+RESULT_CACHE = ResultCache(CACHE_SIZE, CACHE_TTL)
+PHASH_CACHE = None
+if os.environ.get("ALPR_PHASH_CACHE", "0") == "1":
+    PHASH_CACHE = PerceptualCache(
+        CACHE_SIZE // 4, CACHE_TTL, int(os.environ.get("ALPR_PHASH_DISTANCE", "8"))
+    )
+
+# Fast start: serve immediately and warm up in the background (/ready
+# reports 503 until done) instead of loading models before app.run.
+FAST_START = os.environ.get("ALPR_FAST_START", "0") == "1"
+
+# Plate hypotheses are voted on (plate_votes.py); a plate whose votes reach
+# VOTE_THRESHOLD is granted without reading further crops or frames.
+VOTE_THRESHOLD = float(os.environ.get("ALPR_VOTE_THRESHOLD", "0.8"))
+
+# The detect/OCR stage in use and the module name pool workers import for
+# it (see use_pipeline). Fuzzy allowlist matches may differ in length by
+# MAX_LEN_DIFF characters; the pipeline sets it for its OCR input, and the
+# allowlist indexes store deletions that deep (init() runs after it is set).
+PIPELINE = None
+PIPELINE_NAME = None
+MAX_LEN_DIFF = 1
+
+# The reader is created on first use (get_reader) so importing this module
+# for cleanup_text / load_database / find_best_match stays cheap.
+reader = None
+MODELS_READY = threading.Event()
+_models_lock = threading.Lock()
+
+CSV_PATH = "./Rdata/labels.csv"
+# labels.csv is polled for changes every DB_WATCH_SECONDS (0 = never)
+DB_WATCH_SECONDS = float(os.environ.get("ALPR_DB_WATCH_SECONDS", "2"))
+# Plate database backend: "memory" (dict + CanonicalPlateIndex in every process),
+# "array" (ArrayPlateIndex alone: NumPy arrays of about 100 bytes per plate
+# with file names and no dict, against ~1.5 kB for "memory", traded for
+# fuzzy lookups that scan every plate of similar length, a few ms each at
+# 100k plates instead of ~0.05 ms) or "sqlite" (one indexed file at DB_PATH, shared
+# read-only by pool workers)
+DB_BACKEND = os.environ.get("ALPR_DB_BACKEND", "memory")
+DB_PATH = os.environ.get("ALPR_DB_PATH", "./Rdata/plates.sqlite")
+# Set by init() in pool workers, which open the SQLite file read-only
+IN_WORKER = False
+# Admin endpoints require this token in X-Admin-Token when it is set
+ADMIN_TOKEN = os.environ.get("ALPR_ADMIN_TOKEN", "")
+# /scan bodies larger than this are refused before they are read
+MAX_UPLOAD_BYTES = int(float(os.environ.get("ALPR_MAX_UPLOAD_MB", "20")) * 2**20)
+# Same for a whole /scan/batch body (all of its images)
+MAX_BATCH_UPLOAD_BYTES = int(
+    float(os.environ.get("ALPR_MAX_BATCH_UPLOAD_MB", "100")) * 2**20
+)
+DECODE_POOL = None
+
+# Loaded by init(); importing this module opens no database and starts no
+# threads, so the helpers above can be imported on their own.
+PLATE_DATABASE = {}
+DB_KEYS = CanonicalPlateIndex([])
+PLATE_STORE = None
+
+
+def use_pipeline(module, name, max_len_diff=1):
+    """
+    Plugs in a pipeline's detect/OCR stage. `module` provides warm_up(),
+    decode_frame(data, camera=None, shape=None), process_image_from_memory
+    (img, timings=None) and process_images_batch(imgs); `name` is the module
+    pool workers import (the pipeline may be running as __main__).
+    """
+    global PIPELINE, PIPELINE_NAME, MAX_LEN_DIFF, BATCHER
+    PIPELINE = module
+    PIPELINE_NAME = name
+    MAX_LEN_DIFF = max_len_diff
+    if BATCH_MAX > 1 and WORKERS == 0:
+        BATCHER = MicroBatcher(module.process_images_batch, BATCH_MAX, BATCH_WAIT_MS)
+
+
+# Names older code used on the pipeline modules (alpr_server.DB_KEYS,
+# test.cleanup_text, ...); pipeline_getattr() resolves them here
+SHARED_NAMES = (
+    "cleanup_text",
+    "load_database",
+    "find_best_match",
+    "init",
+    "reader",
+    "PLATE_DATABASE",
+    "DB_KEYS",
+)
+
+
+def pipeline_getattr(module_name):
+    """
+    Module __getattr__ for a pipeline that re-exports SHARED_NAMES. They are
+    looked up on every access, since reloads replace PLATE_DATABASE/DB_KEYS.
+    """
+
+    def __getattr__(name):
+        if name in SHARED_NAMES:
+            return globals()[name]
+        raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+
+    return __getattr__
+
+
+def get_reader():
+    global reader
+    if reader is None:
+        with _models_lock:
+            if reader is None:
+                import easyocr
+
+                if TORCH_THREADS > 0 and not IN_WORKER:
+                    set_torch_threads(TORCH_THREADS)
+
+                print("Initializing EasyOCR...")
+                reader = easyocr.Reader(
+                    PROFILE.languages, gpu=False, quantize=OCR_PRECISION == "int8"
+                )
+    return reader
+
+
+def readtext(img):
+    """EasyOCR readtext under the configured OCR profile."""
+    return PROFILE.readtext(get_reader(), img)
+
+
+def cleanup_text(text):
+    if not isinstance(text, str):
+        return str(text).upper()
+    return "".join(e for e in text if e.isalnum()).upper()
+
+
+def load_database(csv_path):
+    try:
+        if not os.path.exists(csv_path):
+            print(f"ERROR: CSV file not found at {os.path.abspath(csv_path)}")
+            return {}
+
+        db_map = read_plate_csv(csv_path)
+
+        print(f"DEBUG: Loaded {len(db_map)} plates from database.")
+        return db_map
+
+    except Exception as e:
+        print(f"Error loading CSV: {e}")
+        return {}
+
+
+def count_lookup(stats, outcome):
+    if stats is not None:
+        name = f"match_{outcome}"
+        stats[name] = stats.get(name, 0) + 1
+
+
+def find_best_match(detected_text, database_keys, stats=None, max_len_diff=1):
+    """
+    Allowlist match for one OCR reading: (key or None, score). Indexed
+    allowlists compare canonical forms (Arabic-Indic and Latin digits
+    alike); the exact step is one hash lookup per reading. Fuzzy matches differ in
+    length by at most `max_len_diff`. When `stats` is a dict the outcome is
+    counted in it as match_exact / match_fuzzy / match_miss.
+    """
+    detected_clean = cleanup_text(detected_text)
+
+    if isinstance(
+        database_keys, (CanonicalPlateIndex, ArrayPlateIndex, SqlitePlateIndex)
+    ):
+        # Look-alike letters are read as digits only when the reading does
+        # not match as is, so keys differing only in them both stay grantable
+        readings = [detected_clean]
+        folded = fold_confusables(detected_clean)
+        if folded != detected_clean:
+            readings.append(folded)
+        for text in readings:
+            match = database_keys.exact(text)
+            if match[0] is not None:
+                count_lookup(stats, "exact")
+                return match
+        for text in readings:
+            match = database_keys.find(text, max_len_diff=max_len_diff)
+            if match[0] is not None:
+                count_lookup(stats, "fuzzy")
+                return match
+        count_lookup(stats, "miss")
+        return None, 0.0
+
+    detected_reversed = detected_clean[::-1]
+
+    if detected_clean in database_keys:
+        return detected_clean, 1.0
+
+    if detected_reversed in database_keys:
+        return detected_reversed, 0.95
+
+    best_match = None
+    best_score = 0.0
+
+    for db_key in database_keys:
+        if abs(len(detected_clean) - len(db_key)) > max_len_diff:
+            continue
+
+        similarity = difflib.SequenceMatcher(None, detected_clean, db_key).ratio()
+
+        if similarity > 0.85 and similarity > best_score:
+            best_score = similarity
+            best_match = db_key
+
+    return best_match, best_score
+
+
+def build_sqlite_database(csv_path):
+    build_plate_db(csv_path, DB_PATH, key_depth=MAX_LEN_DIFF)
+    plates = SqlitePlateIndex(DB_PATH)
+    return plates, plates
+
+
+def prepare_database():
+    """
+    Rebuilds the SQLite file from labels.csv when it is stale. Only the
+    serving process (or an offline tool, before starting its pool) does
+    this; workers open the file read-only.
+    """
+    if DB_BACKEND == "sqlite":
+        ensure_plate_db(CSV_PATH, DB_PATH, key_depth=MAX_LEN_DIFF)
+
+
+def open_database():
+    if DB_BACKEND == "sqlite":
+        try:
+            if not IN_WORKER:
+                prepare_database()
+            plates = SqlitePlateIndex(DB_PATH, read_only=IN_WORKER)
+            print(f"DEBUG: Using plate database {DB_PATH} ({len(plates)} plates).")
+            return plates, plates
+        except Exception as e:
+            print(f"Error opening {DB_PATH}: {e}")
+            return {}, CanonicalPlateIndex([])
+
+    database = load_database(CSV_PATH)
+    if DB_BACKEND == "array":
+        plates = ArrayPlateIndex(database)
+        return plates, plates
+    return database, CanonicalPlateIndex(database, key_depth=MAX_LEN_DIFF)
+
+
+def install_database(database, index):
+    global PLATE_DATABASE, DB_KEYS
+    PLATE_DATABASE = database
+    DB_KEYS = index
+    # Cached decisions were made against the old allowlist
+    RESULT_CACHE.invalidate()
+    if PHASH_CACHE is not None:
+        PHASH_CACHE.invalidate()
+
+
+def init(worker=False, torch_threads=None):
+    """
+    Opens the plate database, starts watching labels.csv and creates the
+    decode threads. Entry points call this once after importing their
+    pipeline; pool workers pass worker=True and their torch thread count.
+    """
+    global IN_WORKER, TORCH_THREADS, DECODE_POOL, PLATE_STORE
+    if PLATE_STORE is not None:
+        return
+    IN_WORKER = worker
+    if torch_threads is not None:
+        TORCH_THREADS = torch_threads
+    DECODE_POOL = ThreadPoolExecutor(max_workers=4)
+
+    database, index = open_database()
+    install_database(database, index)
+    PLATE_STORE = PlateStore(
+        CSV_PATH,
+        cleanup_text,
+        database,
+        index,
+        on_change=install_database,
+        builder={
+            "sqlite": build_sqlite_database,
+            "array": build_array_database,
+        }.get(DB_BACKEND, partial(build_memory_database, key_depth=MAX_LEN_DIFF)),
+    )
+    # With SQLite only the serving process rebuilds; workers see the new file
+    if DB_BACKEND != "sqlite" or not IN_WORKER:
+        PLATE_STORE.watch(DB_WATCH_SECONDS)
+
+
+def reload_database():
+    PLATE_STORE.reload()
+
+
+def new_voter(stats=None):
+    """Voter over DB_KEYS; allowlist lookups are counted into `stats`."""
+    return PlateVoter(
+        lambda text: find_best_match(text, DB_KEYS, stats, MAX_LEN_DIFF),
+        cleanup_text,
+        VOTE_THRESHOLD,
+    )
+
+
+def new_result():
+    return {
+        "success": False,
+        "matched": False,
+        "matched_plate": None,
+        "detected_plate": None,
+        "confidence": 0.0,
+        # [x_min, y_min, x_max, y_max] of the reported plate, in pixels of
+        # the uploaded image
+        "plate_box": None,
+        # True when the frame was turned away before OCR (no plate candidate
+        # from the gate, or no YOLO detection)
+        "rejected": False,
+        "message": "",
+    }
+
+
+def decode_images(blobs):
+    # cv2.imdecode releases the GIL, so frames decode in parallel.
+    return list(DECODE_POOL.map(PIPELINE.decode_frame, blobs))
+
+
+# Prometheus metrics on /metrics. Stage latencies come from the timings
+# dicts the pipeline fills (returned by the workers in pool mode).
+METRICS = ScanMetrics()
+
+
+def queue_depth():
+    if POOL is not None:
+        return POOL.in_flight()
+    if BATCHER is not None:
+        return BATCHER.pending()
+    return 0
+
+
+def cache_lookups():
+    counts = {}
+    for name, cache in (("bytes", RESULT_CACHE), ("perceptual", PHASH_CACHE)):
+        if cache is None:
+            continue
+        stats = cache.stats()
+        counts[(name, "hit")] = stats["hits"]
+        counts[(name, "miss")] = stats["misses"]
+    return counts
+
+
+METRICS.registry.gauge(
+    "alpr_queue_depth", "Scans waiting for or running on the models.", queue_depth
+)
+METRICS.registry.sampled_counter(
+    "alpr_cache_lookups_total",
+    "Result cache lookups by cache and outcome.",
+    cache_lookups,
+    ("cache", "result"),
+)
+
+
+def process_blobs_batch(blobs):
+    start = time.perf_counter()
+    frames = decode_images(blobs)
+    decode_ms = (time.perf_counter() - start) * 1000
+
+    results, timings = PIPELINE.process_images_batch([img for img, _ in frames])
+    for result, (_, transform) in zip(results, frames):
+        map_result_box(result, transform)
+    timings["decode_ms"] = decode_ms
+    return results, timings
+
+
+def is_cacheable(result):
+    return result["success"] and "Error" not in result["message"]
+
+
+def scan_decoded(img, timings=None):
+    phash = None
+    if PHASH_CACHE is not None and img is not None:
+        phash = perceptual_hash(img)
+        cached = PHASH_CACHE.get(phash)
+        if cached is not None:
+            return cached
+
+    if BATCHER is not None and img is not None:
+        data, batch_timings = BATCHER.submit(img)
+        if timings is not None:
+            timings.update(batch_timings)
+    else:
+        data = PIPELINE.process_image_from_memory(img, timings)
+
+    if phash is not None and is_cacheable(data):
+        PHASH_CACHE.put(phash, data)
+    return data
+
+
+def busy_response():
+    response = jsonify({"error": "Server busy, retry later"})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(RETRY_AFTER_SECONDS)
+    return response
+
+
+def wants_timings():
+    return request.args.get("timings", "0") not in ("0", "", "false")
+
+
+@app.after_request
+def count_request(response):
+    # Route pattern, not path, so /admin/plates/<plate> is one series
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    METRICS.observe_request(route, response.status_code)
+    return response
+
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    if not MODELS_READY.is_set():
+        return jsonify({"ready": False}), 503
+    return jsonify({"ready": True})
+
+
+def ready_pool():
+    """The started worker pool; PoolBusy (503) while it is still starting."""
+    if POOL is None:
+        raise PoolBusy()
+    return POOL
+
+
+def scan_upload(upload, start=None):
+    """
+    Cached scan of one ingest.Upload, shared by the Flask and ASGI apps.
+    The optional `camera` field selects the per-camera ROI.
+    Returns (result, timings); raises PoolBusy when the worker pool is full
+    or still starting.
+    """
+    start = time.perf_counter() if start is None else start
+    timings = {}
+    camera = upload.fields.get("camera")
+    cache_key = content_key(upload.data)
+    if upload.shape is not None:
+        cache_key += ":{}x{}".format(*upload.shape)
+    if camera:
+        cache_key += f":{camera}"
+    data = RESULT_CACHE.get(cache_key)
+    if data is None:
+        if WORKERS > 0:
+            # The worker needs its own copy of the buffer anyway
+            pool = ready_pool()
+            data, timings = pool.scan(bytes(upload.data), camera, upload.shape)
+        else:
+            img, transform = PIPELINE.decode_frame(upload.data, camera, upload.shape)
+            timings["decode_ms"] = (time.perf_counter() - start) * 1000
+            data = map_result_box(scan_decoded(img, timings), transform)
+
+        if is_cacheable(data):
+            RESULT_CACHE.put(cache_key, data)
+
+    timings["total_ms"] = (time.perf_counter() - start) * 1000
+    METRICS.observe_result(data)
+    METRICS.observe_timings("/scan", timings)
+    return data, timings
+
+
+def request_upload():
+    """
+    /scan body read straight from the WSGI stream: no Werkzeug form
+    parsing or spooling to disk, and the image is buffered only once.
+    """
+    body = read_body(request.stream, request.content_length, MAX_UPLOAD_BYTES)
+    headers = {name.lower(): value for name, value in request.headers.items()}
+    return parse_upload(body, request.content_type, headers, request.args.to_dict())
+
+
+def round_timings(timings):
+    """Stage latencies (the *_ms entries of a timings dict), rounded."""
+    return {
+        name: round(value, 2) for name, value in timings.items() if name.endswith("_ms")
+    }
+
+
+def lookup_counts(timings):
+    """Allowlist lookups in a timings dict by outcome (exact / fuzzy / miss)."""
+    return {
+        name[len("match_") :]: value
+        for name, value in timings.items()
+        if name.startswith("match_") and not name.endswith("_ms")
+    }
+
+
+@app.route("/scan", methods=["POST"])
+def scan_plate():
+    start = time.perf_counter()
+    try:
+        upload = request_upload()
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status
+
+    try:
+        data, timings = scan_upload(upload, start)
+    except PoolBusy:
+        return busy_response()
+
+    if wants_timings():
+        data["timings"] = round_timings(timings)
+        data["lookups"] = lookup_counts(timings)
+    return jsonify(data)
+
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    stats = {"bytes": RESULT_CACHE.stats()}
+    if PHASH_CACHE is not None:
+        stats["perceptual"] = PHASH_CACHE.stats()
+    return jsonify(stats)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(METRICS.render(), content_type=METRICS.registry.content_type)
+
+
+def admin_denied():
+    if ADMIN_TOKEN and request.headers.get("X-Admin-Token") != ADMIN_TOKEN:
+        return jsonify({"error": "Forbidden"}), 403
+    return None
+
+
+@app.route("/admin/plates", methods=["POST"])
+def admin_add_plate():
+    denied = admin_denied()
+    if denied:
+        return denied
+
+    payload = request.get_json(silent=True) or {}
+    plate = payload.get("plate")
+    if not plate:
+        return jsonify({"error": "Missing 'plate'"}), 400
+
+    key = PLATE_STORE.add(str(plate), str(payload.get("file_name", "")))
+    if key is None:
+        return jsonify({"error": "Plate has no alphanumeric characters"}), 400
+    return jsonify({"added": key, "plates": len(PLATE_DATABASE)})
+
+
+@app.route("/admin/plates/<plate>", methods=["DELETE"])
+def admin_remove_plate(plate):
+    denied = admin_denied()
+    if denied:
+        return denied
+
+    if not PLATE_STORE.remove(plate):
+        return jsonify({"error": "Plate not found"}), 404
+    return jsonify({"removed": cleanup_text(plate), "plates": len(PLATE_DATABASE)})
+
+
+@app.route("/admin/reload", methods=["POST"])
+def admin_reload():
+    denied = admin_denied()
+    if denied:
+        return denied
+
+    try:
+        reload_database()
+    except Exception as e:
+        return jsonify({"error": f"Reload failed: {e}"}), 500
+    return jsonify({"plates": len(PLATE_DATABASE)})
+
+
+@app.route("/scan/batch", methods=["POST"])
+def scan_batch():
+    batch_start = time.perf_counter()
+    # Read and split like /scan: no Werkzeug form parsing or spooling
+    try:
+        body = read_body(
+            request.stream, request.content_length, MAX_BATCH_UPLOAD_BYTES
+        )
+        blobs = parse_batch(body, request.content_type)
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status
+
+    if WORKERS > 0:
+        try:
+            # Workers get their own copies anyway
+            results, timings = ready_pool().scan_batch([bytes(b) for b in blobs])
+        except PoolBusy:
+            return busy_response()
+    else:
+        results, timings = process_blobs_batch(blobs)
+
+    timings["total_ms"] = (time.perf_counter() - batch_start) * 1000
+    for result in results:
+        METRICS.observe_result(result)
+    METRICS.observe_timings("/scan/batch", timings)
+    lookups = lookup_counts(timings)
+    timings = round_timings(timings)
+    timings["images"] = len(blobs)
+
+    return jsonify({"results": results, "timings": timings, "lookups": lookups})
+
+
+def start_warm_up():
+    """
+    Starts the worker pool, or loads the pipeline's models in this process,
+    then marks the server as ready.
+    """
+    global POOL
+    if WORKERS > 0:
+        pool = InferencePool(PIPELINE_NAME, WORKERS, QUEUE_SIZE, TORCH_THREADS)
+        pool.start()
+        POOL = pool
+    else:
+        PIPELINE.warm_up()
+    MODELS_READY.set()
+    print("Models ready.")
+
+
+def run(port=5000):
+    init()
+    if FAST_START:
+        threading.Thread(target=start_warm_up, daemon=True).start()
+    else:
+        start_warm_up()
+
+    app.run(host="0.0.0.0", port=port)
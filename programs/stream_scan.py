@@ -0,0 +1,195 @@
+import argparse
+import time
+
+import cv2
+
+import scan_service
+import test
+from batch_scan import positive_int
+
+IOU_MATCH = 0.3
+
+
+def iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    if inter == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / float(area_a + area_b - inter)
+
+
+class Track:
+    def __init__(self, track_id, box, frame_idx):
+        self.track_id = track_id
+        self.box = box
+        self.first_frame = frame_idx
+        self.last_frame = frame_idx
+        self.missed = 0
+        self.ocr_calls = 0
+        self.voter = scan_service.new_voter()
+        self.result = None
+        self.decided = False
+
+
+class PlateTracker:
+    """
+    Greedy IoU tracker over YOLO plate boxes. Each track is OCR'd at most
+    `max_ocr` times, voting across those frames, and produces exactly one
+    access decision: as soon as the votes for a plate are conclusive (or a
+    match stands after the last OCR), or with the best reading when the
+    track is lost.
+    """
+
+    def __init__(self, max_ocr=2, max_missed=5, on_decision=print):
+        self.max_ocr = max_ocr
+        self.max_missed = max_missed
+        self.on_decision = on_decision
+        self.tracks = []
+        self.finished = []
+        self.ocr_calls = 0
+        self._next_id = 1
+
+    def update(self, frame_idx, detections):
+        """detections: list of (box, crop, conf) from one detector pass."""
+        unmatched = list(range(len(self.tracks)))
+        for box, crop, conf in sorted(detections, key=lambda d: d[2], reverse=True):
+            best, best_iou = None, IOU_MATCH
+            for i in unmatched:
+                overlap = iou(self.tracks[i].box, box)
+                if overlap >= best_iou:
+                    best, best_iou = i, overlap
+            if best is None:
+                track = Track(self._next_id, box, frame_idx)
+                self._next_id += 1
+                self.tracks.append(track)
+            else:
+                unmatched.remove(best)
+                track = self.tracks[best]
+                track.box = box
+                track.last_frame = frame_idx
+                track.missed = 0
+            self._maybe_ocr(track, crop)
+
+        for i in unmatched:
+            self.tracks[i].missed += 1
+        for track in [t for t in self.tracks if t.missed > self.max_missed]:
+            self._finish(track)
+
+    def _maybe_ocr(self, track, crop):
+        if track.decided or track.ocr_calls >= self.max_ocr:
+            return
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        ocr_results = test.ocr_crops([gray])[0]
+        track.ocr_calls += 1
+        self.ocr_calls += 1
+
+        # Votes accumulate over every frame OCR'd for this vehicle
+        confident = track.voter.add(ocr_results, rect=track.box)
+        track.result = track.voter.fill_result(
+            scan_service.new_result(), "Plate Detected, but OCR failed to read text."
+        )
+        track.result["success"] = True
+        if confident or (track.result["matched"] and track.ocr_calls >= self.max_ocr):
+            self._decide(track)
+
+    def _decide(self, track):
+        track.decided = True
+        self.on_decision(track)
+
+    def _finish(self, track):
+        self.tracks.remove(track)
+        if not track.decided:
+            if track.result is None:
+                track.result = scan_service.new_result()
+                track.result["message"] = "Plate tracked, but never read."
+            self._decide(track)
+        self.finished.append(track)
+
+    def flush(self):
+        for track in list(self.tracks):
+            self._finish(track)
+
+
+def detect_plates(img):
+    detector = test.get_model()
+    if detector is None:
+        return []
+    rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    detections = detector.detect([rgb])[0]
+
+    return [
+        (box, crop, float(conf))
+        for crop, conf, box in test.crops_from_detections(img, detections)
+    ]
+
+
+def print_decision(track):
+    res = track.result
+    status = "GRANTED" if res["matched"] else "DENIED"
+    plate = res["matched_plate"] or res["detected_plate"] or "NONE"
+    print(
+        f"Vehicle {track.track_id:<4} | frames {track.first_frame}-{track.last_frame}"
+        f" | OCR calls {track.ocr_calls} | {plate:<12} | {status}"
+    )
+
+
+def run_stream(source, stride=3, max_ocr=2, max_missed=5, max_frames=0):
+    scan_service.init()
+    capture = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not capture.isOpened():
+        print(f"ERROR: Could not open video source {source}")
+        return None
+
+    tracker = PlateTracker(max_ocr, max_missed, on_decision=print_decision)
+    frame_idx = 0
+    start = time.perf_counter()
+
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        if frame_idx % stride == 0:
+            tracker.update(frame_idx, detect_plates(frame))
+        frame_idx += 1
+        if max_frames and frame_idx >= max_frames:
+            break
+
+    capture.release()
+    tracker.flush()
+
+    elapsed = time.perf_counter() - start
+    vehicles = len(tracker.finished)
+    stats = {
+        "frames": frame_idx,
+        "fps": frame_idx / elapsed if elapsed > 0 else 0.0,
+        "vehicles": vehicles,
+        "ocr_calls": tracker.ocr_calls,
+        "ocr_per_vehicle": tracker.ocr_calls / vehicles if vehicles else 0.0,
+    }
+    print("-" * 70)
+    print(
+        f"Frames: {stats['frames']} | FPS: {stats['fps']:.1f} | "
+        f"Vehicles: {vehicles} | OCR calls/vehicle: {stats['ocr_per_vehicle']:.2f}"
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tracked ALPR over a video stream")
+    parser.add_argument("source", help="video file, stream URL or camera index")
+    parser.add_argument(
+        "--stride", type=positive_int, default=3, help="detect every N frames"
+    )
+    parser.add_argument(
+        "--max-ocr", type=positive_int, default=2, help="OCR calls per plate"
+    )
+    parser.add_argument(
+        "--max-missed", type=int, default=5, help="detector passes before a track ends"
+    )
+    parser.add_argument("--max-frames", type=int, default=0)
+    args = parser.parse_args()
+
+    run_stream(args.source, args.stride, args.max_ocr, args.max_missed, args.max_frames)
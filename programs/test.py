@@ -1,115 +1,95 @@
 import os
+import sys
+import threading
+import time
 import cv2
-import pandas as pd
-import easyocr
-import difflib
 import numpy as np
-import torch
-import pathlib
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+import scan_service
+from plate_detector import load_detector
+from ingest import raw_frame
+from preprocess import IDENTITY
+from scan_service import (
+    PROFILE,
+    get_reader,
+    new_result,
+    new_voter,
+    pipeline_getattr,
+    readtext,
+    run,
+    use_pipeline,
+)
+
+# YOLO pipeline: the detector finds plates and EasyOCR reads only the crops.
+# Serving, the allowlist and everything else shared with alpr_server.py is in
+# scan_service.
 
 # --- CONFIGURATION ---
 # Path to your trained YOLO model (best.pt) or the pre-trained weights
-MODEL_PATH = "./plate_model.pt"
-CSV_PATH = "./Rdata/labels.csv"
-
-app = Flask(__name__)
-CORS(app)
-
-# 1. LOAD OCR READER
-print("Initializing EasyOCR...")
-reader = easyocr.Reader(["ar", "en"], gpu=False)
-
-# 2. LOAD YOLO MODEL (The "Working Code" Logic) [cite: 7, 8]
-print(f"Loading YOLOv9 model from {MODEL_PATH}...")
-try:
-    # We use torch.hub to load the custom model exactly as your file did
-    # Note: 'source="github"' requires internet first time to download repo structure
-    model = torch.hub.load(
-        "WongKinYiu/yolov9", "custom", path=MODEL_PATH, force_reload=False
-    )
-    # Set confidence threshold to reduce garbage detections
-    model.conf = 0.5
-except Exception as e:
-    print(
-        f"CRITICAL ERROR: Could not load YOLO model. Ensure '{MODEL_PATH}' exists. Error: {e}"
-    )
-    model = None
-
-
-def cleanup_text(text):
-    if not isinstance(text, str):
-        return str(text).upper()
-    return "".join(e for e in text if e.isalnum()).upper()
-
-
-def load_database(csv_path):
+MODEL_PATH = os.environ.get("ALPR_MODEL_PATH", "./plate_model.pt")
+# "auto" picks the loader from MODEL_PATH: .onnx -> ONNX Runtime,
+# .torchscript -> TorchScript, anything else -> torch.hub (see plate_detector.py)
+DETECTOR_BACKEND = os.environ.get("ALPR_DETECTOR", "auto")
+# Crops are resized to this (width, height) so they can share one OCR batch
+PLATE_OCR_SIZE = (320, 96)
+# OCR of YOLO crops: "readtext" runs EasyOCR's text detector again inside
+# every crop; "recognize" skips it and sends all crops of a frame to the
+# recognizer in one call. Crops narrower than TWO_LINE_MAX_ASPECT (w / h)
+# are read as two rows (top and bottom half).
+OCR_MODE = os.environ.get("ALPR_OCR_MODE", "readtext")
+TWO_LINE_MAX_ASPECT = float(os.environ.get("ALPR_TWO_LINE_MAX_ASPECT", "2.5"))
+RECOGNIZE_BATCH = 16
+# Tight crops read cleanly, so fuzzy allowlist matches may differ in length
+# by up to two characters (a dropped or extra glyph on either line)
+MAX_LEN_DIFF = 2
+
+# The detector is created on first use (get_model) so importing this module
+# stays cheap.
+model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+
+def load_yolo_model(model_path):
+    # 2. LOAD YOLO MODEL
+    print(f"Loading YOLOv9 model from {model_path}...")
     try:
-        if not os.path.exists(csv_path):
-            return {}
-        df = pd.read_csv(csv_path)
-        col_img = "file_name"
-        col_plate = "plate_number"
-        if col_img not in df.columns or col_plate not in df.columns:
-            return {}
-        db_map = {}
-        for index, row in df.iterrows():
-            img_filename = str(row[col_img]).strip()
-            clean_plate = cleanup_text(str(row[col_plate]))
-            db_map[clean_plate] = img_filename
-        print(f"DEBUG: Loaded {len(db_map)} plates.")
-        return db_map
+        # Exported TorchScript / ONNX weights load offline; plain .pt
+        # checkpoints still go through torch.hub (cached repo if present).
+        # Read at load time: pool workers get their thread count from
+        # _init_worker (scan_service.init) after this module is imported.
+        return load_detector(
+            model_path, DETECTOR_BACKEND, conf=0.5, threads=scan_service.TORCH_THREADS
+        )
     except Exception as e:
-        print(f"Error loading CSV: {e}")
-        return {}
-
-
-PLATE_DATABASE = load_database(CSV_PATH)
-DB_KEYS = list(PLATE_DATABASE.keys())
-
-
-def find_best_match(detected_text, database_keys):
-    detected_clean = cleanup_text(detected_text)
-    if detected_clean in database_keys:
-        return detected_clean, 1.0
+        print(
+            f"CRITICAL ERROR: Could not load YOLO model. Ensure '{model_path}' exists. Error: {e}"
+        )
+        return None
 
-    # Reverse check
-    if detected_clean[::-1] in database_keys:
-        return detected_clean[::-1], 0.95
 
-    best_match = None
-    best_score = 0.0
-    for db_key in database_keys:
-        if abs(len(detected_clean) - len(db_key)) > 2:
-            continue
-        similarity = difflib.SequenceMatcher(None, detected_clean, db_key).ratio()
-        if similarity > 0.85 and similarity > best_score:
-            best_score = similarity
-            best_match = db_key
-    return best_match, best_score
+def get_model():
+    global model, _model_loaded
+    if not _model_loaded:
+        with _model_lock:
+            if not _model_loaded:
+                model = load_yolo_model(MODEL_PATH)
+                _model_loaded = True
+    return model
 
 
-# --- NEW LOGIC: YOLO DETECTION & CROP ---
-def detect_and_crop(img):
+def warm_up():
     """
-    Uses YOLO to find the plate and returns the cropped image.
-    Based on working code[cite: 8, 9].
+    Loads both models and runs one dummy inference through each so the
+    first real scan does not pay for lazy initialization.
     """
-    if model is None:
-        return []
+    blank = np.zeros((64, 256, 3), np.uint8)
+    readtext(blank)
+    if get_model() is not None:
+        detect_and_crop(blank)
 
-    # Inference
-    # YOLOv9 expects BGR or RGB. cv2 is BGR.
-    # We convert to RGB as seen in your working code [cite: 8]
-    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-    results = model(img_rgb)
-
-    # Parse results [cite: 8]
-    # .xyxy[0] returns tensor of detections: [x1, y1, x2, y2, confidence, class]
-    detections = results.xyxy[0].cpu().numpy()
 
+# --- NEW LOGIC: YOLO DETECTION & CROP ---
+def crops_from_detections(img, detections):
     crops = []
 
     for box in detections:
@@ -130,20 +110,137 @@ def detect_and_crop(img):
         plate_crop = img[y1:y2, x1:x2]
 
         if plate_crop.size > 0:
-            crops.append((plate_crop, conf))
+            crops.append((plate_crop, conf, (x1, y1, x2, y2)))
 
     return crops
 
 
-def process_image_from_memory(img):
-    result = {
-        "success": False,
-        "matched": False,
-        "matched_plate": None,
-        "detected_plate": None,
-        "confidence": 0.0,
-        "message": "",
-    }
+def detect_and_crop(img):
+    """
+    Uses YOLO to find the plate and returns the cropped image.
+    Based on working code[cite: 8, 9].
+    """
+    detector = get_model()
+    if detector is None:
+        return []
+
+    # Inference
+    # YOLOv9 expects BGR or RGB. cv2 is BGR.
+    # We convert to RGB as seen in your working code [cite: 8]
+    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+    # Parse results [cite: 8]
+    # One array per image of detections: [x1, y1, x2, y2, confidence, class]
+    detections = detector.detect([img_rgb])[0]
+
+    return crops_from_detections(img, detections)
+
+
+def detect_and_crop_batch(imgs):
+    """
+    Same as detect_and_crop, but runs YOLO once over the whole list.
+    Returns one list of (crop, conf, box) per input image.
+    """
+    detector = get_model()
+    if detector is None:
+        return [[] for _ in imgs]
+
+    batch_detections = detector.detect(
+        [cv2.cvtColor(img, cv2.COLOR_BGR2RGB) for img in imgs]
+    )
+
+    return [
+        crops_from_detections(img, detections)
+        for img, detections in zip(imgs, batch_detections)
+    ]
+
+
+def crop_rows(gray):
+    """
+    Text regions of one plate crop as (top offset, image): the whole crop,
+    or its two rows.
+    """
+    h, w = gray.shape[:2]
+    if w < h * TWO_LINE_MAX_ASPECT and h >= 2:
+        return [(0, gray[: h // 2]), (h // 2, gray[h // 2 :])]
+    return [(0, gray)]
+
+
+def recognize_crops(gray_crops):
+    """
+    Recognizer-only OCR of grayscale plate crops. Every row of every crop is
+    stacked on one canvas and passed as its own text region, so the whole
+    list costs a single reader.recognize call. Returns one readtext-style
+    [(bbox, text, prob)] list per crop, boxes in crop coordinates; the
+    voting in match_crop_results joins the rows of two-line plates.
+    """
+    regions = []
+    for owner, gray in enumerate(gray_crops):
+        for top, row in crop_rows(gray):
+            if row.size > 0:
+                regions.append((owner, top, row))
+    per_crop = [[] for _ in gray_crops]
+    if not regions:
+        return per_crop
+
+    height = sum(row.shape[0] for _, _, row in regions)
+    width = max(row.shape[1] for _, _, row in regions)
+    canvas = np.zeros((height, width), np.uint8)
+    boxes = []
+    owners = {}
+    y = 0
+    for owner, top, row in regions:
+        h, w = row.shape[:2]
+        canvas[y : y + h, :w] = row
+        boxes.append([0, w, y, y + h])
+        owners[y] = (owner, top - y)
+        y += h
+
+    # Results come back sorted by the top edge of their region
+    for bbox, text, prob in PROFILE.recognize(
+        get_reader(),
+        canvas,
+        horizontal_list=boxes,
+        free_list=[],
+        batch_size=RECOGNIZE_BATCH,
+    ):
+        owner, shift = owners[int(bbox[0][1])]
+        if text:
+            box = [[x, y + shift] for x, y in bbox]
+            per_crop[owner].append((box, text, float(prob)))
+    return per_crop
+
+
+def ocr_crops(gray_crops):
+    """OCR of grayscale plate crops in the configured OCR_MODE."""
+    if OCR_MODE == "recognize":
+        return recognize_crops(gray_crops)
+    return [readtext(gray) for gray in gray_crops]
+
+
+def match_crop_results(crop_ocr_results, result, stats=None):
+    """
+    Votes over the OCR output of the crops (highest detection confidence
+    first), including tokens joined along a line. `crop_ocr_results` holds
+    (ocr_results, detector box) pairs and may be lazy: OCR stops as soon as
+    one plate's votes reach VOTE_THRESHOLD.
+    """
+    voter = new_voter(stats)
+    for ocr_results, box in crop_ocr_results:
+        if voter.add(ocr_results, rect=box):
+            break
+    return voter.fill_result(result, "Plate Detected, but OCR failed to read text.")
+
+
+def process_image_from_memory(img, timings=None):
+    """
+    YOLO + crop OCR + allowlist match for one decoded frame. When `timings`
+    is a dict, the stage latencies are added to it as detect_ms / ocr_ms /
+    match_ms, and the allowlist lookup counts as match_exact / match_fuzzy /
+    match_miss.
+    """
+    result = new_result()
+    stage = {"ocr_ms": 0.0}
 
     if img is None:
         result["message"] = "Failed to load image."
@@ -153,64 +250,44 @@ def process_image_from_memory(img):
 
     try:
         # STEP 1: Detect Plate using YOLO
+        start = time.perf_counter()
         crops = detect_and_crop(img)
+        if timings is not None:
+            timings["detect_ms"] = (time.perf_counter() - start) * 1000
 
         if not crops:
+            result["rejected"] = True
             result["message"] = "No License Plate Detected by YOLO."
             return result
 
         # Sort crops by confidence (highest first)
         crops.sort(key=lambda x: x[1], reverse=True)
 
-        best_candidate_text = None
-        best_candidate_conf = 0.0
-
         # STEP 2: OCR only the cropped areas
-        for plate_img, detect_conf in crops:
-
-            # Optional: Preprocess the crop slightly (grayscale) for EasyOCR
-            gray_plate = cv2.cvtColor(plate_img, cv2.COLOR_BGR2GRAY)
-
-            # Read text
-            ocr_results = reader.readtext(gray_plate)
-
-            for bbox, text, ocr_prob in ocr_results:
-                clean_txt = cleanup_text(text)
-
-                if len(clean_txt) < 3:
-                    continue
-
-                # Match against DB
-                matched_key, match_score = find_best_match(clean_txt, DB_KEYS)
-
-                if matched_key:
-                    result["matched"] = True
-                    result["matched_plate"] = matched_key
-                    result["detected_plate"] = clean_txt
-                    result["confidence"] = float(ocr_prob)
-                    result["message"] = f"ACCESS GRANTED (Match: {matched_key})"
-                    return result
-
-                # Track best non-match
-                if ocr_prob > best_candidate_conf:
-                    best_candidate_conf = float(ocr_prob)
-                    best_candidate_text = clean_txt
-
-        # If no strict match found
-        if best_candidate_text:
-            # Try fuzzy match one last time
-            matched_key, match_score = find_best_match(best_candidate_text, DB_KEYS)
-            if matched_key:
-                result["matched"] = True
-                result["matched_plate"] = matched_key
-                result["detected_plate"] = best_candidate_text
-                result["confidence"] = best_candidate_conf
-                result["message"] = f"ACCESS GRANTED (Match: {matched_key})"
-            else:
-                result["detected_plate"] = best_candidate_text
-                result["message"] = "ACCESS DENIED"
-        else:
-            result["message"] = "Plate Detected, but OCR failed to read text."
+        # Optional: Preprocess the crop slightly (grayscale) for EasyOCR
+        def read_crops():
+            if OCR_MODE == "recognize":
+                # One recognizer call for every crop of the frame
+                ocr_start = time.perf_counter()
+                grays = [cv2.cvtColor(c, cv2.COLOR_BGR2GRAY) for c, _, _ in crops]
+                batch = recognize_crops(grays)
+                stage["ocr_ms"] += (time.perf_counter() - ocr_start) * 1000
+                yield from zip(batch, (box for _, _, box in crops))
+                return
+
+            for plate_img, detect_conf, box in crops:
+                ocr_start = time.perf_counter()
+                ocr_results = readtext(cv2.cvtColor(plate_img, cv2.COLOR_BGR2GRAY))
+                stage["ocr_ms"] += (time.perf_counter() - ocr_start) * 1000
+                yield ocr_results, box
+
+        start = time.perf_counter()
+        match_crop_results(read_crops(), result, timings)
+        if timings is not None:
+            # Crops are read lazily, so matching time is the rest of the loop
+            elapsed = (time.perf_counter() - start) * 1000
+            timings["ocr_ms"] = stage["ocr_ms"]
+            timings["match_ms"] = elapsed - stage["ocr_ms"]
 
     except Exception as e:
         print(f"Backend Error: {e}")
@@ -219,18 +296,90 @@ def process_image_from_memory(img):
     return result
 
 
-@app.route("/scan", methods=["POST"])
-def scan_plate():
-    if "image" not in request.files:
-        return jsonify({"error": "No image uploaded"}), 400
+def decode_frame(data, camera=None, shape=None):
+    """
+    Encoded image, or a raw BGR frame when `shape` is (height, width).
+    Returns (img, transform) like alpr_server.decode_frame; YOLO runs on the
+    full frame, so `camera` selects nothing and the transform is always
+    IDENTITY.
+    """
+    if shape is not None:
+        return raw_frame(data, shape), IDENTITY
+    file_bytes = np.frombuffer(data, np.uint8)
+    return cv2.imdecode(file_bytes, cv2.IMREAD_COLOR), IDENTITY
+
+
+def process_images_batch(imgs):
+    """
+    Batched version of process_image_from_memory: one YOLO pass over all
+    frames, then one readtext_batched call over every plate crop (resized
+    to PLATE_OCR_SIZE). Returns per-image results plus timings in ms.
+    """
+    results = [new_result() for _ in imgs]
+    timings = {"detect_ms": 0.0, "ocr_ms": 0.0, "match_ms": 0.0}
+
+    valid = []
+    for i, img in enumerate(imgs):
+        if img is None:
+            results[i]["message"] = "Failed to load image."
+            continue
+        results[i]["success"] = True
+        valid.append(i)
+
+    if not valid:
+        return results, timings
+
+    try:
+        start = time.perf_counter()
+        batch_crops = detect_and_crop_batch([imgs[i] for i in valid])
+        timings["detect_ms"] = (time.perf_counter() - start) * 1000
+
+        gray_crops = []
+        owners = []
+        for i, crops in zip(valid, batch_crops):
+            if not crops:
+                results[i]["rejected"] = True
+                results[i]["message"] = "No License Plate Detected by YOLO."
+                continue
+            crops.sort(key=lambda x: x[1], reverse=True)
+            for plate_img, detect_conf, box in crops:
+                gray_crops.append(cv2.cvtColor(plate_img, cv2.COLOR_BGR2GRAY))
+                owners.append((i, box))
+
+        if gray_crops:
+            start = time.perf_counter()
+            if OCR_MODE == "recognize":
+                batch_ocr = recognize_crops(gray_crops)
+            else:
+                batch_ocr = PROFILE.readtext_batched(
+                    get_reader(),
+                    gray_crops,
+                    n_width=PLATE_OCR_SIZE[0],
+                    n_height=PLATE_OCR_SIZE[1],
+                )
+            timings["ocr_ms"] = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            per_image = {}
+            for (i, box), ocr_results in zip(owners, batch_ocr):
+                per_image.setdefault(i, []).append((ocr_results, box))
+            for i, crop_ocr_results in per_image.items():
+                match_crop_results(crop_ocr_results, results[i], timings)
+            timings["match_ms"] = (time.perf_counter() - start) * 1000
+
+    except Exception as e:
+        print(f"Backend Error: {e}")
+        for i in valid:
+            results[i]["message"] = f"Error: {e}"
+
+    return results, timings
+
 
-    file = request.files["image"]
-    file_bytes = np.frombuffer(file.read(), np.uint8)
-    img = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
+# cleanup_text, find_best_match, load_database, init, PLATE_DATABASE, DB_KEYS
+__getattr__ = pipeline_getattr(__name__)
 
-    data = process_image_from_memory(img)
-    return jsonify(data)
+use_pipeline(sys.modules[__name__], "test", MAX_LEN_DIFF)
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    run()
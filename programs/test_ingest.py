@@ -0,0 +1,150 @@
+import base64
+import io
+
+import pytest
+
+from ingest import UploadError, parse_batch, parse_multipart, parse_upload, read_body
+
+
+def multipart(parts, boundary="XyZ"):
+    body = b""
+    for name, value in parts:
+        body += (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"; filename="f"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("latin-1")
+        body += value + b"\r\n"
+    return body + f"--{boundary}--\r\n".encode("latin-1")
+
+
+class Trickle(io.RawIOBase):
+    """A stream that returns at most `step` bytes per read, like a socket."""
+
+    def __init__(self, data, step=3):
+        self.data = io.BytesIO(data)
+        self.step = step
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self.data.read(min(self.step, len(buffer)))
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+
+@pytest.mark.parametrize(
+    "content_type",
+    (
+        "multipart/form-data; boundary=XyZ",
+        'multipart/form-data; boundary="XyZ"',
+        "multipart/form-data; charset=utf-8; BOUNDARY=XyZ",
+    ),
+)
+def test_boundary_is_parsed_quoted_or_not(content_type):
+    body = multipart([("image", b"\x00\r\n--XY\xff"), ("plate", b"ABC")])
+    fields = parse_multipart(body, content_type)
+    assert bytes(fields["image"]) == b"\x00\r\n--XY\xff"
+    assert bytes(fields["plate"]) == b"ABC"
+
+
+def test_first_value_wins():
+    body = multipart([("image", b"one"), ("image", b"two")])
+    upload = parse_upload(body, "multipart/form-data; boundary=XyZ", {})
+    assert bytes(upload.data) == b"one"
+
+
+def test_batch_keeps_every_image_in_order():
+    body = multipart([("images", b"one"), ("note", b"x"), ("images", b"two")])
+    images = parse_batch(body, "multipart/form-data; boundary=XyZ")
+    assert [bytes(image) for image in images] == [b"one", b"two"]
+
+
+def test_batch_falls_back_to_the_single_image_field():
+    body = multipart([("image", b"one")])
+    images = parse_batch(body, "multipart/form-data; boundary=XyZ")
+    assert [bytes(image) for image in images] == [b"one"]
+
+
+@pytest.mark.parametrize(
+    "body, content_type, status",
+    (
+        (multipart([("note", b"x")]), "multipart/form-data; boundary=XyZ", 400),
+        (b"", "multipart/form-data; boundary=XyZ", 400),
+        (multipart([("images", b"x")]), "multipart/form-data", 400),
+        (b"jpeg", "image/jpeg", 415),
+    ),
+)
+def test_batch_rejects_bodies_without_images(body, content_type, status):
+    with pytest.raises(UploadError) as error:
+        parse_batch(body, content_type)
+    assert error.value.status == status
+
+
+def test_read_body_reads_the_known_length_in_pieces():
+    assert read_body(Trickle(b"0123456789"), 10, limit=10) == b"0123456789"
+
+
+def test_read_body_refuses_a_known_length_over_the_limit():
+    stream = io.BytesIO(b"0123456789")
+    with pytest.raises(UploadError) as error:
+        read_body(stream, 10, limit=9)
+    assert error.value.status == 413
+    # Refused before reading anything
+    assert stream.tell() == 0
+
+
+def test_read_body_limits_chunked_bodies():
+    assert read_body(io.BytesIO(b"0123"), None, limit=4) == b"0123"
+    with pytest.raises(UploadError) as error:
+        read_body(io.BytesIO(b"01234"), None, limit=4)
+    assert error.value.status == 413
+
+
+def test_read_body_rejects_a_truncated_upload():
+    with pytest.raises(UploadError) as error:
+        read_body(io.BytesIO(b"0123"), 10, limit=100)
+    assert error.value.status == 400
+
+
+def test_json_upload_decodes_data_urls():
+    encoded = base64.b64encode(b"jpeg").decode()
+    body = ('{"image": "data:image/jpeg;base64,%s", "plate": 1}' % encoded).encode()
+    upload = parse_upload(body, "application/json", {})
+    assert upload.data == b"jpeg"
+    assert upload.fields == {"plate": "1"}
+
+
+def test_raw_frame_upload_has_its_shape():
+    upload = parse_upload(
+        bytes(2 * 3 * 3),
+        "application/x-raw-bgr",
+        {"x-frame-width": "3", "x-frame-height": "2"},
+    )
+    assert upload.shape == (2, 3)
+
+
+@pytest.mark.parametrize(
+    "body, content_type, headers, status",
+    (
+        (b"", "image/jpeg", {}, 400),
+        (multipart([("image", b"x")]), "multipart/form-data", {}, 400),
+        (multipart([("other", b"x")]), "multipart/form-data; boundary=XyZ", {}, 400),
+        (b"{not json", "application/json", {}, 400),
+        (b'{"image": "not base64!"}', "application/json", {}, 400),
+        (b'["image"]', "application/json", {}, 400),
+        (
+            bytes(10),
+            "application/x-raw-bgr",
+            {"x-frame-width": "3", "x-frame-height": "2"},
+            400,
+        ),
+        (bytes(18), "application/x-raw-bgr", {"x-frame-width": "3"}, 400),
+        (b"text", "text/plain", {}, 415),
+    ),
+)
+def test_malformed_uploads_are_rejected(body, content_type, headers, status):
+    with pytest.raises(UploadError) as error:
+        parse_upload(body, content_type, headers)
+    assert error.value.status == status
@@ -0,0 +1,106 @@
+import pytest
+
+from metrics import Registry, ScanMetrics
+
+
+def result(matched=False, success=True, message="ACCESS DENIED", rejected=False):
+    return {
+        "matched": matched,
+        "success": success,
+        "message": message,
+        "rejected": rejected,
+    }
+
+
+def test_counter_renders_help_type_and_escaped_labels():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    requests.inc(route="/scan")
+    requests.inc(2, route='say "hi"\\')
+
+    assert registry.render() == (
+        "# HELP requests_total Requests.\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{route="/scan"} 1.0\n'
+        'requests_total{route="say \\"hi\\"\\\\"} 2.0\n'
+    )
+
+
+def test_counter_rejects_wrong_labels():
+    counter = Registry().counter("requests_total", "Requests.", ("route",))
+    with pytest.raises(ValueError):
+        counter.inc(path="/scan")
+
+
+def test_histogram_buckets_are_cumulative_and_end_in_inf():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 4.05",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_sampled_metrics_are_read_at_scrape_time():
+    registry = Registry()
+    depth = [3]
+    registry.gauge("queue_depth", "Queued scans.", lambda: depth[0])
+    registry.sampled_counter(
+        "cache_hits_total",
+        "Cache hits.",
+        lambda: {("content",): 5, ("phash",): 1},
+        ("cache",),
+    )
+    depth[0] = 7
+
+    lines = registry.render().splitlines()
+    assert "# TYPE queue_depth gauge" in lines
+    assert "queue_depth 7.0" in lines
+    assert "# TYPE cache_hits_total counter" in lines
+    assert 'cache_hits_total{cache="content"} 5.0' in lines
+    assert 'cache_hits_total{cache="phash"} 1.0' in lines
+
+
+def test_scan_metrics_count_decisions_and_stages():
+    scan = ScanMetrics()
+    scan.observe_request("/scan", 200)
+    scan.observe_result(result(matched=True, message="ACCESS GRANTED"))
+    scan.observe_result(result(rejected=True, message="No plate found"))
+    scan.observe_result(result(success=False, message="Error: bad image"))
+    scan.observe_timings("/scan", {"ocr_ms": 40.0, "match_exact": 2, "match_miss": 1})
+
+    text = scan.render()
+    assert text.endswith("\n")
+    lines = text.splitlines()
+    assert 'alpr_requests_total{route="/scan",status="200"} 1.0' in lines
+    for decision in ("granted", "denied", "error"):
+        assert f'alpr_decisions_total{{decision="{decision}"}} 1.0' in lines
+    assert "alpr_early_rejections_total 1.0" in lines
+    assert 'alpr_stage_seconds_count{route="/scan",stage="ocr"} 1' in lines
+    assert 'alpr_stage_seconds_bucket{route="/scan",stage="ocr",le="0.05"} 1' in lines
+    assert 'alpr_match_lookups_total{result="exact"} 2.0' in lines
+    assert 'alpr_match_lookups_total{result="miss"} 1.0' in lines
+
+
+def test_every_sample_line_is_well_formed():
+    scan = ScanMetrics()
+    scan.observe_timings("/scan/batch", {"total_ms": 12.5})
+    declared = set()
+    for line in scan.render().splitlines():
+        if line.startswith("# TYPE "):
+            declared.add(line.split()[2])
+            continue
+        if line.startswith("#"):
+            continue
+        name_and_labels, value = line.rsplit(" ", 1)
+        name = name_and_labels.split("{")[0]
+        assert name in declared or name.rsplit("_", 1)[0] in declared, line
+        float(value.replace("+Inf", "inf"))
@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+from micro_batcher import MicroBatcher, split_timings
+
+
+def test_split_timings_divides_latencies_and_deals_out_counts():
+    shares = split_timings({"ocr_ms": 30.0, "match_exact": 5, "match_miss": 1}, 3)
+    assert [share["ocr_ms"] for share in shares] == [10.0, 10.0, 10.0]
+    assert [share["match_exact"] for share in shares] == [2, 2, 1]
+    assert [share["match_miss"] for share in shares] == [1, 0, 0]
+
+
+def test_concurrent_requests_share_one_batch():
+    calls = []
+    arrived = threading.Barrier(4)
+
+    def process_batch(imgs):
+        calls.append(list(imgs))
+        return [f"result {img}" for img in imgs], {"ocr_ms": 8.0, "match_exact": 4}
+
+    # A long wait so that all four submissions land in the first batch
+    batcher = MicroBatcher(process_batch, max_batch=4, max_wait_ms=5000)
+    replies = {}
+
+    def submit(img):
+        arrived.wait()
+        replies[img] = batcher.submit(img)
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1 and sorted(calls[0]) == [0, 1, 2, 3]
+    for img, (result, timings) in replies.items():
+        assert result == f"result {img}"
+        assert timings == {"ocr_ms": 2.0, "match_exact": 1}
+
+
+def test_batch_is_flushed_after_max_wait():
+    batcher = MicroBatcher(
+        lambda imgs: ([img * 2 for img in imgs], {}), max_batch=8, max_wait_ms=1
+    )
+    assert batcher.submit(21) == (42, {})
+
+
+def test_batch_errors_reach_every_caller():
+    def process_batch(imgs):
+        raise RuntimeError("OCR failed")
+
+    batcher = MicroBatcher(process_batch, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="OCR failed"):
+        batcher.submit(1)
+    # The batching thread survives a failed batch
+    with pytest.raises(RuntimeError):
+        batcher.submit(2)
@@ -0,0 +1,82 @@
+import os
+import threading
+
+from plate_db import SqlitePlateIndex, build_plate_db, ensure_plate_db, needs_rebuild
+
+CSV = """file_name,plate_number,valid_from,valid_until
+a.jpg,ABC 123,,
+b.jpg,XYZ 9,,2000-01-01
+"""
+
+
+def write_db(tmp_path):
+    csv_path = tmp_path / "labels.csv"
+    csv_path.write_text(CSV, encoding="utf-8")
+    db_path = str(tmp_path / "plates.sqlite")
+    build_plate_db(str(csv_path), db_path)
+    return str(csv_path), db_path
+
+
+def test_expired_plates_do_not_match(tmp_path):
+    _, db_path = write_db(tmp_path)
+    plates = SqlitePlateIndex(db_path)
+    assert plates.exact("ABC123") == ("ABC123", 1.0)
+    assert plates.exact("XYZ9") == (None, 0.0)
+    assert "XYZ9" not in plates
+    assert len(plates) == 1
+
+
+def test_add_reactivates_expired_plate_and_keeps_file_name(tmp_path):
+    _, db_path = write_db(tmp_path)
+    plates = SqlitePlateIndex(db_path)
+    plates.add("XYZ9")
+
+    assert plates.exact("XYZ9") == ("XYZ9", 1.0)
+    assert plates["XYZ9"] == "b.jpg"
+    assert plates.details("XYZ9")["valid_until"] is None
+    assert len(plates) == 2
+
+
+def test_add_inserts_new_plate(tmp_path):
+    _, db_path = write_db(tmp_path)
+    plates = SqlitePlateIndex(db_path)
+    plates.add("NEW1")
+    assert plates["NEW1"] == ""
+    assert plates.find("NEW11") == ("NEW1", 0.8888888888888888)
+
+
+def test_concurrent_builds_leave_one_current_file(tmp_path):
+    csv_path, db_path = write_db(tmp_path)
+    os.remove(db_path)
+    errors = []
+
+    def build():
+        try:
+            ensure_plate_db(csv_path, db_path)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=build) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert not needs_rebuild(csv_path, db_path)
+    assert sorted(os.listdir(tmp_path)) == ["labels.csv", "plates.sqlite"]
+    assert list(SqlitePlateIndex(db_path, read_only=True)) == ["ABC123"]
+
+
+def test_deeper_key_depth_forces_rebuild(tmp_path):
+    csv_path, db_path = write_db(tmp_path)
+    assert not needs_rebuild(csv_path, db_path, key_depth=1)
+    assert needs_rebuild(csv_path, db_path, key_depth=2)
+
+    ensure_plate_db(csv_path, db_path, key_depth=2)
+    assert not needs_rebuild(csv_path, db_path, key_depth=2)
+    # A key two characters longer than the reading is found through its
+    # stored depth-2 deletions, also for plates added after the build
+    plates = SqlitePlateIndex(db_path)
+    plates.add("KLMN5678")
+    assert plates.find("KLM567", max_len_diff=2)[0] == "KLMN5678"
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from plate_gate import PlateGate  # noqa: E402
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+TEXT = "ABC 1234"
+# Plate-sized characters with the thin margin of a real plate, so the
+# strokes dominate the candidate as they do in camera frames
+TEXT_SCALE, TEXT_THICKNESS, MARGIN = 1.2, 3, 4
+(TEXT_W, TEXT_H), BASELINE = cv2.getTextSize(TEXT, FONT, TEXT_SCALE, TEXT_THICKNESS)
+PLATE = (200, 300, 200 + TEXT_W + 2 * MARGIN, 300 + TEXT_H + BASELINE + 2 * MARGIN)
+
+
+def street(height=480, width=640):
+    """A smooth gray scene: a vertical gradient, no edges anywhere."""
+    column = np.linspace(60, 160, height).astype(np.uint8)
+    gray = np.repeat(column[:, None], width, axis=1)
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+def with_plate(img):
+    x1, y1, x2, y2 = PLATE
+    cv2.rectangle(img, (x1, y1), (x2, y2), (235, 235, 235), -1)
+    origin = (x1 + MARGIN, y1 + MARGIN + TEXT_H)
+    cv2.putText(img, TEXT, origin, FONT, TEXT_SCALE, (0, 0, 0), TEXT_THICKNESS)
+    return img
+
+
+def contains(outer, inner):
+    return (
+        outer[0] <= inner[0]
+        and outer[1] <= inner[1]
+        and outer[2] >= inner[2]
+        and outer[3] >= inner[3]
+    )
+
+
+def test_blank_frame_is_rejected():
+    gate = PlateGate()
+    assert gate.candidates(street()) == []
+    assert gate.region(street()) is None
+
+
+def test_blank_plate_shaped_box_is_rejected():
+    img = street()
+    cv2.rectangle(img, PLATE[:2], PLATE[2:], (235, 235, 235), -1)
+    # Two vertical edges are not a row of character strokes
+    assert PlateGate().region(img) is None
+
+
+def test_synthetic_plate_is_accepted():
+    region = PlateGate().region(with_plate(street()))
+    assert region is not None
+    # The region keeps the whole plate and stays inside the frame
+    assert contains(region, PLATE)
+    assert contains((0, 0, 640, 480), region)
+
+
+def test_large_frames_are_checked_at_gate_resolution():
+    small = with_plate(street())
+    large = cv2.resize(small, (1280, 960), interpolation=cv2.INTER_LINEAR)
+    region = PlateGate().region(large)
+    assert region is not None
+    assert contains(region, tuple(2 * v for v in PLATE))
+
+
+def test_grayscale_frames_are_accepted():
+    gray = cv2.cvtColor(with_plate(street()), cv2.COLOR_BGR2GRAY)
+    assert PlateGate().region(gray) is not None
@@ -0,0 +1,118 @@
+import random
+
+import pytest
+
+from bench_plate_index import linear_best_match, noisy, random_plate
+from plate_array import ArrayPlateIndex
+from plate_index import CanonicalPlateIndex
+from plate_normalize import canonical_plate, fold_confusables
+from scan_service import find_best_match
+
+INDEXES = (CanonicalPlateIndex, ArrayPlateIndex)
+
+
+def random_keys(rng, count):
+    return list(dict.fromkeys(random_plate(rng) for _ in range(count)))
+
+
+def linear_find(query, keys, max_len_diff):
+    """The original difflib scan over canonical plates, as (canon, score)."""
+    canon_keys = list(dict.fromkeys(canonical_plate(key) for key in keys))
+    return linear_best_match(canonical_plate(query), canon_keys, max_len_diff)
+
+
+def canonical_result(match):
+    key, score = match
+    return (canonical_plate(key) if key else None, score)
+
+
+def test_canonical_plate_folds_digits():
+    assert canonical_plate("١٢٣٤٥٦٧٨٩٠") == "1234567890"
+    assert canonical_plate("۱۲۳۴۵۶۷۸۹۰") == "1234567890"
+
+
+def test_canonical_plate_folds_letter_variants():
+    assert canonical_plate("أإآٱ") == "اااا"
+    assert canonical_plate("ىیئ") == "ييي"
+    assert canonical_plate("ةکؤ") == "هكو"
+    assert canonical_plate("بـج") == "بج"
+
+
+def test_look_alike_letters_fold_only_on_request():
+    assert canonical_plate("OQILZSGVB") == "OQILZSGVB"
+    assert fold_confusables("OQILZSGVB") == "001125678"
+    assert fold_confusables("ABC") == "A8C"
+
+
+@pytest.mark.parametrize("cls", INDEXES)
+def test_exact_matches_folded_and_reversed_readings(cls):
+    index = cls(["١٢٣٤ابج", "XYZ9"])
+    assert index.exact("1234أبج") == ("١٢٣٤ابج", 1.0)
+    assert index.exact("9ZYX") == ("XYZ9", 0.95)
+    assert index.exact("5555") == (None, 0.0)
+
+
+@pytest.mark.parametrize("cls", INDEXES)
+def test_plates_differing_by_a_look_alike_letter_stay_distinct(cls):
+    both = cls(["AB123", "A8123"])
+    assert find_best_match("AB123", both) == ("AB123", 1.0)
+    assert find_best_match("A8123", both) == ("A8123", 1.0)
+    # A digit reading does not grant the plate spelled with the letter
+    assert find_best_match("A8123", cls(["AB123"])) == (None, 0.0)
+
+
+@pytest.mark.parametrize("cls", INDEXES)
+def test_look_alike_letters_in_a_reading_still_find_digit_keys(cls):
+    index = cls(["٧٤٥١٢", "XYZ9"])
+    assert find_best_match("V4512", index) == ("٧٤٥١٢", 1.0)
+    assert find_best_match("V45I2X", index, max_len_diff=1)[0] == "٧٤٥١٢"
+
+
+@pytest.mark.parametrize("max_len_diff", (1, 2))
+@pytest.mark.parametrize("cls", INDEXES)
+def test_find_matches_linear_scan(cls, max_len_diff):
+    rng = random.Random(1)
+    keys = random_keys(rng, 1000)
+    index = cls(keys) if cls is ArrayPlateIndex else cls(keys, max_len_diff)
+    for _ in range(100):
+        query = noisy(rng, rng.choice(keys))
+        expected = linear_find(query, keys, max_len_diff)
+        found = index.find(query, max_len_diff=max_len_diff)
+        assert canonical_result(found) == expected, query
+
+
+@pytest.mark.parametrize("cls", INDEXES)
+def test_find_after_add_and_remove_matches_linear_scan(cls):
+    rng = random.Random(2)
+    keys = random_keys(rng, 1000)
+    # More adds than plate_array.TAIL_LIMIT, so the tail is merged once
+    index = cls(keys[:300])
+    for key in keys[300:]:
+        index.add(key)
+    for key in keys[:250]:
+        index.remove(key)
+    live = keys[250:]
+
+    assert sorted(index) == sorted(live)
+    for _ in range(100):
+        query = noisy(rng, rng.choice(keys))
+        expected = linear_find(query, live, 1)
+        assert canonical_result(index.find(query)) == expected, query
+
+
+def test_array_index_is_the_plate_mapping():
+    plates = ArrayPlateIndex({"ABC123": "a.jpg", "XYZ9": "b.jpg"})
+    plates["NEW1"] = "n.jpg"
+    plates["ABC123"] = "a2.jpg"
+    long_name = "cam/" + "٣" * 200 + ".jpg"
+    plates["LONG1"] = long_name
+
+    assert len(plates) == 4
+    assert plates["ABC123"] == "a2.jpg"
+    assert plates["LONG1"] == long_name
+    assert plates.get("NEW1") == "n.jpg"
+    assert plates.get("MISSING") is None
+    assert plates.pop("XYZ9") == "b.jpg"
+    assert "XYZ9" not in plates
+    assert plates.pop("XYZ9", "gone") == "gone"
+    assert len(plates) == 3
@@ -0,0 +1,70 @@
+from plate_index import CanonicalPlateIndex
+from plate_votes import PlateVoter, plate_hypotheses
+from scan_service import find_best_match
+
+
+def cleanup(text):
+    return "".join(e for e in text if e.isalnum()).upper()
+
+
+def token(x1, y1, x2, y2, text, prob=0.9):
+    return [[x1, y1], [x2, y1], [x2, y2], [x1, y2]], text, prob
+
+
+def test_stacked_lines_are_joined():
+    ocr_results = [token(0, 0, 100, 30, "ABC"), token(10, 36, 90, 66, "123")]
+    hypotheses = plate_hypotheses(ocr_results, cleanup)
+    assert "ABC123" in hypotheses
+    assert hypotheses["ABC123"][1] == (0.0, 0.0, 100.0, 66.0)
+
+
+def test_distant_lines_are_not_joined():
+    ocr_results = [token(0, 0, 100, 30, "ABC"), token(0, 300, 100, 330, "123")]
+    assert set(plate_hypotheses(ocr_results, cleanup)) == {"ABC", "123"}
+
+
+def test_lines_without_horizontal_overlap_are_not_joined():
+    ocr_results = [token(0, 0, 100, 30, "ABC"), token(400, 36, 500, 66, "123")]
+    assert set(plate_hypotheses(ocr_results, cleanup)) == {"ABC", "123"}
+
+
+def test_tokens_on_one_line_are_joined_in_both_orders():
+    ocr_results = [token(0, 0, 60, 30, "ABC"), token(70, 0, 130, 30, "123")]
+    hypotheses = plate_hypotheses(ocr_results, cleanup)
+    assert {"ABC123", "123ABC"} <= set(hypotheses)
+
+
+def test_voter_does_not_grant_distant_lines():
+    def match(text):
+        return ("ABC123", 1.0) if text == "ABC123" else (None, 0.0)
+
+    voter = PlateVoter(match, cleanup)
+    voter.add([token(0, 0, 100, 30, "ABC"), token(0, 300, 100, 330, "123")])
+    assert not voter.granted
+    assert set(voter.denied) == {"ABC", "123"}
+
+
+def allowlist_voter(*keys):
+    index = CanonicalPlateIndex(keys)
+    return PlateVoter(lambda text: find_best_match(text, index), cleanup)
+
+
+def test_voter_grants_a_two_line_plate():
+    voter = allowlist_voter("ABC1234")
+    voter.add([token(0, 0, 160, 40, "ABC"), token(0, 46, 160, 86, "1234")])
+    assert set(voter.granted) == {"ABC1234"}
+
+
+def test_small_dealer_text_above_a_partial_plate_does_not_grant():
+    voter = allowlist_voter("ABC1234")
+    # Dealer frame lettering stacked on top of a plate that reads "1234"
+    voter.add([token(20, 0, 80, 12, "ABC"), token(0, 16, 160, 56, "1234")])
+    assert not voter.granted
+
+
+def test_small_sticker_beside_a_partial_plate_does_not_grant():
+    voter = allowlist_voter("ABC1234")
+    # A sticker on the plate's line, left of the characters it did read
+    voter.add([token(0, 20, 40, 32, "ABC"), token(50, 0, 210, 40, "1234")])
+    assert not voter.granted
+    assert "1234" in voter.denied
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+import result_cache  # noqa: E402
+from result_cache import PerceptualCache, ResultCache, perceptual_hash  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_cache.time, "monotonic", clock)
+    return clock
+
+
+def gradient(width=64, height=32):
+    row = np.linspace(0, 255, width).astype(np.uint8)
+    return np.repeat(row[None, :], height, axis=0)
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResultCache(max_entries=2)
+    cache.put("a", {"plate": "A"})
+    cache.put("b", {"plate": "B"})
+    assert cache.get("a") == {"plate": "A"}
+    cache.put("c", {"plate": "C"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"plate": "A"}
+    assert cache.get("c") == {"plate": "C"}
+    assert cache.stats() == {"entries": 2, "hits": 3, "misses": 1}
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResultCache(ttl_seconds=30)
+    cache.put("a", {"plate": "A"})
+    clock.now += 30
+    assert cache.get("a") == {"plate": "A"}
+    clock.now += 1
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_cached_results_are_copies(clock):
+    cache = ResultCache()
+    result = {"plate": "A"}
+    cache.put("a", result)
+    result["plate"] = "changed"
+    cache.get("a")["plate"] = "changed too"
+    assert cache.get("a") == {"plate": "A"}
+
+
+def test_invalidate_drops_every_entry(clock):
+    cache = ResultCache()
+    cache.put("a", {"plate": "A"})
+    cache.invalidate()
+    assert cache.get("a") is None
+
+
+def test_near_identical_frames_hit_the_perceptual_cache(clock):
+    frame = gradient()
+    noisy = frame.copy()
+    noisy[0, :8] = 255 - noisy[0, :8]
+    cache = PerceptualCache(max_distance=8)
+    cache.put(perceptual_hash(frame), {"plate": "A"})
+
+    assert 0 < bin(perceptual_hash(frame) ^ perceptual_hash(noisy)).count("1") <= 8
+    assert cache.get(perceptual_hash(noisy)) == {"plate": "A"}
+    # The mirrored frame has every difference bit flipped
+    assert cache.get(perceptual_hash(frame[:, ::-1])) is None
+
+
+def test_perceptual_hash_accepts_color_and_grayscale():
+    gray = gradient()
+    color = np.dstack([gray, gray, gray])
+    assert perceptual_hash(color) == perceptual_hash(gray)
+    assert perceptual_hash(gray).bit_length() <= 16 * 16
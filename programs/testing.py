@@ -9,6 +9,7 @@ CSV_PATH = "./Rdata/labels.csv"
 
 
 def run_test():
+    test.init()
 
     df = pd.read_csv(CSV_PATH)
     ground_truth = {}
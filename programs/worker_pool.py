@@ -0,0 +1,152 @@
+import importlib
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from preprocess import map_result_box
+
+# Pipeline module (alpr_server or test) imported once inside each worker, and
+# the scan_service it registered its stage with
+_pipeline = None
+_service = None
+
+
+class PoolBusy(Exception):
+    pass
+
+
+def set_torch_threads(threads):
+    """Intra-op threads for torch; one inter-op thread (scans are serial)."""
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only allowed before the first parallel op of the process
+        pass
+
+
+def _init_worker(module_name, torch_threads):
+    global _pipeline, _service
+    set_torch_threads(torch_threads)
+
+    _pipeline = importlib.import_module(module_name)
+    _service = importlib.import_module("scan_service")
+    # Set explicitly: under spawn, scan_service was already imported (by the
+    # parent's __main__) before this initializer ran. Opens the SQLite plate
+    # DB read-only and sizes ONNX Runtime's threads like torch's.
+    _service.init(worker=True, torch_threads=torch_threads)
+    # Models load lazily, so warm up here to pay for them once per worker
+    _pipeline.warm_up()
+    print(f"Worker {os.getpid()} ready ({torch_threads} torch threads).")
+
+
+def _ping():
+    return os.getpid()
+
+
+def _run_scan(data, *decode_args):
+    """Decode + scan one upload; returns (result, per-stage latencies in ms)."""
+    start = time.perf_counter()
+    img, transform = _pipeline.decode_frame(data, *decode_args)
+    timings = {"decode_ms": (time.perf_counter() - start) * 1000}
+    result = map_result_box(
+        _pipeline.process_image_from_memory(img, timings), transform
+    )
+    timings["total_ms"] = (time.perf_counter() - start) * 1000
+    return result, timings
+
+
+def _run_batch(blobs):
+    return _service.process_blobs_batch(blobs)
+
+
+class InferencePool:
+    """
+    Runs the scan pipeline in separate processes so requests are not
+    serialized behind one interpreter. At most `workers + queue_size`
+    jobs are accepted at a time; beyond that submit() raises PoolBusy.
+    """
+
+    def __init__(self, module_name, workers, queue_size=None, torch_threads=None):
+        cpu_count = os.cpu_count() or 1
+        self.workers = workers
+        self.queue_size = workers * 2 if queue_size is None else queue_size
+        self.torch_threads = torch_threads or max(1, cpu_count // workers)
+
+        self._slots = threading.BoundedSemaphore(workers + self.queue_size)
+        self._in_flight = 0
+        self._count_lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(module_name, self.torch_threads),
+        )
+
+    def start(self):
+        # Submitting one job per worker spawns all of them up front, so the
+        # models are loaded before the first real request arrives.
+        futures = [self._executor.submit(_ping) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PoolBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._count_lock:
+            self._in_flight += 1
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future):
+        with self._count_lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def in_flight(self):
+        """Jobs accepted and not yet finished (running plus queued)."""
+        return self._in_flight
+
+    def submit_scan(self, data, *decode_args):
+        """Future of (result, timings) for one encoded image."""
+        return self.submit(_run_scan, data, *decode_args)
+
+    def submit_batch(self, blobs):
+        """Future of (results, timings) for several encoded images."""
+        return self.submit(_run_batch, blobs)
+
+    def scan(self, data, *decode_args):
+        return self.submit_scan(data, *decode_args).result()
+
+    def scan_batch(self, blobs):
+        return self.submit_batch(blobs).result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def start_pool(module_name, workers, queue_size=None, torch_threads=None):
+    """
+    Started InferencePool for offline tools (batch_scan, bench_pipeline).
+    The pipeline is imported here first so a stale SQLite plate DB is
+    rebuilt at its depth before the workers open it read-only. Servers,
+    whose __main__ may be the pipeline itself, use InferencePool directly.
+    """
+    importlib.import_module(module_name)
+    importlib.import_module("scan_service").prepare_database()
+    pool = InferencePool(module_name, workers, queue_size, torch_threads)
+    try:
+        pool.start()
+    except BaseException:
+        pool.shutdown()
+        raise
+    return pool